@@ -12,6 +12,9 @@ from stricto import *
 
 from .item import Item
 from .db_yml_connector import DBYmlConnector
+from .codec import Codec, convert_directory
+from .db_log_connector import DBLogConnector
+from .db_sqlite_connector import DBSqliteConnector
 from .db_mongo_connector import DBMongoConnector
 from .db_connector import DBConnector
 from .db_restfull_connector import DBRestfullConnector
@@ -27,7 +30,13 @@ from .error import (
 )
 from .backoffice import Backoffice
 from .collection import Collection
-from .selection import Selection
+from .selection import Selection, SelectionStream
+from .aggregation import Aggregation, Facets
+from .selection_cache import SelectionCache
+from .search_index import SearchIndex
+from .column_store import ColumnStore
+from .prototype import ItemPrototype
+from .identity_map import IdentityMap, identity_map_scope, current_identity_map
 from .log import Logger, log_system, LogLevel, stack
 
 # from .reference import Ref, RefsList, FillStrategy, DeleteStrategy
@@ -48,3 +57,5 @@ from .request_decorators import (
     error_to_http_handler,
 )
 from .api_toolbox import multidict_to_filter, append_path_to_filter
+from .cursor import KeysetCursor
+from .filter_translator import Condition, build_projection, split_filter
@@ -0,0 +1,287 @@
+"""
+The aggregation module
+
+An :py:class:`Aggregation` groups objects by the values of some fields and computes,
+for each group, the number of objects and the ``sum``, ``min`` and ``max`` of other fields.
+It is evaluated in one pass on documents (see :func:`DBConnector.aggregate`),
+or translated by the database (ex. a mongo ``aggregate`` pipeline).
+
+:py:class:`Facets` give the distinct values of some fields, with the number
+of objects for each value (one aggregation by field, evaluated in the same pass).
+"""
+
+# pylint: disable=wrong-import-position, wrong-import-order
+import re
+import sys
+from typing import Any
+
+# used for developpement
+sys.path.insert(1, "../../stricto")
+
+from stricto import Dict, SSyntaxError
+
+from .cursor import parse_keys, readable_field
+from .db_connector import sort_key
+from .filter_translator import MISSING, get_path
+
+AGGREGATE_OPERATORS = ("sum", "min", "max")
+"""Operators computed on fields (the ``count`` is always given)"""
+
+
+def _is_number(value: Any) -> bool:
+    """Return True for int and float (not bool)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class Aggregation:
+    """
+    A group-by with metrics, evaluated in one pass
+
+    .. code-block:: python
+
+        aggregation = Aggregation(
+            model, group_by="status", metrics={"sum": "price", "max": ["price", "mtime"]}
+        )
+        for document in documents:
+            aggregation.add(document)
+        aggregation.result()
+        # [ { "group" : { "status" : "open" }, "count" : 3,
+        #     "sum" : { "price" : 12 }, "max" : { "price" : 9, "mtime" : ... } }, ... ]
+
+    :param model: the model of the documents (fields are checked with :func:`readable_field`)
+    :type model: Item
+    :param group_by: the fields to group by, ex ``"status,owner"`` (none = one group)
+    :type group_by: str | list[str] | None
+    :param metrics: the fields for each operator of :py:data:`AGGREGATE_OPERATORS`
+    :type metrics: dict | None
+    :raise SSyntaxError: unknown operator or invalid field
+    """
+
+    def __init__(
+        self,
+        model,
+        group_by: str | list[str] | None = None,
+        metrics: dict | None = None,
+    ):
+        """Constructor"""
+        self.group_by = parse_keys(group_by)
+        self.metrics: list[tuple[str, str]] = []
+        for operator, fields in (metrics or {}).items():
+            if operator not in AGGREGATE_OPERATORS:
+                raise SSyntaxError(
+                    'Invalid aggregate operator "{0}" (must be one of {1})',
+                    operator,
+                    AGGREGATE_OPERATORS,
+                )
+            for key in parse_keys(fields):
+                if (operator, key) not in self.metrics:
+                    self.metrics.append((operator, key))
+
+        for key in self.keys():
+            readable_field(model, key)
+
+        self._paths = [key.split(".") for key in self.group_by]
+        self._metric_paths = [
+            (operator, key, key.split(".")) for operator, key in self.metrics
+        ]
+        self._groups: dict[tuple, dict] = {}
+
+    def keys(self) -> list[str]:
+        """Return the fields used by the aggregation
+
+        :rtype: list[str]
+        """
+        return list(dict.fromkeys(self.group_by + [key for _, key in self.metrics]))
+
+    def projection(self) -> dict:
+        """Return the projection to read only fields used (see :func:`DBConnector.select`)
+
+        :rtype: dict
+        """
+        keys = {"_id"} | {key.split(".")[0] for key in self.keys()}
+        return {key: 1 for key in sorted(keys)}
+
+    def new_group(self, values: tuple) -> dict:
+        """Return an empty group for the values of ``group_by`` fields
+
+        :param values: the values, in the order of ``group_by``
+        :type values: tuple
+        :rtype: dict
+        """
+        group = {"group": dict(zip(self.group_by, values)), "count": 0}
+        for operator, key in self.metrics:
+            group.setdefault(operator, {})[key] = 0 if operator == "sum" else None
+        return group
+
+    def add(self, document: dict) -> None:
+        """Add a document (raw, or values of an :py:class:`Item`) to its group
+
+        ``sum`` ignores non numeric values, ``min`` and ``max`` ignore missing values.
+
+        :param document: the document
+        :type document: dict
+        """
+        values = []
+        for path in self._paths:
+            value = get_path(document, path)
+            values.append(None if value is MISSING else value)
+        values = tuple(values)
+
+        group = self._groups.get(values)
+        if group is None:
+            group = self._groups[values] = self.new_group(values)
+        group["count"] += 1
+
+        for operator, key, path in self._metric_paths:
+            value = get_path(document, path)
+            if value is MISSING or value is None:
+                continue
+            current = group[operator][key]
+            if operator == "sum":
+                if _is_number(value):
+                    group["sum"][key] = current + value
+            elif current is None:
+                group[operator][key] = value
+            elif operator == "min" and sort_key(value) < sort_key(current):
+                group["min"][key] = value
+            elif operator == "max" and sort_key(value) > sort_key(current):
+                group["max"][key] = value
+
+    def result(self, groups: list[dict] | None = None) -> list[dict]:
+        """Return the groups, sorted by values of ``group_by`` fields
+
+        :param groups: groups computed elsewhere (ex. by the database), or those of :func:`add`
+        :type groups: list[dict] | None
+        :rtype: list[dict]
+        """
+        groups = list(self._groups.values()) if groups is None else groups
+        if not groups and not self.group_by:
+            groups = [self.new_group(())]
+        return sorted(
+            groups,
+            key=lambda g: tuple(sort_key(g["group"].get(k)) for k in self.group_by),
+        )
+
+
+def split_reference(model, key: str) -> tuple[str, str | None, str | None]:
+    """Split a key going through a :py:class:`Ref`, ex ``author.nationality.a2``
+
+    :param model: the model of the documents
+    :type model: Item
+    :param key: the key
+    :type key: str
+    :return: the key of the reference, the referenced collection and the key in it
+        (or the key, None, None if no reference is followed)
+    :rtype: tuple[str, str | None, str | None]
+    """
+    # ref imports refslist, which needs ref.Ref (imported here once both are loaded)
+    from .ref import Ref  # pylint: disable=import-outside-toplevel
+
+    names = key.split(".")
+    field = model
+    for i, name in enumerate(names[:-1]):
+        if not isinstance(field, Dict) or name not in field._keys:
+            break
+        field = object.__getattribute__(field, name)
+        if isinstance(field, Ref):
+            return (
+                ".".join(names[: i + 1]),
+                field._collection,
+                ".".join(names[i + 1 :]),
+            )
+    return (key, None, None)
+
+
+def facet_values(counts: dict) -> list[dict]:
+    """Return the values and their counts, the most frequent first
+
+    :param counts: the number of objects by value
+    :type counts: dict
+    :return: ex ``[ { "value" : "open", "count" : 3 }, ... ]``
+    :rtype: list[dict]
+    """
+    return [
+        {"value": value, "count": count}
+        for value, count in sorted(
+            counts.items(), key=lambda vc: (-vc[1], sort_key(vc[0]))
+        )
+    ]
+
+
+class Facets:
+    """
+    The distinct values of fields, with the number of objects for each value
+
+    Same interface as :py:class:`Aggregation` (:func:`add` then :func:`result`).
+
+    .. code-block:: python
+
+        facets = Facets(model, "status,owner")
+        for document in documents:
+            facets.add(document)
+        facets.result()
+        # { "status" : [ { "value" : "open", "count" : 3 }, ... ],
+        #   "owner" : [ ... ] }
+
+    :param model: the model of the documents (fields are checked with :func:`readable_field`)
+    :type model: Item
+    :param fields: the fields, ex ``"status,owner"`` (a leading ``$.`` is ignored)
+    :type fields: str | list[str] | None
+    :raise SSyntaxError: invalid field
+    """
+
+    def __init__(self, model, fields: str | list[str] | None):
+        """Constructor"""
+        self.fields = list(dict.fromkeys(parse_facet_keys(fields)))
+        self.aggregations = [Aggregation(model, [key]) for key in self.fields]
+
+    def keys(self) -> list[str]:
+        """Return the fields
+
+        :rtype: list[str]
+        """
+        return list(self.fields)
+
+    def projection(self) -> dict:
+        """Return the projection to read only fields used (see :func:`DBConnector.select`)
+
+        :rtype: dict
+        """
+        keys = {"_id"} | {key.split(".")[0] for key in self.fields}
+        return {key: 1 for key in sorted(keys)}
+
+    def add(self, document: dict) -> None:
+        """Add a document (raw, or values of an :py:class:`Item`)
+
+        :param document: the document
+        :type document: dict
+        """
+        for aggregation in self.aggregations:
+            aggregation.add(document)
+
+    def result(self, groups: list[list[dict]] | None = None) -> dict[str, list[dict]]:
+        """Return the values of each field (see :func:`facet_values`)
+
+        :param groups: for each field, groups computed elsewhere (ex. by the database,
+            see :func:`Aggregation.result`), or those of :func:`add`
+        :type groups: list[list[dict]] | None
+        :rtype: dict[str, list[dict]]
+        """
+        if groups is None:
+            groups = [aggregation.result() for aggregation in self.aggregations]
+        return {
+            key: facet_values({g["group"][key]: g["count"] for g in field_groups})
+            for key, field_groups in zip(self.fields, groups)
+        }
+
+
+def parse_facet_keys(value: str | list | None) -> list[str]:
+    """Return the keys of facets given by a client (see :func:`parse_keys`),
+    without the leading ``$.``
+
+    :param value: the keys, ex ``"$.status,owner"``
+    :type value: str | list | None
+    :rtype: list[str]
+    :raise SSyntaxError: not a list of strings
+    """
+    return [re.sub(r"^\$\.", "", key) for key in parse_keys(value)]
@@ -5,9 +5,13 @@ A set of functions
 
 import re
 import json
+import hashlib
+from datetime import datetime
 from typing import Any
 from flask import Request
+from flask import request as current_request
 from werkzeug.datastructures import ImmutableMultiDict
+from werkzeug.http import http_date, quote_etag
 
 
 def append_path_to_filter(filter_as_dict: dict, key, value: list | tuple):
@@ -127,3 +131,69 @@ def request_to_object(request: Request) -> Any:
         return obj
 
     return None
+
+
+def make_etag(*parts: Any) -> str:
+    """Return an ETag (a hash) for the parts of a response
+
+    :param parts: anything json can dump (other values are dumped as ``str``)
+    :type parts: Any
+    :return: the etag, not quoted
+    :rtype: str
+    """
+    dump = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(dump.encode("utf-8")).hexdigest()
+
+
+def to_last_modified(value: Any) -> datetime | None:
+    """Return the ``Last-Modified`` time for a value read in a document (ex. ``_meta.mtime``)
+
+    :param value: a datetime or its iso format (naive = local time)
+    :type value: Any
+    :rtype: datetime | None
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value.astimezone().replace(microsecond=0)
+
+
+def validator_headers(etag: str | None, last_modified: datetime | None = None) -> dict:
+    """Return the ``ETag`` and ``Last-Modified`` headers of a response
+
+    :param etag: the etag, not quoted (see :func:`make_etag`)
+    :type etag: str | None
+    :param last_modified: the time of the last modification
+    :type last_modified: datetime | None
+    :rtype: dict
+    """
+    headers = {}
+    if etag is not None:
+        headers["ETag"] = quote_etag(etag)
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def is_not_modified(etag: str | None, last_modified: datetime | None = None) -> bool:
+    """Return True if the client already has this version (a 304 can be sent)
+
+    ``If-None-Match`` is checked with the etag, or else
+    ``If-Modified-Since`` with the last modification time.
+
+    :param etag: the etag, not quoted (see :func:`make_etag`)
+    :type etag: str | None
+    :param last_modified: the time of the last modification
+    :type last_modified: datetime | None
+    :rtype: bool
+    """
+    if current_request.if_none_match:
+        return etag is not None and current_request.if_none_match.contains_weak(etag)
+    if_modified_since = current_request.if_modified_since
+    if if_modified_since is None or last_modified is None:
+        return False
+    return last_modified <= if_modified_since
@@ -15,6 +15,7 @@ sys.path.insert(1, "../../stricto")
 
 from stricto import Kparse, SSyntaxError, validation_parameters
 
+from .api_toolbox import is_not_modified, make_etag, validator_headers
 from .collection import Collection
 from .item import Item
 from .migration_report import MigrationReport
@@ -229,9 +230,14 @@ class Backoffice:  # pylint: disable=too-many-instance-attributes
 
     @error_to_http_handler
     def _meta_http(self):
-        """GET meta information :func:`get_meta` via https"""
+        """GET meta information :func:`get_meta` via https (with an ``ETag``)"""
         log.debug(f"get meta information for {self.name}")
-        return (json.dumps(self.get_meta()), 200)
+        body = json.dumps(self.get_meta())
+        etag = make_etag(body)
+        headers = validator_headers(etag)
+        if is_not_modified(etag):
+            return ("", 304, headers)
+        return (body, 200, headers)
 
     def get_openapi(self) -> dict:
         """
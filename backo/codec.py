@@ -0,0 +1,240 @@
+"""
+Module providing codecs for files of :py:class:`DBYmlConnector`
+
+A codec reads and writes one document per file. Available codecs are
+
+- ``yaml`` -- ``.yml`` files, with libyaml (``CSafeLoader`` / ``CSafeDumper``) when available
+- ``json`` -- ``.json`` files
+- ``msgpack`` -- ``.msgpack`` files, needs the ``msgpack`` package
+
+Json and msgpack have no date type: dates and datetimes are written as
+``{ "$date" : "2024-01-31" }`` and ``{ "$datetime" : "2024-01-31T10:00:00" }``
+and read back with their type, so converting from yaml keeps them.
+
+"""
+
+# pylint: disable=logging-fstring-interpolation
+from abc import ABC, abstractmethod
+import datetime
+import json
+import os
+
+import yaml
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+from .error import DBError
+from .log import log_system
+
+log = log_system.get_or_create_logger("yml")
+
+
+def json_default(value):
+    """Serialize values json doesn't know
+
+    Dates and datetimes become isoformat strings (they are read back as strings).
+    Used by connectors filtering on the json (sqlite, log)
+    """
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def typed_default(value):
+    """Serialize values json and msgpack don't know, keeping their type
+
+    Dates and datetimes are tagged, see :func:`typed_object_hook`
+    """
+    if isinstance(value, datetime.datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def typed_object_hook(document: dict):
+    """Read back values tagged by :func:`typed_default`"""
+    if len(document) == 1:
+        if isinstance(document.get("$datetime"), str):
+            return datetime.datetime.fromisoformat(document["$datetime"])
+        if isinstance(document.get("$date"), str):
+            return datetime.date.fromisoformat(document["$date"])
+    return document
+
+
+class Codec(ABC):
+    """A way to store one document in one file
+
+    Files of a document are named ``<_id><extension>``
+    """
+
+    extension = ""
+
+    @abstractmethod
+    def read(self, filename: str) -> dict:
+        """Read a file
+
+        :param filename: the file
+        :type filename: str
+        :return: the document
+        :rtype: dict
+        """
+
+    @abstractmethod
+    def write(self, filename: str, o: dict) -> None:
+        """Write a document in a file
+
+        :param filename: the file
+        :type filename: str
+        :param o: the document
+        :type o: dict
+        """
+
+    def filename(self, path: str, _id: str) -> str:
+        """Return the file of this _id in the directory
+
+        :param path: the directory
+        :type path: str
+        :param _id: the _id
+        :type _id: str
+        :rtype: str
+        """
+        return os.path.join(path, _id + self.extension)
+
+    def is_file(self, name: str) -> bool:
+        """Return True if this file name is a document for this codec
+
+        :param name: the file name (without directory)
+        :type name: str
+        :rtype: bool
+        """
+        return name.endswith(self.extension)
+
+    def id_of(self, name: str) -> str:
+        """Return the _id of this file name
+
+        :param name: the file name (without directory)
+        :type name: str
+        :rtype: str
+        """
+        return name[: -len(self.extension)]
+
+
+class YamlCodec(Codec):
+    """Yaml files, with libyaml if available"""
+
+    extension = ".yml"
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+    def read(self, filename: str) -> dict:
+        """See :func:`Codec.read`"""
+        with open(filename, mode="r", encoding="utf-8") as stream:
+            return yaml.load(stream, Loader=self.loader)
+
+    def write(self, filename: str, o: dict) -> None:
+        """See :func:`Codec.write`"""
+        with open(filename, mode="w", encoding="utf-8") as outfile:
+            yaml.dump(o, outfile, Dumper=self.dumper, default_flow_style=False)
+
+
+class JsonCodec(Codec):
+    """Json files"""
+
+    extension = ".json"
+
+    def read(self, filename: str) -> dict:
+        """See :func:`Codec.read`"""
+        with open(filename, mode="r", encoding="utf-8") as stream:
+            return json.load(stream, object_hook=typed_object_hook)
+
+    def write(self, filename: str, o: dict) -> None:
+        """See :func:`Codec.write`"""
+        with open(filename, mode="w", encoding="utf-8") as outfile:
+            json.dump(o, outfile, default=typed_default, separators=(",", ":"))
+
+
+class MsgpackCodec(Codec):
+    """Msgpack files"""
+
+    extension = ".msgpack"
+
+    def __init__(self):
+        """Constructor"""
+        if msgpack is None:
+            raise DBError('Codec "msgpack" needs the msgpack package')
+
+    def read(self, filename: str) -> dict:
+        """See :func:`Codec.read`"""
+        with open(filename, mode="rb") as stream:
+            return msgpack.unpackb(stream.read(), object_hook=typed_object_hook)
+
+    def write(self, filename: str, o: dict) -> None:
+        """See :func:`Codec.write`"""
+        with open(filename, mode="wb") as outfile:
+            outfile.write(msgpack.packb(o, default=typed_default))
+
+
+CODECS = {"yaml": YamlCodec, "json": JsonCodec, "msgpack": MsgpackCodec}
+
+
+def get_codec(name: str) -> Codec:
+    """Return a codec by its name
+
+    :param name: ``yaml``, ``json`` or ``msgpack``
+    :type name: str
+    :raises DBError: if the codec is unknown or unavailable
+    :rtype: Codec
+    """
+    codec_class = CODECS.get(name)
+    if codec_class is None:
+        raise DBError('Unknown codec "{0}"', name)
+    return codec_class()
+
+
+def convert_directory(path: str, source: str, target: str) -> int:
+    """Convert all documents of a directory from a codec to another
+
+    Each file is written with the target codec, then the source file is removed.
+    A conversion stopped in the middle can be run again.
+
+    :param path: the directory
+    :type path: str
+    :param source: the codec of existing files, ex ``yaml``
+    :type source: str
+    :param target: the new codec, ex ``json``
+    :type target: str
+    :raises DBError: on errors
+    :return: the number of converted files
+    :rtype: int
+
+    .. code-block:: python
+
+        convert_directory("/var/books", "yaml", "json")
+        db = DBYmlConnector(path="/var/books", codec="json")
+
+    """
+    source_codec = get_codec(source)
+    target_codec = get_codec(target)
+    if source_codec.extension == target_codec.extension:
+        return 0
+
+    number = 0
+    try:
+        for name in sorted(os.listdir(path)):
+            if not source_codec.is_file(name):
+                continue
+            _id = source_codec.id_of(name)
+            filename = os.path.join(path, name)
+            log.debug(f"convert {filename} to {target}")
+            target_codec.write(
+                target_codec.filename(path, _id), source_codec.read(filename)
+            )
+            os.unlink(filename)
+            number += 1
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        raise DBError('Error while converting path "{0}"', path) from e
+    return number
@@ -4,6 +4,7 @@ The Collection module
 
 # pylint: disable=logging-fstring-interpolation, too-many-public-methods, too-many-lines, too-many-statements, wrong-import-order
 import copy
+import itertools
 import json
 import pprint
 import re
@@ -11,7 +12,7 @@ import sys
 from typing import Callable, Self
 
 from deepdiff import DeepDiff
-from flask import Blueprint, request
+from flask import Blueprint, request, stream_with_context
 
 from backo.openapi import OpenAPISpec
 
@@ -19,6 +20,7 @@ from backo.openapi import OpenAPISpec
 sys.path.insert(1, "../../stricto")
 
 from stricto import (
+    EVENT_MANAGER,
     Dict,
     FreeDict,
     Kparse,
@@ -35,15 +37,31 @@ from stricto import (
 )
 
 from .action import Action
-from .api_toolbox import append_path_to_filter, multidict_to_filter, request_to_object
+from .aggregation import AGGREGATE_OPERATORS
+from .api_toolbox import (
+    append_path_to_filter,
+    is_not_modified,
+    make_etag,
+    multidict_to_filter,
+    request_to_object,
+    to_last_modified,
+    validator_headers,
+)
+from .cursor import parse_sort
+from .current_user import current_user
 from .db_connector import DBConnector
-from .error import PathNotFoundError
+from .filter_translator import is_projectable
+from .error import NotFoundError, PathNotFoundError, SessionError
 from .file.file import File
+from .identity_map import current_identity_map, forget, identity_map_scope
 from .item import Item
 from .log import LogLevel, log_system
 from .migration_report import MigrationReport
 from .patch import Patch
 from .request_decorators import check_content_type, error_to_http_handler
+from .column_store import ColumnStore
+from .search_index import SearchIndex, parse_searchable_fields
+from .prototype import ItemPrototype
 from .selection import Selection
 
 log = log_system.get_or_create_logger("collection", LogLevel.INFO)
@@ -64,10 +82,18 @@ KPARSE_MODEL = {
     "can_delete|delete": {"type": bool | Callable, "default": True},
     "can_create|create": {"type": bool | Callable, "default": True},
     "refuse_filter": Callable,
+    "read_filter": dict | Callable,
+    "cache_ttl": {"type": int | float, "default": 0},
+    "searchable": str | list,
+    "columns": str | list,
+    "workers": {"type": int, "default": 0},
 }
 
+BATCH_SIZE = 1000
+"""Default number of objects written at once by :func:`Collection.create_many` & co"""
+
 
-class Collection:
+class Collection:  # pylint: disable=too-many-instance-attributes
     """The Collection refer to a "table"
 
     A collection is the main object in backo. It contains
@@ -87,6 +113,10 @@ class Collection:
     :param ``**kwargs``:
         - *refuse_filter=* ``func`` --
           not used yet
+        - *read_filter=* ``dict|func`` --
+          the filter of objects the :py:class:`CurrentUser` can read (or a function
+          returning it, ``None`` for all objects). It is merged in the filter of
+          selections, so given to the database (see :func:`get_read_filter`)
         - *can_read=* ``[func]|bool`` --
           a function to say if the :py:class:`CurrentUser` can read this collection
         - *can_create=* ``[func]|bool`` --
@@ -95,6 +125,17 @@ class Collection:
           a function to say if the :py:class:`CurrentUser` can delete an :py:class:`Item` in this collection
         - *can_modify=* ``[func]|bool`` --
           a function to say if the :py:class:`CurrentUser` can modify an :py:class:`Item` in this collection
+        - *cache_ttl=* ``float`` --
+          keep pages of the ``_all`` selection for this number of seconds (see :func:`Selection.stream`)
+        - *searchable=* ``str|list`` --
+          the :py:class:`String` fields searched by text queries, ex ``"title,summary"``
+          (see :func:`search`)
+        - *columns=* ``str|list`` --
+          scalar fields kept in memory by column, ex ``"price,year,mtime"``.
+          Selections, aggregations and facets on them are evaluated on the
+          columns (see :py:class:`ColumnStore`)
+        - *workers=* ``int`` --
+          match filters of the ``_all`` selection in this number of processes (see :func:`Selection.select`)
 
 
 
@@ -136,6 +177,7 @@ class Collection:
         self.model: Item = model.copy()
         self.model.__dict__["_collection"] = self
         self.model.set_db_handler(db_handler)
+        self.prototype = ItemPrototype(self.model)
         self.migration: Callable | None = None
 
         options = Kparse(kwargs, KPARSE_MODEL, strict=True)
@@ -153,6 +195,7 @@ class Collection:
 
         # For filtering
         self.refuse_filter = options.get("refuse_filter")
+        self._read_filter = options.get("read_filter")
 
         # For actions (aka some element work with datas)
         self._actions = {}
@@ -163,14 +206,164 @@ class Collection:
 
         self._selections = {}
 
+        # For text queries
+        self.searchable = parse_searchable_fields(
+            self.model, options.get("searchable") or []
+        )
+        self.search_index = (
+            SearchIndex(self.searchable, self._read_documents)
+            if self.searchable
+            else None
+        )
+
+        # For analytical selections
+        self.column_store = (
+            ColumnStore(self.model, options.get("columns"), self._read_documents)
+            if options.get("columns")
+            else None
+        )
+
+        # Bumped on each write (see :func:`changed`)
+        self.version = 0
+        self._versions = itertools.count(1)
+
+        # Materialized selections follow writes (deletions: see Item.finish_delete)
+        for event_name in ("created", "saved"):
+            EVENT_MANAGER.register_event(self.model, event_name, self._on_write_event)
+
         # Adding the "_all" selection
         can_read = self._permissions.get("read", True)
-        self.register_selection("_all", Selection(None, can_read=can_read))
+        self.register_selection(
+            "_all",
+            Selection(
+                None,
+                can_read=can_read,
+                cache_ttl=options.get("cache_ttl"),
+                workers=options.get("workers"),
+            ),
+        )
 
         # Setup the OpenAPI builder
         self._openapi = OpenAPISpec()
         self._openapi.add_schema(self.name, self.model.get_schema())
 
+    def _on_write_event(
+        self, event_name, root, me, **kwargs
+    ):  # pylint: disable=unused-argument
+        """
+        An object of this collection is created or saved
+
+        :meta private:
+
+        """
+        self.changed(me._id.get_value(), me)
+
+    def changed(
+        self, _id: str | None, o: Item | None = None, deleted: bool = False
+    ) -> None:
+        """
+        Tell selections an object has changed (see :func:`Selection.materialize`)
+
+        Called on each object created, saved or deleted, and by writes
+        done directly in the database (rollbacks, migrations, drop).
+        The :py:attr:`version` is bumped, so pages in caches are read again
+        (see :func:`Selection.stream`), and the :py:class:`SearchIndex` and
+        :py:class:`ColumnStore` are updated.
+
+        :param _id: The _id of the object (``None`` for all objects)
+        :type _id: str | None
+        :param o: The object created or saved (``None`` if unknown)
+        :type o: Item | None
+        :param deleted: the object is deleted
+        :type deleted: bool
+
+        :meta private:
+
+        """
+        self.version = next(self._versions)
+        stores = [s for s in (self.search_index, self.column_store) if s is not None]
+        if stores:
+            document = None
+            if o is not None and not deleted:
+                document = o.get_view("save").get_encoded()
+            for store in stores:
+                if _id is None or (o is None and not deleted):
+                    store.clear()
+                else:
+                    store.update(_id, document)
+        for selection in self._selections.values():
+            selection.on_write(_id, o, deleted)
+
+        collections = self.backoffice.collections.values() if self.backoffice else []
+        for collection in collections:
+            if collection is not self:
+                for selection in collection._selections.values():
+                    selection.on_other_write()
+
+    def _read_documents(self, projection: dict):
+        """
+        Read all objects, to build a :py:class:`SearchIndex` or a :py:class:`ColumnStore`
+
+        :param projection: the fields needed
+        :type projection: dict
+
+        :meta private:
+
+        """
+        db_handler = self.db_handler
+        return db_handler.select_iter(
+            db_handler.translate_filter([], None),
+            projection if db_handler.supports_projection else {},
+            0,
+            0,
+            {},
+        )
+
+    def versions(self) -> tuple:
+        """
+        Return the versions of all collections of the backoffice (see :func:`changed`)
+
+        :meta private:
+
+        """
+        if self.backoffice is None:
+            return (self.version,)
+        return tuple(c.version for c in self.backoffice.collections.values())
+
+    def states(self) -> tuple | None:
+        """
+        Return the states of all collections of the backoffice, read in the database
+        (see :func:`DBConnector.state`), or None if one is unknown
+
+        Unlike :func:`versions`, they change with writes done by other processes.
+
+        :meta private:
+
+        """
+        collections = (
+            self.backoffice.collections.values() if self.backoffice else [self]
+        )
+        states = tuple(c.db_handler.state() for c in collections)
+        return None if None in states else states
+
+    def user_key(self) -> tuple | None:
+        """
+        Return what identifies the current user in caches and etags,
+        or None if there is no user
+
+        :meta private:
+
+        """
+        try:
+            user = current_user.retrieve_current_user()
+        except SessionError:
+            return None
+        return (
+            user._id.get_value(),
+            user.login.get_value(),
+            tuple(user.roles.get_value() or []),
+        )
+
     def get_meta(self) -> dict:
         """Return the meta data for this collection and actions"""
 
@@ -249,13 +442,67 @@ class Collection:
         """
         return self._permissions.is_allowed_to(right_name, o)
 
+    def get_read_filter(self) -> dict | None:
+        """Return the filter of objects the current user can read
+
+        .. code-block:: python
+
+            books = Collection(
+                "books",
+                book_item,
+                database_for_books,
+                read_filter=lambda: (
+                    None
+                    if current_user.has_role("admin")
+                    else {"owner": current_user._id.get_value()}
+                ),
+            )
+
+        :return: the filter, or ``None`` if all objects can be read
+        :rtype: dict | None
+        """
+        read_filter = self._read_filter
+        if callable(read_filter):
+            read_filter = read_filter()
+        return read_filter or None
+
+    def matches_read_filter(self, o: Item) -> bool:
+        """Return True if the object matches the read filter (see :func:`get_read_filter`)
+
+        :param o: the object
+        :type o: Item
+        :rtype: bool
+
+        :meta private:
+
+        """
+        read_filter = self.get_read_filter()
+        return read_filter is None or o.match(read_filter) is True
+
+    def check_read_filter(self, o: Item) -> None:
+        """Check the object matches the read filter (see :func:`get_read_filter`)
+
+        :param o: the object
+        :type o: Item
+        :raise NotFoundError: the object is not readable
+
+        :meta private:
+
+        """
+        if not self.matches_read_filter(o):
+            raise NotFoundError(
+                '_id "{0}" not found in collection "{1}"',
+                o._id.get_value(),
+                self.name,
+            )
+
     def new_item(self) -> Item:
-        """Return an empty :py:class:`Item`
+        """Return an empty :py:class:`Item`, built on the model (see :py:class:`ItemPrototype`)
 
         :return: an empty Item
         :rtype: Item
         """
-        return self.model.copy()
+        return self.prototype.new_item()
 
     def new(self):
         """See :func:`new_item`
@@ -286,6 +533,112 @@ class Collection:
         item.enable_permissions()
         return item
 
+    def create_many(
+        self, objs: list[dict], batch_size: int = BATCH_SIZE, **kwargs
+    ) -> list[Item]:
+        """Create and save many items into the DB
+
+        Like :func:`create`, but objects are written in the database
+        by batches (see :func:`DBConnector.create_many`).
+        Checks and events are still done for each item.
+
+        :param objs: The json objects struture to create
+        :type objs: list[dict]
+        :param batch_size: The number of objects written at once
+        :type batch_size: int
+        :return: the created Items
+        :rtype: list[Item]
+
+        :param ``**kwargs``:
+            - *transaction_id=* ``int`` -- the current transaction_id (in case of rollback)
+
+        """
+        items = []
+        for batch in itertools.batched(objs, max(batch_size, 1)):
+            prepared = []
+            for obj in batch:
+                item = self.new_item()
+                prepared.append((item, item.prepare_create(obj, kwargs)))
+
+            _ids = self.db_handler.create_many([o for _, o in prepared])
+            for (item, _), _id in zip(prepared, _ids):
+                item.finish_create(_id, dict(kwargs))
+                item.enable_permissions()
+                items.append(item)
+        return items
+
+    def save_many(
+        self, items: list[Item], batch_size: int = BATCH_SIZE, **kwargs
+    ) -> None:
+        """Save many items
+
+        Like :py:func:`Item.save` for each item, but objects are written in the database
+        by batches (see :func:`DBConnector.save_many`)
+
+        :param items: The items to save
+        :type items: list[Item]
+        :param batch_size: The number of objects written at once
+        :type batch_size: int
+
+        :param ``**kwargs``:
+            - *transaction_id=* ``int`` -- the current transaction_id (in case of rollback)
+
+        """
+        for batch in itertools.batched(items, max(batch_size, 1)):
+            prepared = []
+            for item in batch:
+                item_kwargs = dict(kwargs)
+                o = item.prepare_save(item_kwargs)
+                prepared.append((item, item_kwargs, o))
+
+            self.db_handler.save_many(
+                [(item._id.get_value(), o) for item, _, o in prepared]
+            )
+            for item, item_kwargs, _ in prepared:
+                item.finish_save(item_kwargs)
+
+    def delete_many(
+        self, items: list[Item | str], batch_size: int = BATCH_SIZE, **kwargs
+    ) -> None:
+        """Delete many items
+
+        Like :py:func:`Item.delete` for each item, but objects are deleted in the database
+        by batches (see :func:`DBConnector.delete_many`). Items no longer in the database
+        (checked with one :func:`DBConnector.get_by_ids` by batch) are skipped:
+        no event, no change recorded.
+
+        :param items: The items (or their _ids) to delete
+        :type items: list[Item | str]
+        :param batch_size: The number of objects deleted at once
+        :type batch_size: int
+
+        :param ``**kwargs``:
+            - *transaction_id=* ``int`` -- the current transaction_id (in case of rollback)
+
+        """
+        for batch in itertools.batched(items, max(batch_size, 1)):
+            ids = [
+                item._id.get_value() if isinstance(item, Item) else item
+                for item in batch
+            ]
+            existing = self.db_handler.get_by_ids(ids)
+            prepared = []
+            for item, _id in zip(batch, ids):
+                if _id not in existing:
+                    forget(self.name, _id)
+                    continue
+                if not isinstance(item, Item):
+                    item = self.get_by_id(item)
+                item.prepare_delete(kwargs)
+                prepared.append(item)
+
+            deleted = set(
+                self.db_handler.delete_many([item._id.get_value() for item in prepared])
+            )
+            for item in prepared:
+                if item._id.get_value() in deleted:
+                    item.finish_delete(kwargs)
+
     def get_other_collection(self, name) -> Self:
         """Return another collection (used by :py:class:`Ref` and :py:class:`RefsList`)
 
@@ -421,6 +774,8 @@ class Collection:
 
         if dry_run is False:
             self.db_handler.save(o._id.get_value(), dict_to_save)
+            forget(self.name, o._id.get_value())
+            self.changed(o._id.get_value())
             log_migration.debug(f'Migrate "{self.name}/{obj["_id"]}" saved')
 
         return diffs
@@ -434,6 +789,7 @@ class Collection:
 
         """
         self.db_handler.drop()
+        self.changed(None)
 
     def get_by_id(self, _id: str) -> Item:
         """Return an object by Id.
@@ -454,6 +810,53 @@ class Collection:
         obj.enable_permissions()
         return obj
 
+    def get_by_ids(self, _ids: list[str]) -> list[Item]:
+        """Return objects by Ids, read at once (see :func:`DBConnector.get_by_ids`)
+
+        :param _ids: the _ids of the Items you want
+        :type _ids: list[str]
+        :return: The items, in the same order. Items not found are ignored
+        :rtype: list[Item]
+
+        """
+
+        if self._permissions.is_allowed_to("read", None) is not True:
+            raise SRightError("No permission to read in collection {0}", self.name)
+
+        items = []
+        with identity_map_scope():
+            self.prefetch(_ids)
+            for _id in _ids:
+                obj = self.new_item()
+                try:
+                    obj.load(_id)
+                except NotFoundError:
+                    continue
+                obj.enable_permissions()
+                items.append(obj)
+        return items
+
+    def prefetch(self, _ids: list) -> None:
+        """Read at once objects into the current :py:class:`IdentityMap` (if any)
+
+        Next :py:func:`Item.load` of these objects will not read the database.
+
+        :param _ids: the _ids (str or String)
+        :type _ids: list
+
+        :meta private:
+
+        """
+        identity_map = current_identity_map()
+        if identity_map is None:
+            return
+        values = [_id.get_value() if isinstance(_id, String) else _id for _id in _ids]
+        identity_map.prefetch(
+            self.name,
+            [str(value) for value in values if value is not None],
+            self.db_handler.get_by_ids,
+        )
+
     def select(self, filter_for_selection: dict) -> list[Item]:
         """Do a selection directly with a filter
 
@@ -465,6 +868,87 @@ class Collection:
         result = self._selections["_all"].select(filter_for_selection, 0, 0)
         return result["result"]
 
+    def aggregate(
+        self,
+        filter_for_selection: dict | None = None,
+        group_by: str | list[str] | None = None,
+        metrics: dict | None = None,
+    ) -> list[dict]:
+        """Group objects matching the filter and count them
+
+        .. code-block:: python
+
+            books.aggregate({"year": ("$gt", 1900)}, "author", {"sum": "pages"})
+            # [ { "group" : { "author" : "Author_hugo" }, "count" : 4,
+            #     "sum" : { "pages" : 1860 } }, ... ]
+
+        :param filter_for_selection: a filter
+        :type filter_for_selection: dict | None
+        :param group_by: the fields to group by (see :func:`Selection.aggregate`)
+        :type group_by: str | list[str] | None
+        :param metrics: fields for ``sum``, ``min`` and ``max``, ex ``{ "max" : "pages" }``
+        :type metrics: dict | None
+        :return: the groups
+        :rtype: list[dict]
+        """
+        result = self._selections["_all"].aggregate(
+            filter_for_selection, group_by, metrics
+        )
+        return result["result"]
+
+    def facets(
+        self,
+        filter_for_selection: dict | None = None,
+        fields: str | list[str] | None = None,
+        limit: int = 0,
+    ) -> dict[str, list[dict]]:
+        """Return the distinct values of fields, with the number of objects for each
+
+        .. code-block:: python
+
+            books.facets({"year": ("$gt", 1900)}, "lang,author.nationality.a2")
+            # { "lang" : [ { "value" : "fr", "count" : 4 }, ... ],
+            #   "author.nationality.a2" : [ { "value" : "FR", "count" : 4 }, ... ] }
+
+        :param filter_for_selection: a filter
+        :type filter_for_selection: dict | None
+        :param fields: the fields (see :func:`Selection.facets`)
+        :type fields: str | list[str] | None
+        :param limit: the maximum number of values by field (0 = all)
+        :type limit: int
+        :return: the values by field, the most frequent first
+        :rtype: dict[str, list[dict]]
+        """
+        return self._selections["_all"].facets(filter_for_selection, fields, limit)
+
+    def search(
+        self, query: str, filter_for_selection: dict | None = None
+    ) -> list[Item]:
+        """Return objects containing all words of the query in their searchable fields,
+        the most relevant first
+
+        Words are compared in lower case and without accents. The search is done by the
+        database if it can (see :func:`DBConnector.text_search`), or with the
+        :py:class:`SearchIndex` of the collection, updated on each write.
+
+        .. code-block:: python
+
+            books = Collection( "books", book_item, db, searchable="title,summary" )
+            books.search("miserables", {"lang": "fr"})
+
+        :param query: the text query
+        :type query: str
+        :param filter_for_selection: a filter
+        :type filter_for_selection: dict | None
+        :return: a list of Items
+        :rtype: list[Item]
+        :raise SSyntaxError: the collection has no searchable field
+        """
+        result = self._selections["_all"].select(
+            filter_for_selection, 0, 0, query=query
+        )
+        return result["result"]
+
     def select_one(self, filter_for_selection: dict) -> Item:
         """select one item (if only one)
 
@@ -499,6 +983,36 @@ class Collection:
                 [(400, "Bad Request"), (500, "Something went wrong")],
             )
 
+        # GET /_aggregate - Groups
+        if self._permissions.is_strictly_allowed_to("read") is not False:
+            log.info(f"Add route GET {self.name}/_aggregate")
+            collection_blueprint.add_url_rule(
+                "/_aggregate", "aggregate", methods=["GET"]
+            )
+            collection_blueprint.view_functions[f"{self.name}.aggregate"] = (
+                self.http_aggregate
+            )
+            self._openapi.add_aggregate(
+                f"/{self.name}/_aggregate",
+                self.name,
+                (200, "Successful response"),
+                [(400, "Bad Request"), (500, "Something went wrong")],
+            )
+
+        # GET /_facets - Values of fields
+        if self._permissions.is_strictly_allowed_to("read") is not False:
+            log.info(f"Add route GET {self.name}/_facets")
+            collection_blueprint.add_url_rule("/_facets", "facets", methods=["GET"])
+            collection_blueprint.view_functions[f"{self.name}.facets"] = (
+                self.http_facets
+            )
+            self._openapi.add_facets(
+                f"/{self.name}/_facets",
+                self.name,
+                (200, "Successful response"),
+                [(400, "Bad Request"), (500, "Something went wrong")],
+            )
+
         # POST / Create data
         if self._permissions.is_strictly_allowed_to("create") is not False:
             log.info(f"Add route POST {self.name}/")
@@ -769,10 +1283,60 @@ class Collection:
         _view = query.get("_view", "client")
 
         obj = self.new_item()
-        obj.load(_id)
+        if self.is_allowed_to("read", obj) is not True:
+            raise SRightError(
+                "No permission to read element in collection {0}", self.name
+            )
+
+        # Validators are computed on the document, before building the object
+        # (except if needed to check the read filter)
+        etag, last_modified = self._item_validators(_id, _view)
+        headers = validator_headers(etag, last_modified)
+        loaded = self.get_read_filter() is not None
+        if loaded:
+            obj.load(_id)
+            self.check_read_filter(obj)
+        if etag is not None and is_not_modified(etag, last_modified):
+            log.debug(f"get by _id {_id} in {self.name} not modified")
+            return ("", 304, headers)
+
+        if not loaded:
+            obj.load(_id)
 
         log.debug(f"get by _id {_id} in {self.name} in view {_view}")
-        return (json.dumps(obj.get_view(_view), cls=StrictoEncoder), 200)
+        return (json.dumps(obj.get_view(_view), cls=StrictoEncoder), 200, headers)
+
+    def _item_validators(self, _id: str, view: str) -> tuple:
+        """
+        Return the ``( etag, last_modified )`` of an object, from its document
+
+        The etag is a hash of the document and the view. If the view may depend
+        on something else (computed values, read permissions on fields),
+        the user, states and versions of collections are added (see :func:`states`).
+        The etag is None if there is no user (or the states are unknown).
+
+        :meta private:
+
+        """
+        identity_map = current_identity_map()
+        if identity_map is None:
+            document = self.db_handler.get_by_id(_id)
+        else:
+            document = identity_map.get_document(
+                self.name, _id, self.db_handler.get_by_id
+            )
+
+        parts = [document, view]
+        if not is_projectable(self.model):
+            user_key = self.user_key()
+            states = self.states()
+            if user_key is None or states is None:
+                return (None, None)
+            parts += [user_key, states, self.versions()]
+
+        meta = document.get("_meta")
+        mtime = meta.get("mtime") if isinstance(meta, dict) else None
+        return (make_etag(*parts), to_last_modified(mtime))
 
     @error_to_http_handler
     def http_get_path_by_id(self, _id: str, path: str):
@@ -790,6 +1354,7 @@ class Collection:
 
         obj = self.new_item()
         obj.load(_id)
+        self.check_read_filter(obj)
 
         # add the $. at the beginning of the path if not
         mypath = path if re.match(r"^\$\.", path) else f"$.{path}"
@@ -811,6 +1376,61 @@ class Collection:
             "Content-Length": field.size.get_value(),
         }
 
+    def _selection_response(self, selection: Selection, match_filter, *args):
+        """
+        Build the http response for a selection, streamed row by row
+
+        The json is the same as ``json.dumps`` of :func:`Selection.select` result.
+        The first row is read here, so errors are raised before
+        the response starts.
+
+        Pages have an ``ETag`` (see :func:`Selection.etag`). A ``304`` is sent
+        if the client already has the page, and the page is not read.
+
+        :param selection: the selection
+        :type selection: Selection
+        :param match_filter: the filter given by the client
+        :param args: the other parameters of :func:`Selection.stream`
+
+        :meta private:
+
+        """
+        etag = selection.etag(match_filter, *args)
+        headers = validator_headers(etag)
+        if is_not_modified(etag):
+            return ("", 304, headers)
+
+        rows = selection.stream(match_filter, *args)
+        iterator = iter(rows)
+        try:
+            first_rows = [next(iterator)]
+        except StopIteration:
+            first_rows = []
+
+        def generate():
+            yield '{"result": ['
+            separator = ""
+            for row in itertools.chain(first_rows, iterator):
+                yield separator + json.dumps(row, cls=StrictoEncoder)
+                separator = ", "
+            yield (
+                f'], "total": {json.dumps(rows.total)}, '
+                f'"_skip": {json.dumps(rows.num_of_element_to_skip)}, '
+                f'"_page": {json.dumps(rows.page_size)}, '
+                f'"_cursor": {json.dumps(rows.next_cursor)}}}'
+            )
+
+        return (stream_with_context(generate()), 200, headers)
+
+    def _sort_object(self, value: str | list | None) -> dict:
+        """
+        Return the sort given by a client (the ``_sort`` parameter), see :func:`parse_sort`
+
+        :meta private:
+
+        """
+        return parse_sort(value, self.model) or {"_id": 1}
+
     @error_to_http_handler
     def filtering(self):
         """
@@ -823,19 +1443,69 @@ class Collection:
         query = request.args
         _page = int(query.get("_page", 10))
         _skip = int(query.get("_skip", 0))
+        _cursor = query.get("_cursor")
+        _count = query.get("_count", "exact")
+        _q = query.get("_q")
+        _sort = self._sort_object(query.get("_sort"))
 
         match_filter = multidict_to_filter(query)
 
         log.debug(f"filtering {self.name}/_all with filter={match_filter}")
 
-        result = self._selections["_all"].select(match_filter, _page, _skip)
-
-        log.debug(
-            f"select in {self.name}/_all {match_filter}/{_page} skip {_skip} -> {result}"
+        log.debug(f"select in {self.name}/_all {match_filter}/{_page} skip {_skip}")
+
+        return self._selection_response(
+            self._selections["_all"],
+            match_filter,
+            _page,
+            _skip,
+            _sort,
+            _cursor,
+            _count,
+            _q,
         )
 
+    @error_to_http_handler
+    def http_aggregate(self):
+        """
+        GET HTTP -> aggregation
+
+        ``?status=open&_group=owner&_sum=price&_max=price,mtime``
+
+        :meta private:
+
+        """
+        query = request.args
+        metrics = {
+            operator: ",".join(query.getlist(f"_{operator}"))
+            for operator in AGGREGATE_OPERATORS
+            if f"_{operator}" in query
+        }
+        match_filter = multidict_to_filter(query)
+        result = self._selections["_all"].aggregate(
+            match_filter, query.get("_group"), metrics
+        )
+        log.debug(f"aggregate in {self.name} {match_filter} {metrics}")
         return (json.dumps(result, cls=StrictoEncoder), 200)
 
+    @error_to_http_handler
+    def http_facets(self):
+        """
+        GET HTTP -> values of fields
+
+        ``?status=open&_fields=owner,author.nationality&_limit=10``
+
+        :meta private:
+
+        """
+        query = request.args
+        fields = ",".join(query.getlist("_fields"))
+        _limit = int(query.get("_limit", 0))
+        match_filter = multidict_to_filter(query)
+        result = self._selections["_all"].facets(match_filter, fields, _limit)
+        log.debug(f"facets in {self.name} {match_filter} {fields}")
+        return (json.dumps({"result": result}, cls=StrictoEncoder), 200)
+
     @error_to_http_handler
     def do_selection(self, _selection_name: str):
         """_summary_
@@ -855,15 +1525,27 @@ class Collection:
         query = request.args
         _page = int(query.get("_page", 10))
         _skip = int(query.get("_skip", 0))
+        _cursor = query.get("_cursor")
+        _count = query.get("_count", "exact")
+        _q = query.get("_q")
+        _sort = self._sort_object(query.get("_sort"))
 
         match_filter = multidict_to_filter(query)
-        result = self._selections[_selection_name].select(match_filter, _page, _skip)
 
         log.debug(
-            f"select in {self.name}/{_selection_name} {match_filter}/{_page} skip {_skip} -> {result}"
+            f"select in {self.name}/{_selection_name} {match_filter}/{_page} skip {_skip}"
         )
 
-        return (json.dumps(result, cls=StrictoEncoder), 200)
+        return self._selection_response(
+            self._selections[_selection_name],
+            match_filter,
+            _page,
+            _skip,
+            _sort,
+            _cursor,
+            _count,
+            _q,
+        )
 
     @check_content_type
     @error_to_http_handler
@@ -888,17 +1570,32 @@ class Collection:
         query = request.args
         _page = int(query.get("_page", 10))
         _skip = int(query.get("_skip", 0))
+        _cursor = query.get("_cursor")
+        _count = query.get("_count", "exact")
+        _q = query.get("_q")
+        _sort = self._sort_object(query.get("_sort"))
+
+        if isinstance(request_content, dict) and "_sort" in request_content:
+            _sort = self._sort_object(request_content.pop("_sort"))
 
         match_filter = {}
         for key, v in request_content.items():
             append_path_to_filter(match_filter, key, v)
-        result = self._selections[_selection_name].select(match_filter, _page, _skip)
 
         log.debug(
-            f"select in {self.name}/{_selection_name} {match_filter}/{_page} skip {_skip} -> {result}"
+            f"select in {self.name}/{_selection_name} {match_filter}/{_page} skip {_skip}"
         )
 
-        return (json.dumps(result, cls=StrictoEncoder), 200)
+        return self._selection_response(
+            self._selections[_selection_name],
+            match_filter,
+            _page,
+            _skip,
+            _sort,
+            _cursor,
+            _count,
+            _q,
+        )
 
     @check_content_type
     @error_to_http_handler
@@ -0,0 +1,214 @@
+"""
+The column store module
+
+A :py:class:`ColumnStore` keeps in memory the values of some scalar fields
+of all objects of a collection (see the ``columns`` option of :py:class:`Collection`),
+one column by field, each with a sorted index.
+
+Selections whose filter and sort only use these fields are evaluated on the
+columns (equality and ranges with a binary search, other conditions with the
+predicates of :py:class:`Condition`), and only the objects of the page are read.
+Aggregations and facets on these fields are evaluated on the columns too.
+
+The store is built on first use with one pass on the collection, then
+updated on each object created, saved or deleted (see :func:`Collection.changed`).
+"""
+
+# pylint: disable=wrong-import-position, wrong-import-order
+import bisect
+import sys
+import threading
+from typing import Callable, Iterable
+
+# used for developpement
+sys.path.insert(1, "../../stricto")
+
+from stricto import Float, Int, SSyntaxError, String
+
+from .aggregation import parse_facet_keys
+from .cursor import SORT_ALIASES, readable_field, sort_field
+from .db_connector import sort_key
+from .filter_translator import MISSING, Condition, get_path, is_plain_field
+
+RANGE_OPERATORS = ("$eq", "$gt", "$gte", "$lt", "$lte")
+"""Operators evaluated with a binary search on the sorted index of a column"""
+
+
+def _range_class(field, operand) -> int | None:
+    """Return the class of values of :func:`sort_key` in which a range is searched,
+    or None if the condition must be matched value by value"""
+    if isinstance(field, (Int, Float)):
+        if isinstance(operand, (int, float)) and not isinstance(operand, bool):
+            return 1
+    elif isinstance(field, String) and isinstance(operand, str):
+        return 2
+    return None
+
+
+class ColumnStore:
+    """
+    The values of scalar fields of all objects, by column
+
+    .. code-block:: python
+
+        columns = ColumnStore(model, "pages,year,mtime", loader)
+        columns.select([Condition(["year"], "$gte", 1900)])
+        # { "Book_b2" : { "_id" : "Book_b2", "pages" : 320, "year" : 1902, ... }, ... }
+
+    :param model: the model of the documents
+    :type model: Item
+    :param fields: the fields, ex ``"pages,_meta.mtime"`` (``mtime`` and ``ctime`` are aliases)
+    :type fields: str | list[str]
+    :param loader: a function returning all documents, given the projection
+        (see :func:`projection`), called to build the store
+    :type loader: Callable[[dict], Iterable[dict]]
+    :raise SSyntaxError: a field is not a scalar read as is in the database
+    """
+
+    def __init__(self, model, fields: str | list[str], loader: Callable):
+        """Constructor"""
+        self.fields = []
+        self._types = {}
+        for key in parse_facet_keys(fields):
+            if sort_field(model, key) is None and key in SORT_ALIASES:
+                key = SORT_ALIASES[key]
+            field = readable_field(model, key)
+            if not is_plain_field(field):
+                raise SSyntaxError('Field "{0}" cannot be a column', key)
+            self.fields.append(key)
+            self._types[key] = field
+        self._paths = [key.split(".") for key in self.fields]
+        self._loader: Callable[[dict], Iterable[dict]] = loader
+        self._documents: dict[str, dict] | None = None
+        self._sorted: dict[str, list[tuple]] = {}
+        self._lock = threading.RLock()
+
+    def projection(self) -> dict:
+        """Return the projection to read the fields"""
+        return {"_id": 1} | {path[0]: 1 for path in self._paths}
+
+    def has(self, keys: Iterable[str]) -> bool:
+        """Return True if all keys are columns (or the ``_id``)
+
+        :param keys: the keys, ex ``["year", "_meta.mtime"]``
+        :type keys: Iterable[str]
+        :rtype: bool
+        """
+        return all(key == "_id" or key in self._types for key in keys)
+
+    def _document(self, _id: str, document: dict) -> dict:
+        """Return the document with only the columns"""
+        values = {"_id": _id}
+        for path in self._paths:
+            value = get_path(document, path)
+            if value is MISSING:
+                continue
+            node = values
+            for name in path[:-1]:
+                node = node.setdefault(name, {})
+            node[path[-1]] = value
+        return values
+
+    def _build(self) -> None:
+        """Read all documents (the lock is held)"""
+        self._documents = {}
+        for document in self._loader(self.projection()):
+            _id = str(document["_id"])
+            self._documents[_id] = self._document(_id, document)
+        for key, path in zip(self.fields, self._paths):
+            self._sorted[key] = sorted(
+                (sort_key(get_path(d, path)), _id)
+                for _id, d in self._documents.items()
+                if get_path(d, path) is not MISSING
+            )
+
+    def update(self, _id: str, document: dict | None) -> None:
+        """
+        Keep the new version of a document (``None`` if deleted)
+
+        Nothing is done while the store is not built.
+
+        :param _id: the _id of the document
+        :type _id: str
+        :param document: the document (json format, as saved)
+        :type document: dict | None
+        """
+        with self._lock:
+            if self._documents is None:
+                return
+            old = self._documents.pop(_id, None)
+            new = self._document(_id, document) if document is not None else None
+            for key, path in zip(self.fields, self._paths):
+                column = self._sorted[key]
+                if old is not None and get_path(old, path) is not MISSING:
+                    item = (sort_key(get_path(old, path)), _id)
+                    del column[bisect.bisect_left(column, item)]
+                if new is not None and get_path(new, path) is not MISSING:
+                    bisect.insort(column, (sort_key(get_path(new, path)), _id))
+            if new is not None:
+                self._documents[_id] = new
+
+    def clear(self) -> None:
+        """
+        Forget all documents, the store is built again on next use
+        """
+        with self._lock:
+            self._documents = None
+            self._sorted = {}
+
+    def __len__(self) -> int:
+        return len(self._documents or {})
+
+    def _range(self, condition: Condition, range_class: int) -> list[str]:
+        """Return the _id matching a range condition (the lock is held)"""
+        column = self._sorted[".".join(condition.path)]
+        value = sort_key(condition.operand)
+        start = bisect.bisect_left(column, (range_class,), key=lambda item: item[0])
+        end = bisect.bisect_left(column, (range_class + 1,), key=lambda item: item[0])
+        low = bisect.bisect_left(column, value, start, end, key=lambda item: item[0])
+        high = bisect.bisect_right(column, value, start, end, key=lambda item: item[0])
+        bounds = {
+            "$eq": (low, high),
+            "$gt": (high, end),
+            "$gte": (low, end),
+            "$lt": (start, low),
+            "$lte": (start, high),
+        }[condition.operator]
+        return [_id for _, _id in column[bounds[0] : bounds[1]]]
+
+    def select(self, conditions: list[Condition]) -> dict[str, dict]:
+        """
+        Return the documents (with only the columns) matching all conditions, by _id
+
+        :param conditions: conditions on the columns (see :func:`has`)
+        :type conditions: list[Condition]
+        :rtype: dict[str, dict]
+        """
+        with self._lock:
+            if self._documents is None:
+                self._build()
+            documents = self._documents
+
+            others = []
+            ids = None
+            for condition in conditions:
+                key = ".".join(condition.path)
+                range_class = _range_class(self._types.get(key), condition.operand)
+                if (
+                    condition.operator not in RANGE_OPERATORS
+                    or range_class is None
+                    or condition.default_match
+                ):
+                    others.append(condition)
+                    continue
+                matching = self._range(condition, range_class)
+                ids = set(matching) if ids is None else ids.intersection(matching)
+
+            if ids is None:
+                selected = dict(documents)
+            else:
+                selected = {_id: documents[_id] for _id in ids}
+
+        for condition in others:
+            selected = {_id: d for _id, d in selected.items() if condition.predicate(d)}
+        return selected
@@ -0,0 +1,250 @@
+"""
+The cursor module
+
+A :py:class:`KeysetCursor` is an opaque token given with a page of a selection.
+It contains the sort values and the ``_id`` of the last object of the page.
+Giving it back (``?_cursor=...``) returns the objects after it, without skipping
+objects from the beginning.
+"""
+
+# pylint: disable=wrong-import-position, wrong-import-order, protected-access
+import base64
+import binascii
+import datetime
+import json
+import sys
+from typing import Any
+
+# used for developpement
+sys.path.insert(1, "../../stricto")
+
+from stricto import Dict, List, SSyntaxError
+
+from .db_connector import sort_key
+from .filter_translator import MISSING, get_path
+
+SORT_ALIASES = {"mtime": "_meta.mtime", "ctime": "_meta.ctime"}
+"""Short names usable in a sort given by a client (see :func:`parse_sort`)"""
+
+
+def sort_field(model, key: str):
+    """Return the field of the model for a sort key, ex ``address.town``, or None
+
+    Only fields in sub-:py:class:`Dict` can be reached (references are not followed)
+
+    :param model: the model of the documents
+    :type model: Item
+    :param key: the key
+    :type key: str
+    """
+    field = model
+    for name in key.split("."):
+        if not isinstance(field, Dict) or name not in field._keys:
+            return None
+        field = object.__getattribute__(field, name)
+    return field
+
+
+def readable_field(model, key: str):
+    """Return the field of the model for a key given by a client, ex ``address.town``
+
+    The field must be a value (not a :py:class:`Dict` or a :py:class:`List`)
+    always readable (no ``can_read=`` function on it or its parents).
+
+    :param model: the model of the documents
+    :type model: Item
+    :param key: the key
+    :type key: str
+    :raise SSyntaxError: unknown or unreadable field
+    """
+    field = sort_field(model, key)
+    if field is None or isinstance(field, (Dict, List)):
+        raise SSyntaxError('Unknown field "{0}"', key)
+    node = field
+    while node is not None and node is not model:
+        if node._permissions.get("read", None) not in (None, True):
+            raise SSyntaxError('Field "{0}" cannot be used', key)
+        node = node._parent
+    return field
+
+
+def parse_sort(value: str | list | None, model) -> dict:
+    """Parse a sort given by a client, like ``-mtime,title``
+
+    Keys are separated by commas (or given as a list), a leading ``-`` means descending.
+    Each key must be a readable field of the model (see :func:`readable_field`, ``mtime``
+    and ``ctime`` are aliases of ``_meta.mtime`` and ``_meta.ctime``).
+
+    :param value: the sort, ex ``"-mtime,title"`` or ``["-mtime", "title"]``
+    :type value: str | list | None
+    :param model: the model of the documents
+    :type model: Item
+    :return: the sort object, ex ``{ "_meta.mtime" : -1, "title" : 1 }``
+    :rtype: dict
+    :raise SSyntaxError: invalid sort
+    """
+    sort_object = {}
+    for key in parse_keys(value):
+        direction = -1 if key.startswith("-") else 1
+        key = key.lstrip("+-").strip()
+        if sort_field(model, key) is None and key in SORT_ALIASES:
+            key = SORT_ALIASES[key]
+        readable_field(model, key)
+        if key in sort_object:
+            raise SSyntaxError('Invalid sort "{0}": "{1}" given twice', value, key)
+        sort_object[key] = direction
+    return sort_object
+
+
+def parse_keys(value: str | list | None) -> list[str]:
+    """Return the list of keys given by a client, separated by commas or as a list
+
+    :param value: the keys, ex ``"status,owner"`` or ``["status", "owner"]``
+    :type value: str | list | None
+    :rtype: list[str]
+    :raise SSyntaxError: not a list of strings
+    """
+    if value is None:
+        return []
+    keys = value.split(",") if isinstance(value, str) else value
+    if not isinstance(keys, (list, tuple)) or not all(isinstance(k, str) for k in keys):
+        raise SSyntaxError('Invalid list of fields "{0}"', value)
+    keys = [key.strip() for key in keys]
+    if not all(keys):
+        raise SSyntaxError('Invalid list of fields "{0}"', value)
+    return keys
+
+
+def normalize_sort(sort_object: dict | None) -> list[tuple[str, int]]:
+    """Return the sort as a list of ``( key, direction )``, always ending with ``_id``
+
+    The ``_id`` makes the order total, so a cursor can point to one object.
+
+    :param sort_object: the sort, ex ``{ "name" : 1, "_meta.mtime" : -1 }``
+    :type sort_object: dict | None
+    :rtype: list[tuple[str, int]]
+    """
+    keys = []
+    for key, direction in (sort_object or {}).items():
+        keys.append((key, 1 if direction >= 0 else -1))
+        if key == "_id":
+            return keys
+    keys.append(("_id", 1))
+    return keys
+
+
+def _encode_value(value: Any) -> Any:
+    """Return a json compatible value"""
+    if isinstance(value, datetime.datetime):
+        return {"$date": value.isoformat()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _decode_value(value: Any) -> Any:
+    """Reverse of _encode_value"""
+    if isinstance(value, dict):
+        return datetime.datetime.fromisoformat(value["$date"])
+    return value
+
+
+class KeysetCursor:
+    """The position after an object in a sorted selection
+
+    :param sort: the sort, see :func:`normalize_sort`
+    :type sort: list[tuple[str, int]]
+    :param values: the values of the sort keys for the last object
+    :type values: list
+
+    .. code-block:: python
+
+        cursor = KeysetCursor.from_document([("title", 1), ("_id", 1)], last_document)
+        token = cursor.encode()
+        # ... and for the next page
+        cursor = KeysetCursor.decode(token, [("title", 1), ("_id", 1)])
+
+    """
+
+    def __init__(self, sort: list[tuple[str, int]], values: list):
+        """Constructor"""
+        self.sort = sort
+        self.values = values
+
+    @classmethod
+    def from_document(cls, sort: list[tuple[str, int]], document: dict):
+        """Build the cursor pointing after this raw document
+
+        :param sort: the sort, see :func:`normalize_sort`
+        :type sort: list[tuple[str, int]]
+        :param document: the raw document
+        :type document: dict
+        :rtype: KeysetCursor
+        """
+        values = []
+        for key, _ in sort:
+            value = get_path(document, key.split("."))
+            values.append(None if value is MISSING else value)
+        return cls(sort, values)
+
+    def encode(self) -> str:
+        """Return the opaque token
+
+        :rtype: str
+        """
+        content = json.dumps(
+            [
+                [key, direction, _encode_value(value)]
+                for (key, direction), value in zip(self.sort, self.values)
+            ],
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(content.encode("utf-8")).decode("ascii")
+
+    @classmethod
+    def decode(cls, token: str, sort: list[tuple[str, int]]):
+        """Read a token given by :func:`encode`
+
+        :param token: the token
+        :type token: str
+        :param sort: the sort of the selection, must be the one of the token
+        :type sort: list[tuple[str, int]]
+        :raises SSyntaxError: if the token is invalid or built for another sort
+        :rtype: KeysetCursor
+        """
+        try:
+            content = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+            token_sort = [(key, direction) for key, direction, _ in content]
+            values = [_decode_value(value) for _, _, value in content]
+        except (
+            binascii.Error,
+            UnicodeError,
+            ValueError,
+            TypeError,
+            KeyError,
+        ) as e:
+            raise SSyntaxError('Invalid cursor "{0}"', token) from e
+
+        if token_sort != list(sort):
+            raise SSyntaxError('Cursor "{0}" does not match the sort', token)
+        return cls(sort, values)
+
+    def match(self, document: dict) -> bool:
+        """Return True if the raw document is after the cursor
+
+        Use the same order than :func:`sort_documents`
+
+        :param document: the raw document
+        :type document: dict
+        :rtype: bool
+        """
+        for (key, direction), value in zip(self.sort, self.values):
+            a = sort_key(get_path(document, key.split(".")))
+            b = sort_key(value)
+            if a == b:
+                continue
+            return a > b if direction > 0 else a < b
+        return False
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(zip(self.sort, self.values))!r})"
@@ -2,9 +2,10 @@
 Module providing the Generic() Class for connection on DB
 """
 
+import heapq
 import uuid
 import sys
-from typing import Callable
+from typing import Callable, Iterable
 from abc import ABC, abstractmethod
 
 # used for developpement
@@ -12,21 +13,177 @@ sys.path.insert(1, "../../stricto")
 
 from stricto import Kparse
 
+from .error import DBError, NotFoundError
+from .filter_translator import MISSING, Condition, get_path
+
 KPARSE_MODEL = {"restriction": Callable}
 
 
-class DBConnector(ABC):  # pylint: disable=too-many-instance-attributes
+def sort_key(value) -> tuple:
+    """A key to sort values of any types (None first, then numbers, then strings)
+
+    :param value: the value
+    :rtype: tuple
+    """
+    if value is None or value is MISSING:
+        return (0, 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, str(value))
+
+
+def sort_documents(documents: list[dict], sort_object: dict | None) -> list[dict]:
+    """Sort in place a list of raw documents, like a database does
+
+    Used by connectors without native sort
+
+    :param documents: the raw documents
+    :type documents: list[dict]
+    :param sort_object: the sort, ex ``{ "name" : 1, "_meta.mtime" : -1 }``
+    :type sort_object: dict | None
+    :return: the sorted list
+    :rtype: list[dict]
+    """
+    for key, direction in reversed(list((sort_object or {}).items())):
+        path = key.split(".")
+        documents.sort(
+            key=lambda d, p=path: sort_key(get_path(d, p)), reverse=direction < 0
+        )
+    return documents
+
+
+class _Descending:  # pylint: disable=too-few-public-methods
+    """Reverse the order of a sort key"""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+def document_sort_key(document: dict, sort: list[tuple[str, int]]) -> tuple:
+    """A key to sort raw documents in the same order as :func:`sort_documents`
+
+    :param document: the raw document
+    :type document: dict
+    :param sort: the list of ``( key, direction )``
+    :type sort: list[tuple[str, int]]
+    :rtype: tuple
+    """
+    return tuple(
+        (
+            sort_key(get_path(document, key.split(".")))
+            if direction >= 0
+            else _Descending(sort_key(get_path(document, key.split("."))))
+        )
+        for key, direction in sort
+    )
+
+
+def top_documents(
+    documents: Iterable[dict], sort_object: dict | None, limit: int
+) -> list[dict]:
+    """Return the ``limit`` first documents in the order of the sort, with a heap
+
+    The same as ``sort_documents(documents, sort_object)[:limit]``, without sorting all documents.
+    With ``limit=0``, all documents are sorted.
+
+    :param documents: the raw documents
+    :type documents: Iterable[dict]
+    :param sort_object: the sort, ex ``{ "name" : 1, "_meta.mtime" : -1 }``
+    :type sort_object: dict | None
+    :param limit: the number of documents wanted
+    :type limit: int
+    :rtype: list[dict]
+    """
+    if limit <= 0 or not sort_object:
+        documents = sort_documents(list(documents), sort_object)
+        return documents[:limit] if limit > 0 else documents
+    sort = list(sort_object.items())
+    return heapq.nsmallest(limit, documents, key=lambda d: document_sort_key(d, sort))
+
+
+def page_documents(
+    documents: list[dict],
+    sort_object: dict | None,
+    page_size: int = 0,
+    num_of_element_to_skip: int = 0,
+) -> list[dict]:
+    """Sort and paginate raw documents, like a database does
+
+    Used by connectors without native sort. Only the documents up to the end of the page
+    are sorted (see :func:`top_documents`)
+
+    :param documents: the raw documents
+    :type documents: list[dict]
+    :param sort_object: the sort, ex ``{ "name" : 1, "_meta.mtime" : -1 }``
+    :type sort_object: dict | None
+    :param page_size: number of elements per page (0 = all)
+    :type page_size: int
+    :param num_of_element_to_skip: number of element to skip from beginning
+    :type num_of_element_to_skip: int
+    :rtype: list[dict]
+    """
+    if page_size > 0:
+        limit = num_of_element_to_skip + page_size
+        return top_documents(documents, sort_object, limit)[num_of_element_to_skip:]
+    return sort_documents(documents, sort_object)[num_of_element_to_skip:]
+
+
+def project_document(document: dict, projection: dict | None) -> dict:
+    """Keep only first level keys of the projection, like a database does
+
+    Used by connectors without native projection
+
+    :param document: the raw document
+    :type document: dict
+    :param projection: the projection, ex ``{ "_id" : 1, "title" : 1 }`` (empty = all)
+    :type projection: dict | None
+    :return: the projected document
+    :rtype: dict
+    """
+    if not projection or not isinstance(document, dict):
+        return document
+    return {key: value for key, value in document.items() if projection.get(key)}
+
+
+class DBConnector(
+    ABC
+):  # pylint: disable=too-many-instance-attributes, too-many-public-methods
     """Database Connector
 
     This is the way to save / store / retrieve objects
 
     :param ``**kwargs``:
         - *restriction=* ``func`` --
-          not used yet
+          a native filter added to all queries (mongo only). For all connectors,
+          see the ``read_filter`` of :py:class:`Collection`
 
 
     """
 
+    supported_operators: set[str] = set()
+    """The filter operators this connector can translate into its native query
+    (see :func:`translate_filter`). Other conditions are matched in python"""
+
+    supports_pagination: bool = False
+    """True if :func:`select` handles ``page_size``, ``num_of_element_to_skip`` and ``sort_object``"""
+
+    supports_projection: bool = False
+    """True if :func:`select` handles ``projection``. Otherwise, the whole objects are read"""
+
+    supports_sort: bool = False
+    """True if :func:`select` returns objects in the order of ``sort_object``.
+    Otherwise, the selection sorts them"""
+
     def __init__(self, **kwargs):
         """Constructor"""
 
@@ -94,6 +251,28 @@ class DBConnector(ABC):  # pylint: disable=too-many-instance-attributes
 
         """
 
+    def get_by_ids(self, _ids: list[str]) -> dict[str, dict]:
+        """
+        get objects by _ids in the DB and return them
+
+        By default, call :func:`get_by_id` for each _id.
+        Connectors able to read many objects at once should overwrite it.
+
+        :param _ids: the _ids
+        :type _ids: list[str]
+        :return: The objects (json format) by _id. Objects not found are missing
+        :rtype: dict[str, dict]
+        :raise Error: Raise an error DBError or any db error
+
+        """
+        documents = {}
+        for _id in _ids:
+            try:
+                documents[_id] = self.get_by_id(_id)
+            except NotFoundError:
+                continue
+        return documents
+
     @abstractmethod
     def delete_by_id(self, _id: str):  # pylint: disable=unused-argument
         """The _id to delete on the db
@@ -103,6 +282,55 @@ class DBConnector(ABC):  # pylint: disable=too-many-instance-attributes
         :raise Error: Raise an error DBError or any db error
         """
 
+    def create_many(self, objects: list[dict]) -> list[str]:
+        """Create objects into the DB and return their _ids
+
+        By default, call :func:`create` for each object.
+        Connectors able to write many objects at once should overwrite it.
+
+        :param objects: The objects given (json format)
+        :type objects: list[dict]
+        :return: the _ids, in the same order
+        :rtype: list[str]
+        :raise Error: Raise an error DBError or any db error
+
+        """
+        return [self.create(o) for o in objects]
+
+    def save_many(self, objects: list[tuple[str, dict]]) -> None:
+        """Save objects
+
+        By default, call :func:`save` for each object.
+
+        :param objects: The list of ``( _id, object )``
+        :type objects: list[tuple[str, dict]]
+        :raise Error: Raise an error DBError or any db error
+
+        """
+        for _id, o in objects:
+            self.save(_id, o)
+
+    def delete_many(self, _ids: list[str]) -> list[str]:
+        """Delete objects
+
+        By default, call :func:`delete_by_id` for each _id. The value returned by
+        :func:`delete_by_id` is not used (connectors return nothing, or a bool):
+        an object is deleted unless :func:`delete_by_id` raises an error,
+        which stops the deletion of the next ones.
+
+        :param _ids: The _ids to delete
+        :type _ids: list[str]
+        :return: the _ids of deleted objects (calls to :func:`delete_by_id` without error)
+        :rtype: list[str]
+        :raise Error: Raise an error DBError or any db error
+
+        """
+        deleted = []
+        for _id in _ids:
+            self.delete_by_id(_id)
+            deleted.append(_id)
+        return deleted
+
     @abstractmethod
     def select(
         self,
@@ -127,3 +355,183 @@ class DBConnector(ABC):  # pylint: disable=too-many-instance-attributes
         :raise Error: Raise an error DBError or any db error
 
         """
+
+    def select_iter(
+        self,
+        select_filter,
+        projection: dict = {},
+        page_size: int = 0,
+        num_of_element_to_skip: int = 0,
+        sort_object: dict = {},
+    ):  # pylint: disable=too-many-arguments, too-many-positional-arguments
+        """
+        Same as :func:`select`, but return an iterator on dicts
+
+        By default, iterate on the list returned by :func:`select`.
+        Connectors able to read objects one by one should overwrite it.
+
+        :raise Error: Raise an error DBError or any db error
+        """
+        result = self.select(
+            select_filter, projection, page_size, num_of_element_to_skip, sort_object
+        )
+        if not isinstance(result, list):
+            raise DBError("select return a database error (not a list)")
+        return iter(result)
+
+    def can_translate(self, condition: Condition) -> bool:
+        """
+        Return True if the condition can be translated into the native query
+
+        By default, check if all operators of the condition are in :py:attr:`supported_operators`
+
+        :param condition: The condition extracted from the filter
+        :type condition: Condition
+        :rtype: bool
+        """
+        return condition.operators() <= self.supported_operators
+
+    def translate_filter(
+        self, conditions: list[Condition], select_filter=None
+    ):  # pylint: disable=unused-argument
+        """
+        Translate conditions into the native filter, combined with ``select_filter``
+
+        Must be overwritten by connectors declaring :py:attr:`supported_operators`
+
+        :param conditions: The conditions accepted by :func:`can_translate` (all must match)
+        :type conditions: list[Condition]
+        :param select_filter: A native filter to combine with (depends on DB types)
+        :return: the native filter to give to :func:`select`
+
+        """
+        return select_filter
+
+    def translate_cursor(
+        self, cursor, select_filter=None
+    ):  # pylint: disable=unused-argument
+        """
+        Translate a :py:class:`KeysetCursor` into the native filter, combined with ``select_filter``
+
+        The filter must select objects after the cursor, in the order of ``cursor.sort``.
+        By default, return ``None`` : the cursor is not translatable and
+        is checked in python on each object.
+
+        :param cursor: The cursor
+        :type cursor: KeysetCursor
+        :param select_filter: A native filter to combine with (depends on DB types)
+        :return: the native filter to give to :func:`select`, or ``None``
+
+        """
+        return None
+
+    def count(self, select_filter) -> int:  # pylint: disable=unused-argument
+        """
+        Return the number of objects matching the filter
+
+        By default, do a :func:`select` and count the result.
+
+        :param select_filter: The filter for selection (depends on DB types)
+        :return: the number of objects
+        :rtype: int
+        :raise Error: Raise an error DBError or any db error
+
+        """
+        return len(self.select(select_filter, {}, 0, 0, {}))
+
+    def aggregate(self, select_filter, aggregation) -> list[dict]:
+        """
+        Return the groups of objects matching the filter (see :py:class:`Aggregation`)
+
+        By default, read the objects one by one with :func:`select_iter`
+        (only fields used if :py:attr:`supports_projection`)
+        and evaluate the aggregation in one pass.
+
+        :param select_filter: The filter for selection (depends on DB types)
+        :param aggregation: The aggregation
+        :type aggregation: Aggregation
+        :return: the groups
+        :rtype: list[dict]
+        :raise Error: Raise an error DBError or any db error
+
+        """
+        projection = aggregation.projection() if self.supports_projection else {}
+        for document in self.select_iter(select_filter, projection, 0, 0, {}):
+            aggregation.add(document)
+        return aggregation.result()
+
+    def facets(self, select_filter, facets) -> dict[str, list[dict]]:
+        """
+        Return the distinct values of fields of objects matching the filter,
+        with their counts (see :py:class:`Facets`)
+
+        By default, evaluated in one pass like :func:`aggregate`
+
+        :param select_filter: The filter for selection (depends on DB types)
+        :param facets: The facets
+        :type facets: Facets
+        :return: the values by field
+        :rtype: dict[str, list[dict]]
+        :raise Error: Raise an error DBError or any db error
+
+        """
+        return self.aggregate(select_filter, facets)
+
+    def text_search(  # pylint: disable=unused-argument
+        self, select_filter, query: str, fields: list[str]
+    ) -> list[tuple[str, float]] | None:
+        """
+        Return the ``( _id, score )`` of objects matching the filter and the text query
+        on these fields, the most relevant first
+
+        By default, return ``None`` : the database has no text search, and the
+        :py:class:`SearchIndex` of the :py:class:`Collection` is used.
+
+        :param select_filter: The filter for selection (depends on DB types)
+        :param query: the text query
+        :type query: str
+        :param fields: the searchable fields
+        :type fields: list[str]
+        :rtype: list[tuple[str, float]] | None
+        :raise Error: Raise an error DBError or any db error
+
+        """
+        return None
+
+    def state(self):
+        """
+        Return a value changing with each write in the database, whatever the
+        process writing, or ``None`` if unknown (used in ``ETag`` of selections)
+
+        By default, the number of objects and their last ``_meta.mtime``,
+        read with :func:`select_iter` (only ``_meta`` if :py:attr:`supports_projection`).
+
+        :return: the state (dumped by :func:`make_etag`)
+        :raise Error: Raise an error DBError or any db error
+
+        """
+        projection = {"_id": 1, "_meta": 1} if self.supports_projection else {}
+        count = 0
+        mtime = None
+        for document in self.select_iter(
+            self.translate_filter([], None), projection, 0, 0, {}
+        ):
+            count += 1
+            value = get_path(document, ["_meta", "mtime"])
+            if value is not MISSING and value is not None:
+                mtime = value if mtime is None else max(mtime, value)
+        return (count, mtime)
+
+    def estimate_count(self, select_filter) -> int:
+        """
+        Return an estimation of the number of objects matching the filter
+
+        Used by selections with ``_count=estimate``. By default, call :func:`count`
+
+        :param select_filter: The filter for selection (depends on DB types)
+        :return: the number of objects
+        :rtype: int
+        :raise Error: Raise an error DBError or any db error
+
+        """
+        return self.count(select_filter)
@@ -0,0 +1,477 @@
+"""
+Module providing the append-only log DB like
+"""
+
+# pylint: disable=logging-fstring-interpolation
+import json
+import mmap
+import os
+import sys
+import threading
+
+# used for developpement
+sys.path.insert(1, "../../stricto")
+
+from stricto import Kparse
+
+from .codec import json_default
+from .db_connector import DBConnector, page_documents, project_document
+from .error import NotFoundError, DBError
+from .filter_translator import ALL_OPERATORS, Condition, compile_conditions
+from .log import log_system
+
+KPARSE_MODEL = {
+    "path": {"type": str, "default": "/tmp/backo.log"},
+    "fsync": {"type": bool, "default": False},
+    "compact_ratio": {"type": float, "default": 0.5},
+    "compact_min_size": {"type": int, "default": 1024 * 1024},
+}
+
+PUT = "p"
+DELETE = "d"
+
+log = log_system.get_or_create_logger("log")
+
+
+def _encode_record(operation: str, _id: str, o: dict | None) -> bytes:
+    """Return a record of the log (one json line)"""
+    return (
+        json.dumps([operation, _id, o], default=json_default, separators=(",", ":"))
+        + "\n"
+    ).encode("utf-8")
+
+
+class DBLogConnector(DBConnector):  # pylint: disable=too-many-instance-attributes
+    """Append-only log database Connector
+
+    All objects of a collection are stored in one file, as a log of records
+    (one json line per record). :func:`save` and :func:`delete_by_id` append a record.
+    An index ``_id`` -> position of the last record is rebuilt at startup,
+    and objects are read with ``mmap``.
+
+    Old records are removed by :func:`compact`, started in background when
+    the log contains too much dead records. If it fails, the error is logged
+    and raised by the next write (or by :func:`close`).
+    Only one connector (in one process) must use a log file.
+
+    :param ``**kwargs``:
+        - *path=* ``str`` -- The log file
+        - *fsync=* ``bool`` -- fsync the file after each write (default False)
+        - *compact_ratio=* ``float`` -- Compact when dead records are more than this
+          part of the file (default 0.5)
+        - *compact_min_size=* ``int`` -- Do not compact if dead records are less than
+          this size in bytes (default 1Mb)
+
+    .. code-block:: python
+
+        db = DBLogConnector(path="/var/books.log")
+
+    """
+
+    supported_operators = ALL_OPERATORS
+    supports_pagination = True
+    supports_projection = True
+    supports_sort = True
+
+    def __init__(self, **kwargs):
+        """constructor"""
+
+        options = Kparse(kwargs, KPARSE_MODEL)
+
+        self._path = options.get("path")
+        self._fsync = options.get("fsync")
+        self._compact_ratio = options.get("compact_ratio")
+        self._compact_min_size = options.get("compact_min_size")
+
+        self._lock = threading.RLock()
+        # _id -> ( offset, length ) of the last put record
+        self._index: dict[str, tuple[int, int]] = {}
+        self._size = 0
+        self._dead_size = 0
+        self._file = None
+        self._mmap = None
+        self._compaction = None
+        # raised by the next write (or close) if the compaction in background failed
+        self._compaction_error = None
+        # changed by drop(), to cancel a running compaction
+        self._generation = 0
+
+        DBConnector.__init__(self, **kwargs)
+
+        if self.restriction_filter is not None:
+            raise DBError(
+                "Restriction filter not implemented for log (use read_filter of the collection)"
+            )
+
+        directory = os.path.dirname(self._path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        try:
+            self._open()
+        except OSError as e:
+            raise DBError('Cannot open log "{0}"', self._path) from e
+
+    def _open(self) -> None:
+        """Open the log and rebuild the index"""
+        self._close()
+        self._file = open(self._path, mode="a+b")  # pylint: disable=consider-using-with
+        self._index = {}
+        self._dead_size = 0
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._remap()
+        end = self._scan(0, self._size, self._index)
+        if end != self._size:
+            # The last record is incomplete (crash while writing)
+            log.warning(f"truncate {self._path} at {end} (incomplete record)")
+            self._file.truncate(end)
+            self._size = end
+            self._remap()
+
+    def _close(self) -> None:
+        """Close the log"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _remap(self) -> None:
+        """Map the whole file"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._size > 0:
+            self._mmap = mmap.mmap(
+                self._file.fileno(), self._size, access=mmap.ACCESS_READ
+            )
+
+    def _scan(self, start: int, end: int, index: dict) -> int:
+        """Read records from start to end and apply them to the index
+
+        :return: the position after the last complete record
+        """
+        position = start
+        while position < end:
+            newline = self._mmap.find(b"\n", position, end)
+            if newline < 0:
+                break
+            try:
+                operation, _id, _ = json.loads(self._mmap[position:newline])
+            except ValueError:
+                break
+            length = newline + 1 - position
+            old = index.pop(_id, None)
+            if old is not None:
+                self._dead_size += old[1]
+            if operation == PUT:
+                index[_id] = (position, length)
+            else:
+                self._dead_size += length
+            position = newline + 1
+        return position
+
+    def _append(self, records: list[tuple[str, str, dict | None]]) -> None:
+        """Append records ``( operation, _id, object )`` with one write, and update the index"""
+        data = [_encode_record(operation, _id, o) for operation, _id, o in records]
+        with self._lock:
+            self._raise_compaction_error()
+            position = self._size
+            self._file.write(b"".join(data))
+            self._file.flush()
+            if self._fsync:
+                os.fsync(self._file.fileno())
+            self._size += sum(len(record) for record in data)
+
+            for (operation, _id, _), record in zip(records, data):
+                old = self._index.pop(_id, None)
+                if old is not None:
+                    self._dead_size += old[1]
+                if operation == PUT:
+                    self._index[_id] = (position, len(record))
+                else:
+                    self._dead_size += len(record)
+                position += len(record)
+        self._compact_if_needed()
+
+    def _read_record(self, position: tuple[int, int]) -> bytes:
+        """Return the record at this position (the lock must be held)"""
+        offset, length = position
+        if self._mmap is None or offset + length > len(self._mmap):
+            self._remap()
+        return self._mmap[offset : offset + length]
+
+    def _compact_if_needed(self) -> None:
+        """Start a compaction in background if there is too much dead records"""
+        with self._lock:
+            if self._dead_size < self._compact_min_size:
+                return
+            if self._dead_size < self._compact_ratio * self._size:
+                return
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            self._compaction = threading.Thread(
+                target=self._compact_in_background, daemon=True
+            )
+            self._compaction.start()
+
+    def _compact_in_background(self) -> None:
+        """Compact, and keep the error for the next write (see :func:`_raise_compaction_error`)"""
+        try:
+            self.compact()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            log.error(f"compaction of {self._path} failed: {e!r}")
+            with self._lock:
+                self._compaction_error = e
+
+    def _raise_compaction_error(self) -> None:
+        """Raise the error of the last compaction in background, once"""
+        with self._lock:
+            error, self._compaction_error = self._compaction_error, None
+        if error is None:
+            return
+        if isinstance(error, DBError):
+            raise error
+        raise DBError('Error while compact "{0}"', self._path) from error
+
+    def close(self) -> None:
+        """
+        Wait for the compaction in background, and close the log
+
+        :raise DBError: the compaction in background failed
+        """
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+        with self._lock:
+            self._close()
+        self._raise_compaction_error()
+
+    def compact(self) -> None:
+        """Rewrite the log with only the last record of each object
+
+        Writes are allowed during the compaction, except at the end
+        when records written meanwhile are copied and the file is replaced.
+        """
+        tmp_path = self._path + ".compact"
+        with self._lock:
+            end = self._size
+            generation = self._generation
+            positions = sorted(self._index.items(), key=lambda item: item[1][0])
+
+        log.debug(f"compact {self._path} ({len(positions)} objects)")
+        try:
+            index = {}
+            new_size = 0
+            with open(tmp_path, mode="wb") as outfile:
+                if end > 0:
+                    with (
+                        open(self._path, mode="rb") as infile,
+                        mmap.mmap(
+                            infile.fileno(), end, access=mmap.ACCESS_READ
+                        ) as source,
+                    ):
+                        for _id, (offset, length) in positions:
+                            outfile.write(source[offset : offset + length])
+                            index[_id] = (new_size, length)
+                            new_size += length
+
+                with self._lock:
+                    if generation != self._generation:
+                        # dropped meanwhile
+                        outfile.close()
+                        os.unlink(tmp_path)
+                        return
+
+                    # Records written during the compaction
+                    if self._size > end:
+                        self._remap()
+                        outfile.write(self._mmap[end : self._size])
+                    outfile.flush()
+                    os.fsync(outfile.fileno())
+                    tail_size = self._size - end
+                    os.replace(tmp_path, self._path)
+
+                    self._close()
+                    self._file = open(  # pylint: disable=consider-using-with
+                        self._path, mode="a+b"
+                    )
+                    self._index = index
+                    self._dead_size = 0
+                    self._size = new_size + tail_size
+                    self._remap()
+                    self._scan(new_size, self._size, self._index)
+        except OSError as e:
+            raise DBError('Error while compact "{0}"', self._path) from e
+
+    def drop(self) -> None:
+        """See :func:`DBConnector.drop`"""
+        with self._lock:
+            self._file.truncate(0)
+            self._generation += 1
+            self._size = 0
+            self._dead_size = 0
+            self._index = {}
+            self._remap()
+
+    def save(self, _id: str, o: dict) -> None:
+        """See :func:`DBConnector.save`"""
+        log.debug(f"save {_id} ")
+        self._append([(PUT, _id, o)])
+
+    def create(self, o: dict) -> str:
+        """See :func:`DBConnector.create`"""
+        _id = o["_id"]
+        log.debug(f"create {_id} ")
+
+        with self._lock:
+            if _id in self._index:
+                raise DBError('_id "{0}" already exist in "{1}"', _id, self._path)
+            self._append([(PUT, _id, o)])
+        return _id
+
+    def create_many(self, objects: list[dict]) -> list[str]:
+        """See :func:`DBConnector.create_many`
+
+        All records are appended with one write
+        """
+        _ids = [o["_id"] for o in objects]
+        with self._lock:
+            seen = set()
+            for _id in _ids:
+                if _id in self._index or _id in seen:
+                    raise DBError('_id "{0}" already exist in "{1}"', _id, self._path)
+                seen.add(_id)
+            self._append([(PUT, o["_id"], o) for o in objects])
+        return _ids
+
+    def save_many(self, objects: list[tuple[str, dict]]) -> None:
+        """See :func:`DBConnector.save_many`
+
+        All records are appended with one write
+        """
+        self._append([(PUT, _id, o) for _id, o in objects])
+
+    def delete_many(self, _ids: list[str]) -> list[str]:
+        """See :func:`DBConnector.delete_many`
+
+        All records are appended with one write
+        """
+        with self._lock:
+            to_delete = [_id for _id in dict.fromkeys(_ids) if _id in self._index]
+            self._append([(DELETE, _id, None) for _id in to_delete])
+        return to_delete
+
+    def get_by_id(self, _id: str) -> dict:
+        """See :func:`DBConnector.get_by_id`"""
+        log.debug(f"read {_id} ")
+        with self._lock:
+            position = self._index.get(_id)
+            if position is None:
+                raise NotFoundError('_id "{0}" not found in "{1}"', _id, self._path)
+            record = self._read_record(position)
+        return json.loads(record)[2]
+
+    def get_by_ids(self, _ids: list[str]) -> dict[str, dict]:
+        """See :func:`DBConnector.get_by_ids`"""
+        log.debug(f"read {len(_ids)} objects")
+        with self._lock:
+            records = {
+                _id: self._read_record(self._index[_id])
+                for _id in _ids
+                if _id in self._index
+            }
+        return {_id: json.loads(record)[2] for _id, record in records.items()}
+
+    def delete_by_id(self, _id: str) -> bool:
+        """See :func:`DBConnector.delete_by_id`"""
+        log.debug(f"delete {_id}")
+        with self._lock:
+            if _id not in self._index:
+                return False
+            self._append([(DELETE, _id, None)])
+        return True
+
+    def _documents(self, select_filter) -> list[dict]:
+        """Return documents matching the filter (a list of conditions)"""
+        conditions = list(select_filter) if isinstance(select_filter, list) else []
+        try:
+            with self._lock:
+                records = [self._read_record(p) for p in self._index.values()]
+            documents = [json.loads(record)[2] for record in records]
+        except (OSError, ValueError) as e:
+            raise DBError('Error while select in "{0}"', self._path) from e
+        return list(filter(compile_conditions(conditions), documents))
+
+    def select(
+        self,
+        select_filter,
+        projection={},
+        page_size=0,
+        num_of_element_to_skip=0,
+        sort_object={"_id": 1},
+    ) -> list:
+        """See :func:`DBConnector.select`
+
+        ``select_filter`` is a list of conditions (see :func:`translate_filter`)
+        matched on all objects. Then objects are sorted, paginated and projected.
+
+        """
+        log.debug(
+            "select(%r, %r).sort(%r).skip(%r).limit(%r)",
+            select_filter,
+            projection,
+            sort_object,
+            num_of_element_to_skip,
+            page_size,
+        )
+        result_list = page_documents(
+            self._documents(select_filter),
+            sort_object,
+            page_size,
+            num_of_element_to_skip,
+        )
+        return [project_document(d, projection) for d in result_list]
+
+    def count(self, select_filter) -> int:
+        """See :func:`DBConnector.count`"""
+        if not select_filter:
+            return len(self._index)
+        return len(self._documents(select_filter))
+
+    def estimate_count(self, select_filter) -> int:
+        """See :func:`DBConnector.estimate_count`
+
+        Return the number of objects, the filter is not used
+        """
+        return len(self._index)
+
+    def state(self):
+        """See :func:`DBConnector.state`
+
+        The size of the log (each write appends a record)
+        """
+        with self._lock:
+            return (self._generation, self._size)
+
+    def translate_filter(self, conditions: list[Condition], select_filter=None):
+        """See :func:`DBConnector.translate_filter`
+
+        ``select_filter`` is not used.
+
+        :return: the list of conditions
+        :rtype: list[Condition]
+        """
+        return list(conditions)
+
+    def translate_cursor(self, cursor, select_filter=None):
+        """See :func:`DBConnector.translate_cursor`
+
+        The cursor is matched as a condition
+
+        :return: the list of conditions
+        :rtype: list
+        """
+        conditions = list(select_filter) if isinstance(select_filter, list) else []
+        return conditions + [cursor]
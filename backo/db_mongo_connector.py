@@ -5,7 +5,7 @@ Module providing the mongo DB like
 import sys
 
 # pylint: disable=logging-fstring-interpolation
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne
 from pymongo.uri_parser import parse_uri
 from bson.objectid import ObjectId
 
@@ -16,7 +16,9 @@ from stricto import Kparse
 
 from .db_connector import DBConnector
 from .error import DBError, NotFoundError
+from .filter_translator import ALL_OPERATORS, Condition
 from .log import log_system, LogLevel
+from .search_index import document_tokens, tokenize
 
 log = log_system.get_or_create_logger("mongo")
 log.setLevel(LogLevel.INFO)
@@ -25,7 +27,9 @@ log.setLevel(LogLevel.INFO)
 KPARSE_MODEL = {"connection_string*": str, "collection": {"type": str, "default": ""}}
 
 
-class DBMongoConnector(DBConnector):  # pylint: disable=too-many-instance-attributes
+class DBMongoConnector(
+    DBConnector
+):  # pylint: disable=too-many-instance-attributes, too-many-public-methods
     """Mongodb database Connector
 
     This is the way to save / store / retrieve objects in a mongodb
@@ -37,6 +41,11 @@ class DBMongoConnector(DBConnector):  # pylint: disable=too-many-instance-attrib
 
     """
 
+    supported_operators = ALL_OPERATORS
+    supports_pagination = True
+    supports_projection = True
+    supports_sort = True
+
     def __init__(self, **kwargs):
         """constructor"""
 
@@ -51,6 +60,7 @@ class DBMongoConnector(DBConnector):  # pylint: disable=too-many-instance-attrib
 
         self._database = self._db.get_default_database()
         self._collection = self._database[self._collection_name]
+        self._text_index = None
         DBConnector.__init__(self, **kwargs)
 
     def connect(self):
@@ -105,6 +115,115 @@ class DBMongoConnector(DBConnector):  # pylint: disable=too-many-instance-attrib
         )
         return {"$and": [rfilter, select]}
 
+    def can_translate(self, condition: Condition) -> bool:
+        """See :func:`DBConnector.can_translate`
+
+        ``_id`` are ``ObjectId`` in mongo, and can only be compared for equality
+        """
+        if condition.path == ["_id"]:
+            return condition.operator in ("$eq", "$ne") and ObjectId.is_valid(
+                condition.operand
+            )
+        return DBConnector.can_translate(self, condition)
+
+    def translate_filter(self, conditions: list[Condition], select_filter=None):
+        """See :func:`DBConnector.translate_filter`
+
+        :return: a mongodb filter
+        :rtype: dict
+        """
+        clauses = [self._translate_condition(condition) for condition in conditions]
+        if select_filter:
+            clauses.insert(0, select_filter)
+
+        if not clauses:
+            return select_filter
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+    def translate_cursor(self, cursor, select_filter=None):
+        """See :func:`DBConnector.translate_cursor`
+
+        For a sort ``( a, 1 ), ( _id, 1 )`` the filter is
+        ``a > va OR ( a == va AND _id > vid )``. ``None`` and missing values
+        are sorted first (like in mongo)
+
+        :return: a mongodb filter
+        :rtype: dict
+        """
+        clauses = []
+        equals = []
+        for (key, direction), value in zip(cursor.sort, cursor.values):
+            if key == "_id":
+                if not ObjectId.is_valid(value):
+                    return None
+                value = ObjectId(value)
+
+            after = self._after_clause(key, direction, value)
+            if after is not None:
+                clauses.append({"$and": equals + [after]} if equals else after)
+            equals.append({key: value} if value is not None else {key: None})
+
+        after_cursor = {"$or": clauses} if clauses else {"_id": {"$exists": False}}
+        if select_filter:
+            return {"$and": [select_filter, after_cursor]}
+        return after_cursor
+
+    def _after_clause(self, key: str, direction: int, value) -> dict | None:
+        """The filter for values after value in this direction, or None if no values are after"""
+        if value is None:
+            return {key: {"$ne": None}} if direction > 0 else None
+        if direction > 0:
+            return {key: {"$gt": value}}
+        return {"$or": [{key: {"$lt": value}}, {key: None}]}
+
+    def _translate_condition(self, condition: Condition) -> dict:
+        """Translate a condition into a mongodb filter"""
+        field = ".".join(condition.path)
+        operand = condition.operand
+        if condition.path == ["_id"]:
+            operand = ObjectId(operand)
+
+        clause = self._translate_operator(field, condition.operator, operand)
+
+        # A missing field in mongo is read with its default value in the Item
+        matches_missing = self._operator_matches_missing(condition.operator, operand)
+        if condition.default_match and not matches_missing:
+            return {"$or": [clause, {field: {"$exists": False}}]}
+        if not condition.default_match and matches_missing:
+            return {"$and": [{field: {"$exists": True}}, clause]}
+        return clause
+
+    def _translate_operator(self, field: str, operator: str, operand) -> dict:
+        """Translate an operator on a field into a mongodb filter"""
+        if operator == "$and":
+            return {
+                "$and": [self._translate_operator(field, o, v) for (o, v) in operand]
+            }
+        if operator == "$not":
+            return {"$nor": [self._translate_operator(field, operand[0], operand[1])]}
+        if operator == "$contains":
+            sub = operand if isinstance(operand, tuple) else ("$eq", operand)
+            sub_clause = self._translate_operator(field, sub[0], sub[1])
+            return {field: {"$elemMatch": sub_clause[field]}}
+        if operator == "$reg":
+            # stricto use re.match(), which match only at the beginning
+            return {field: {"$regex": f"^(?:{operand})"}}
+        return {field: {operator: operand}}
+
+    def _operator_matches_missing(self, operator: str, operand) -> bool:
+        """Return True if the mongodb translation matches documents without the field"""
+        if operator == "$eq":
+            return operand is None
+        if operator == "$ne":
+            return operand is not None
+        if operator == "$and":
+            return all(self._operator_matches_missing(o, v) for (o, v) in operand)
+        if operator == "$not":
+            return not self._operator_matches_missing(operand[0], operand[1])
+        return False
+
     def generate_id(self, o):  # pylint: disable=unused-argument
         """Do not create _id by ourself. mongo will do the job"""
         return "666"
@@ -138,6 +257,73 @@ class DBMongoConnector(DBConnector):  # pylint: disable=too-many-instance-attrib
         log.debug("create %r", result.inserted_id)
         return str(result.inserted_id)
 
+    def create_many(self, objects: list[dict]) -> list[str]:
+        """See :func:`DBConnector.create_many`
+
+        One ``insert_many()``
+        """
+        if not objects:
+            return []
+        for o in objects:
+            o.pop("_id", None)
+        try:
+            result = self._collection.insert_many(objects, ordered=True)
+        except Exception as e:
+            raise DBError(
+                'Mongo connection error while "{0}.insert_many()"',
+                self._collection_name,
+            ) from e
+
+        log.debug("create_many %r", result.inserted_ids)
+        return [str(_id) for _id in result.inserted_ids]
+
+    def save_many(self, objects: list[tuple[str, dict]]) -> None:
+        """See :func:`DBConnector.save_many`
+
+        One ``bulk_write()`` of ``ReplaceOne``
+        """
+        if not objects:
+            return
+        requests = []
+        for _id, o in objects:
+            o["_id"] = ObjectId(_id)
+            requests.append(ReplaceOne({"_id": ObjectId(_id)}, o, upsert=True))
+        try:
+            result = self._collection.bulk_write(requests, ordered=True)
+        except Exception as e:
+            raise DBError(
+                'Mongo connection error while "{0}.bulk_write()"',
+                self._collection_name,
+            ) from e
+
+        log.debug("save_many %r", result.bulk_api_result)
+
+    def delete_many(self, _ids: list[str]) -> list[str]:
+        """See :func:`DBConnector.delete_many`
+
+        The existing _ids are read with ``find()``, then deleted with one
+        ``delete_many()`` with ``$in``
+        """
+        if not _ids:
+            return []
+        try:
+            db_filter = self._combine_with_restriction_filter(
+                {"_id": {"$in": [ObjectId(_id) for _id in _ids]}}
+            )
+            existing = [o["_id"] for o in self._collection.find(db_filter, {"_id": 1})]
+            if not existing:
+                return []
+            self._collection.delete_many(
+                self._combine_with_restriction_filter({"_id": {"$in": existing}})
+            )
+        except Exception as e:
+            raise DBError(
+                'Mongo connection error while "{0}.delete_many()"',
+                self._collection_name,
+            ) from e
+
+        return [str(_id) for _id in existing]
+
     def get_by_id(self, _id: str):
         """See :func:`DBConnector.get_by_id`"""
         log.debug(f"try to read {_id} ")
@@ -156,6 +342,29 @@ class DBMongoConnector(DBConnector):  # pylint: disable=too-many-instance-attrib
         o["_id"] = _id
         return o
 
+    def get_by_ids(self, _ids: list[str]) -> dict[str, dict]:
+        """See :func:`DBConnector.get_by_ids`
+
+        Objects are read with one ``$in`` query
+        """
+        log.debug(f"try to read {len(_ids)} objects")
+        object_ids = [ObjectId(_id) for _id in _ids if ObjectId.is_valid(_id)]
+        if not object_ids:
+            return {}
+        try:
+            db_filter = self._combine_with_restriction_filter(
+                {"_id": {"$in": object_ids}}
+            )
+            documents = list(self._collection.find(db_filter))
+        except Exception as e:
+            raise DBError(
+                'Mongo connection error while "{0}.find()"', self._collection_name
+            ) from e
+
+        for o in documents:
+            o["_id"] = str(o["_id"])
+        return {o["_id"]: o for o in documents}
+
     def delete_by_id(self, _id: str):
         """See :func:`DBConnector.delete_by_id`"""
         log.debug("try to delete %r", _id)
@@ -185,6 +394,31 @@ class DBMongoConnector(DBConnector):  # pylint: disable=too-many-instance-attrib
         :type select_filter: dict ( a mongodb fliter syntax )
 
 
+        """
+        return list(
+            self.select_iter(
+                select_filter,
+                projection,
+                page_size,
+                num_of_element_to_skip,
+                sort_object,
+            )
+        )
+
+    def select_iter(
+        self,
+        select_filter,
+        projection={},
+        page_size=0,
+        num_of_element_to_skip=0,
+        sort_object={"_id": 1},
+    ):
+        """See :func:`DBConnector.select_iter`
+
+        Objects are read from the mongo cursor while iterating.
+
+        :param select_filter: The filter for selection
+        :type select_filter: dict ( a mongodb fliter syntax )
         """
         log.debug(
             "select(%r, %r).sort(%r).skip(%r).limit(%r)",
@@ -197,14 +431,178 @@ class DBMongoConnector(DBConnector):  # pylint: disable=too-many-instance-attrib
 
         db_filter = self._combine_with_restriction_filter(select_filter)
         try:
-            result_list = list(
-                self._collection.find(db_filter, projection)
-                .sort(sort_object)
-                .skip(num_of_element_to_skip)
-                .limit(page_size)
+            rows = self._collection.find(db_filter, projection)
+            # An empty sort is refused by mongo (any order is fine)
+            if sort_object:
+                rows = rows.sort(sort_object)
+            yield from rows.skip(num_of_element_to_skip).limit(page_size)
+        except Exception as e:
+            raise DBError(
+                'Mongo connection error while "{0}.find()"', self._collection_name
+            ) from e
+
+    def count(self, select_filter) -> int:
+        """See :func:`DBConnector.count`
+
+        :param select_filter: The filter for selection
+        :type select_filter: dict ( a mongodb fliter syntax )
+        """
+        db_filter = self._combine_with_restriction_filter(select_filter or {})
+        try:
+            return self._collection.count_documents(db_filter)
+        except Exception as e:
+            raise DBError(
+                'Mongo connection error while "{0}.count_documents()"',
+                self._collection_name,
+            ) from e
+
+    def aggregate(self, select_filter, aggregation) -> list[dict]:
+        """See :func:`DBConnector.aggregate`
+
+        The aggregation is done by mongo (``$match`` then ``$group``)
+
+        :param select_filter: The filter for selection
+        :type select_filter: dict ( a mongodb fliter syntax )
+        """
+        group = {
+            "_id": (
+                {
+                    f"g{i}": {"$ifNull": [f"${key}", None]}
+                    for i, key in enumerate(aggregation.group_by)
+                }
+                if aggregation.group_by
+                else None
+            ),
+            "count": {"$sum": 1},
+        }
+        for i, (operator, key) in enumerate(aggregation.metrics):
+            group[f"m{i}"] = {f"${operator}": f"${key}"}
+        pipeline = [
+            {"$match": self._combine_with_restriction_filter(select_filter or {})},
+            {"$group": group},
+        ]
+        log.debug("aggregate(%r)", pipeline)
+
+        try:
+            rows = list(self._collection.aggregate(pipeline))
+        except Exception as e:
+            raise DBError(
+                'Mongo connection error while "{0}.aggregate()"', self._collection_name
+            ) from e
+
+        groups = []
+        for row in rows:
+            values = tuple(
+                (row["_id"] or {}).get(f"g{i}")
+                for i in range(len(aggregation.group_by))
+            )
+            group = aggregation.new_group(
+                tuple(str(v) if isinstance(v, ObjectId) else v for v in values)
+            )
+            group["count"] = row["count"]
+            for i, (operator, key) in enumerate(aggregation.metrics):
+                group[operator][key] = row[f"m{i}"]
+            groups.append(group)
+        return aggregation.result(groups)
+
+    def facets(self, select_filter, facets) -> dict[str, list[dict]]:
+        """See :func:`DBConnector.facets`
+
+        One ``$group`` by field, done by mongo
+
+        :param select_filter: The filter for selection
+        :type select_filter: dict ( a mongodb fliter syntax )
+        """
+        return facets.result(
+            [
+                self.aggregate(select_filter, aggregation)
+                for aggregation in facets.aggregations
+            ]
+        )
+
+    def text_search(
+        self, select_filter, query: str, fields: list[str]
+    ) -> list[tuple[str, float]]:
+        """See :func:`DBConnector.text_search`
+
+        Done by mongo with a ``$text`` query, on a text index created on first use.
+        As with the :py:class:`SearchIndex`, objects must contain all words of
+        the query : each word is a phrase for mongo (so all must be found), and
+        words are checked again in the fields returned.
+
+        :param select_filter: The filter for selection
+        :type select_filter: dict ( a mongodb fliter syntax )
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        text_filter = {"$text": {"$search": " ".join(f'"{t}"' for t in tokens)}}
+        if select_filter:
+            text_filter = {"$and": [select_filter, text_filter]}
+        db_filter = self._combine_with_restriction_filter(text_filter)
+        log.debug("text_search(%r)", db_filter)
+        try:
+            if self._text_index != fields:
+                self._collection.create_index(
+                    [(key, "text") for key in fields], name="backo_text_search"
+                )
+                self._text_index = fields
+            projection = {"_id": 1, "score": {"$meta": "textScore"}}
+            projection |= {key: 1 for key in fields}
+            rows = self._collection.find(db_filter, projection).sort(
+                [("score", {"$meta": "textScore"}), ("_id", 1)]
             )
+            words = set(tokens)
+            paths = [key.split(".") for key in fields]
+            return [
+                (str(row["_id"]), row["score"])
+                for row in rows
+                if words <= set(document_tokens(row, paths))
+            ]
         except Exception as e:
             raise DBError(
                 'Mongo connection error while "{0}.find()"', self._collection_name
             ) from e
-        return result_list
+
+    def state(self):
+        """See :func:`DBConnector.state`
+
+        The number of objects and their last ``_meta.mtime``, computed by mongo
+        """
+        pipeline = [
+            {"$match": self._combine_with_restriction_filter({})},
+            {
+                "$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "mtime": {"$max": "$_meta.mtime"},
+                }
+            },
+        ]
+        try:
+            rows = list(self._collection.aggregate(pipeline))
+        except Exception as e:
+            raise DBError(
+                'Mongo connection error while "{0}.aggregate()"', self._collection_name
+            ) from e
+        if not rows:
+            return (0, None)
+        return (rows[0]["count"], rows[0]["mtime"])
+
+    def estimate_count(self, select_filter) -> int:
+        """See :func:`DBConnector.estimate_count`
+
+        Without filter, use the collection metadata (``estimated_document_count``)
+
+        :param select_filter: The filter for selection
+        :type select_filter: dict ( a mongodb fliter syntax )
+        """
+        if select_filter or self.restriction_filter is not None:
+            return self.count(select_filter)
+        try:
+            return self._collection.estimated_document_count()
+        except Exception as e:
+            raise DBError(
+                'Mongo connection error while "{0}.estimated_document_count()"',
+                self._collection_name,
+            ) from e
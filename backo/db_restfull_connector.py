@@ -5,6 +5,7 @@ Module providing a generic REST API based database connector.
 # pylint: disable=logging-fstring-interpolation
 
 from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
 import requests
 from requests.adapters import HTTPAdapter
@@ -28,6 +29,7 @@ KPARSE_MODEL = {
     "password": {"type": str | None, "default": None},
     "auth_token": {"type": str | None, "default": None},
     "restriction": {"type": Callable, "default": None},
+    "max_parallel": {"type": int, "default": 8},
 }
 
 KPARSE_MODEL_ENDPOINT = {
@@ -59,6 +61,7 @@ class DBRestfullConnector(DBConnector):
             - *password=* ``str`` -- Password for basic authentication (optional)
             - *auth_token=* ``str`` -- Bearer token for authentication (optional)
             - *restriction=* ``Callable`` -- Restriction filter function (not implemented)
+            - *max_parallel=* ``int`` -- Maximum number of parallel requests (see :func:`get_by_ids`)
 
         """
         options = Kparse(kwargs, KPARSE_MODEL)
@@ -71,13 +74,16 @@ class DBRestfullConnector(DBConnector):
         self._username = options.get("username")
         self._password = options.get("password")
         self._auth_token = options.get("auth_token")
+        self._max_parallel = max(options.get("max_parallel"), 1)
 
         # Store the API base URI for use in endpoint methods
         self._uri = self._build_uri()
 
         self._session = requests.Session()
         retry = Retry(connect=3, backoff_factor=0.5)
-        adapter = HTTPAdapter(max_retries=retry)
+        adapter = HTTPAdapter(
+            max_retries=retry, pool_maxsize=max(self._max_parallel, 10)
+        )
         self._session.mount(self._uri, adapter)
         self._session.mount(self._uri, adapter)
 
@@ -443,6 +449,32 @@ class DBRestfullConnector(DBConnector):
 
         return data
 
+    def get_by_ids(self, _ids: list[str]) -> dict[str, dict]:
+        """See :func:`DBConnector.get_by_ids`
+
+        Objects are read with :func:`get_by_id`, at most ``max_parallel`` requests at a time
+
+        """
+        _ids = list(dict.fromkeys(_ids))
+        if len(_ids) <= 1 or self._max_parallel == 1:
+            return super().get_by_ids(_ids)
+
+        def get_or_none(_id):
+            try:
+                return self.get_by_id(_id)
+            except NotFoundError:
+                return None
+
+        with ThreadPoolExecutor(
+            max_workers=min(self._max_parallel, len(_ids))
+        ) as executor:
+            documents = executor.map(get_or_none, _ids)
+            return {
+                _id: document
+                for _id, document in zip(_ids, documents)
+                if document is not None
+            }
+
     @abstractmethod
     def select(
         self,
@@ -457,7 +489,8 @@ class DBRestfullConnector(DBConnector):
         Select from filter in the DB and return a list of dicts, with pagination (TO implement in subclasses)
 
         :param select_filter: The filter for selection (depends on DB types)
-        :param projection: The list of elements we want for each object
+        :param projection: Not used, endpoints send whole objects
+            (:py:attr:`supports_projection` is False)
         :type projection: dict
         :param page_size: number of elements per page
         :type page_size: int
@@ -510,22 +543,20 @@ class DBRestfullConnector(DBConnector):
         if data is None:
             return []
 
+        if isinstance(data, dict):
+            if "result" in data and isinstance(data["result"], list):
+                data = data["result"]
+
         if isinstance(data, list):
             if hasattr(self, "_clean_data"):
-                r = []
-                for d in data:
-                    r.append(self._clean_data(d))
-                return r
+                data = [self._clean_data(d) for d in data]
             return data
 
-        if isinstance(data, dict):
-            if "result" in data and isinstance(data["result"], list):
-                if hasattr(self, "_clean_data"):
-                    r = []
-                    for d in data["result"]:
-                        r.append(self._clean_data(d))
-                    return r
+        raise DBError('select endpoint "{0}" return non understandable dict', endpoint)
 
-                return data["result"]
+    def state(self):
+        """See :func:`DBConnector.state`
 
-        raise DBError('select endpoint "{0}" return non understandable dict', endpoint)
+        Writes done by others on the remote api are unknown (selections have no ``ETag``)
+        """
+        return None
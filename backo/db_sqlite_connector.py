@@ -0,0 +1,489 @@
+"""
+Module providing the Sqlite DB like
+"""
+
+# pylint: disable=logging-fstring-interpolation
+import itertools
+import json
+import re
+import sqlite3
+import sys
+import threading
+
+# used for developpement
+sys.path.insert(1, "../../stricto")
+
+from stricto import Kparse
+
+from .codec import json_default
+from .db_connector import DBConnector, project_document, sort_key
+from .error import NotFoundError, DBError
+from .filter_translator import ALL_OPERATORS, Condition, match_value
+from .log import log_system
+
+KPARSE_MODEL = {
+    "path": {"type": str, "default": "/tmp/backo.sqlite"},
+    "table": {"type": str, "default": "backo"},
+    "indexes": {"type": list, "default": []},
+}
+
+# json_type() of values python compares with numbers / strings
+NUMBER_TYPES = "('integer','real','true','false')"
+TEXT_TYPES = "('text')"
+
+SQL_OPERATORS = {
+    "$eq": "=",
+    "$gt": ">",
+    "$gte": ">=",
+    "$lt": "<",
+    "$lte": "<=",
+}
+
+MAX_VARIABLES = 500
+"""The maximum number of ``?`` in a request (sqlite limits them)"""
+
+log = log_system.get_or_create_logger("sqlite")
+
+
+def _regexp(pattern: str, value) -> bool:
+    """The REGEXP function (``re.match``, like stricto)"""
+    return match_value(value, "$reg", pattern)
+
+
+def _json_path(path: list[str]) -> str:
+    """Return the sqlite json path, ex ``$."address"."town"``"""
+    return "$" + "".join(f'."{key}"' for key in path)
+
+
+def _types_of(operand) -> str | None:
+    """Return the json types comparable with the operand, or None"""
+    if isinstance(operand, (bool, int, float)):
+        return NUMBER_TYPES
+    if isinstance(operand, str):
+        return TEXT_TYPES
+    return None
+
+
+class DBSqliteConnector(DBConnector):
+    """Sqlite database Connector
+
+    Objects are stored as json in a table ``( id, doc )``.
+    Filters, sort and pagination are done in sql with ``json_extract()``.
+    The database is in WAL mode, so readers don't wait for writers.
+
+    :param ``**kwargs``:
+        - *path=* ``str`` -- The sqlite database file
+        - *table=* ``str`` -- The table for this collection
+        - *indexes=* ``list[str]`` -- Paths to index, ex ``[ "name", "address.town" ]``
+
+    .. code-block:: python
+
+        db = DBSqliteConnector(path="/var/backo.sqlite", table="books", indexes=["author"])
+
+    """
+
+    supported_operators = ALL_OPERATORS
+    supports_pagination = True
+    supports_projection = True
+    supports_sort = True
+
+    def __init__(self, **kwargs):
+        """constructor"""
+
+        options = Kparse(kwargs, KPARSE_MODEL)
+
+        self._path = options.get("path")
+        self._table = options.get("table")
+        self._indexes = options.get("indexes")
+        # One connection per thread
+        self._local = threading.local()
+
+        DBConnector.__init__(self, **kwargs)
+
+        if self.restriction_filter is not None:
+            raise DBError(
+                "Restriction filter not implemented for sqlite (use read_filter of the collection)"
+            )
+
+        if not re.match(r"^\w+$", self._table):
+            raise DBError('Invalid table name "{0}"', self._table)
+        for index in self._indexes:
+            if not isinstance(index, str) or not re.match(r"^\w+(\.\w+)*$", index):
+                raise DBError('Invalid index "{0}"', index)
+
+        self._create_table()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the connection of this thread"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            try:
+                connection = sqlite3.connect(self._path, isolation_level=None)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                connection.create_function("REGEXP", 2, _regexp, deterministic=True)
+            except sqlite3.Error as e:
+                raise DBError('Cannot open sqlite database "{0}"', self._path) from e
+            self._local.connection = connection
+        return connection
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Execute a sql request"""
+        log.debug(f"{sql} {params!r}")
+        try:
+            return self._connection().execute(sql, params)
+        except sqlite3.Error as e:
+            raise DBError('Sqlite error on table "{0}"', self._table) from e
+
+    def _create_table(self) -> None:
+        """Create the table and indexes"""
+        self._execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} "
+            "(id TEXT PRIMARY KEY, doc TEXT NOT NULL)"
+        )
+        for index in self._indexes:
+            name = f"{self._table}_{index.replace('.', '_')}"
+            path = _json_path(index.split("."))
+            self._execute(
+                f"CREATE INDEX IF NOT EXISTS {name} "
+                f"ON {self._table} (json_extract(doc, '{path}'))"
+            )
+
+    def drop(self) -> None:
+        """See :func:`DBConnector.drop`"""
+        self._execute(f"DELETE FROM {self._table}")
+
+    def save(self, _id: str, o: dict) -> None:
+        """See :func:`DBConnector.save`"""
+        log.debug(f"save {_id} ")
+        self._execute(
+            f"INSERT OR REPLACE INTO {self._table} (id, doc) VALUES (?, ?)",
+            (_id, json.dumps(o, default=json_default)),
+        )
+
+    def create(self, o: dict) -> str:
+        """See :func:`DBConnector.create`"""
+        _id = o["_id"]
+        log.debug(f"create {_id} ")
+        try:
+            self._connection().execute(
+                f"INSERT INTO {self._table} (id, doc) VALUES (?, ?)",
+                (_id, json.dumps(o, default=json_default)),
+            )
+        except sqlite3.IntegrityError as e:
+            raise DBError(
+                '_id "{0}" already exist in table "{1}"', _id, self._table
+            ) from e
+        except sqlite3.Error as e:
+            raise DBError('Sqlite error on table "{0}"', self._table) from e
+        return _id
+
+    def _execute_many(self, sql: str, params: list) -> int:
+        """Execute a sql request for each parameters, in one transaction"""
+        connection = self._connection()
+        try:
+            connection.execute("BEGIN")
+            try:
+                cursor = connection.executemany(sql, params)
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        except sqlite3.IntegrityError as e:
+            raise DBError('Duplicate _id in table "{0}"', self._table) from e
+        except sqlite3.Error as e:
+            raise DBError('Sqlite error on table "{0}"', self._table) from e
+        return cursor.rowcount
+
+    def create_many(self, objects: list[dict]) -> list[str]:
+        """See :func:`DBConnector.create_many`
+
+        One transaction. Nothing is created if an _id already exists
+        """
+        log.debug(f"create_many {len(objects)} objects")
+        self._execute_many(
+            f"INSERT INTO {self._table} (id, doc) VALUES (?, ?)",
+            [(o["_id"], json.dumps(o, default=json_default)) for o in objects],
+        )
+        return [o["_id"] for o in objects]
+
+    def save_many(self, objects: list[tuple[str, dict]]) -> None:
+        """See :func:`DBConnector.save_many`
+
+        One transaction
+        """
+        self._execute_many(
+            f"INSERT OR REPLACE INTO {self._table} (id, doc) VALUES (?, ?)",
+            [(_id, json.dumps(o, default=json_default)) for _id, o in objects],
+        )
+
+    def delete_many(self, _ids: list[str]) -> list[str]:
+        """See :func:`DBConnector.delete_many`
+
+        One request by batch of :py:data:`MAX_VARIABLES` _ids, returning the deleted ones
+        """
+        deleted = []
+        for batch in itertools.batched(dict.fromkeys(_ids), MAX_VARIABLES):
+            marks = ",".join("?" * len(batch))
+            rows = self._execute(
+                f"DELETE FROM {self._table} WHERE id IN ({marks}) RETURNING id", batch
+            ).fetchall()
+            deleted.extend(_id for (_id,) in rows)
+        return deleted
+
+    def get_by_id(self, _id: str) -> dict:
+        """See :func:`DBConnector.get_by_id`"""
+        log.debug(f"read {_id} ")
+        row = self._execute(
+            f"SELECT doc FROM {self._table} WHERE id = ?", (_id,)
+        ).fetchone()
+        if row is None:
+            raise NotFoundError('_id "{0}" not found in table "{1}"', _id, self._table)
+        return json.loads(row[0])
+
+    def get_by_ids(self, _ids: list[str]) -> dict[str, dict]:
+        """See :func:`DBConnector.get_by_ids`"""
+        log.debug(f"read {len(_ids)} objects")
+        documents = {}
+        for batch in itertools.batched(dict.fromkeys(_ids), MAX_VARIABLES):
+            marks = ",".join("?" * len(batch))
+            rows = self._execute(
+                f"SELECT id, doc FROM {self._table} WHERE id IN ({marks})", batch
+            ).fetchall()
+            documents.update((_id, json.loads(doc)) for _id, doc in rows)
+        return documents
+
+    def delete_by_id(self, _id: str) -> bool:
+        """See :func:`DBConnector.delete_by_id`"""
+        log.debug(f"delete {_id}")
+        cursor = self._execute(f"DELETE FROM {self._table} WHERE id = ?", (_id,))
+        return cursor.rowcount == 1
+
+    def select(
+        self,
+        select_filter,
+        projection={},
+        page_size=0,
+        num_of_element_to_skip=0,
+        sort_object={"_id": 1},
+    ) -> list:
+        """See :func:`DBConnector.select`
+
+        :param select_filter: The filter for selection
+        :type select_filter: tuple ( a sql where clause and its parameters ) or None
+
+        """
+        return list(
+            self.select_iter(
+                select_filter,
+                projection,
+                page_size,
+                num_of_element_to_skip,
+                sort_object,
+            )
+        )
+
+    def select_iter(
+        self,
+        select_filter,
+        projection={},
+        page_size=0,
+        num_of_element_to_skip=0,
+        sort_object={"_id": 1},
+    ):
+        """See :func:`DBConnector.select_iter`
+
+        Rows are read from sqlite while iterating
+        """
+        where, params = self._where(select_filter)
+        sql = f"SELECT doc FROM {self._table}{where}"
+
+        sql += self._order_by(sort_object)
+
+        if page_size > 0 or num_of_element_to_skip > 0:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [page_size if page_size > 0 else -1]
+            params.append(num_of_element_to_skip)
+
+        cursor = self._execute(sql, params)
+        for (doc,) in cursor:
+            yield project_document(json.loads(doc), projection)
+
+    def count(self, select_filter) -> int:
+        """See :func:`DBConnector.count`"""
+        where, params = self._where(select_filter)
+        return self._execute(
+            f"SELECT COUNT(*) FROM {self._table}{where}", params
+        ).fetchone()[0]
+
+    def state(self):
+        """See :func:`DBConnector.state`
+
+        The number of objects and their last ``_meta.mtime``, in one request
+        """
+        mtime, _ = self._expressions(["_meta", "mtime"])
+        return tuple(
+            self._execute(
+                f"SELECT COUNT(*), MAX({mtime}) FROM {self._table}"
+            ).fetchone()
+        )
+
+    def _where(self, select_filter) -> tuple[str, list]:
+        """Return the where clause and its parameters"""
+        if not select_filter:
+            return "", []
+        sql, params = select_filter
+        return f" WHERE {sql}", list(params)
+
+    def _order_by(self, sort_object: dict | None) -> str:
+        """Return the order by clause, sorting like :func:`sort_documents`"""
+        order = []
+        for key, direction in (sort_object or {}).items():
+            way = "DESC" if direction < 0 else "ASC"
+            value, json_type = self._expressions(key.split("."))
+            order.append(f"{self._sort_class(json_type)} {way}")
+            order.append(f"{value} {way}")
+        if not order:
+            return ""
+        return " ORDER BY " + ", ".join(order)
+
+    def _expressions(self, path: list[str]) -> tuple[str, str]:
+        """Return sql expressions for the value and the json type of a path"""
+        if path == ["_id"]:
+            return "id", "'text'"
+        json_path = _json_path(path)
+        return (
+            f"json_extract(doc, '{json_path}')",
+            f"json_type(doc, '{json_path}')",
+        )
+
+    def _sort_class(self, json_type: str) -> str:
+        """The sql expression ordering types like :func:`sort_key`"""
+        return (
+            f"CASE WHEN {json_type} IS NULL OR {json_type} = 'null' THEN 0 "
+            f"WHEN {json_type} IN ('integer','real') THEN 1 "
+            f"WHEN {json_type} = 'text' THEN 2 ELSE 3 END"
+        )
+
+    def translate_filter(self, conditions: list[Condition], select_filter=None):
+        """See :func:`DBConnector.translate_filter`
+
+        :return: a sql where clause and its parameters
+        :rtype: tuple[str, list]
+        """
+        clauses = []
+        params = []
+        if select_filter:
+            clauses.append(f"({select_filter[0]})")
+            params.extend(select_filter[1])
+
+        for condition in conditions:
+            _, json_type = self._expressions(condition.path)
+            clause = self._translate_operator(
+                condition.path, condition.operator, condition.operand, params
+            )
+            # A missing field is read with its default value in the Item
+            if condition.default_match:
+                clause = f"({json_type} IS NULL OR {clause})"
+            else:
+                clause = f"({json_type} IS NOT NULL AND {clause})"
+            clauses.append(clause)
+
+        if not clauses:
+            return select_filter
+        return (" AND ".join(clauses), params)
+
+    # pylint: disable-next=too-many-return-statements
+    def _translate_operator(
+        self, path: list[str] | None, operator: str, operand, params: list
+    ) -> str:
+        """Translate an operator on a present value, never returns NULL
+
+        ``path`` is None for items of a list (see ``$contains``)
+        """
+        if path is None:
+            value, json_type = "_each.value", "_each.type"
+        else:
+            value, json_type = self._expressions(path)
+
+        if operator == "$and":
+            return (
+                "("
+                + " AND ".join(
+                    self._translate_operator(path, o, v, params) for (o, v) in operand
+                )
+                + ")"
+            )
+        if operator == "$not":
+            return "NOT " + self._translate_operator(
+                path, operand[0], operand[1], params
+            )
+        if operator == "$contains":
+            sub = operand if isinstance(operand, tuple) else ("$eq", operand)
+            sub_clause = self._translate_operator(None, sub[0], sub[1], params)
+            return (
+                f"({json_type} = 'array' AND EXISTS (SELECT 1 FROM "
+                f"json_each(doc, '{_json_path(path)}') AS _each WHERE {sub_clause}))"
+            )
+        if operator == "$ne":
+            return "NOT " + self._translate_operator(path, "$eq", operand, params)
+        if operator == "$eq" and operand is None:
+            return f"({json_type} = 'null')"
+        if operator == "$reg":
+            params.append(operand)
+            return f"({json_type} = 'text' AND {value} REGEXP ?)"
+
+        types = _types_of(operand)
+        if types is None:
+            # python raises an error, and stricto returns False
+            return "(0)"
+        params.append(operand)
+        return f"({json_type} IN {types} AND {value} {SQL_OPERATORS[operator]} ?)"
+
+    # pylint: disable-next=too-many-locals
+    def translate_cursor(self, cursor, select_filter=None):
+        """See :func:`DBConnector.translate_cursor`
+
+        For a sort ``( a, 1 ), ( _id, 1 )`` the filter is
+        ``a > va OR ( a == va AND _id > vid )``, comparing first the
+        type of values (see :func:`sort_key`)
+
+        :return: a sql where clause and its parameters
+        :rtype: tuple[str, list]
+        """
+        clauses = []
+        equals = []
+        params = []
+        equals_params = []
+        for (key, direction), value in zip(cursor.sort, cursor.values):
+            rank = sort_key(value)[0]
+            if rank == 3:
+                # bool, list... are not sorted like in python
+                return None
+            expression, json_type = self._expressions(key.split("."))
+            sort_class = self._sort_class(json_type)
+            compare = ">" if direction > 0 else "<"
+
+            after = f"{sort_class} {compare} {rank}"
+            after_params = []
+            if rank != 0:
+                after = (
+                    f"({after} OR ({sort_class} = {rank} AND {expression} {compare} ?))"
+                )
+                after_params.append(value)
+            clauses.append("(" + " AND ".join(equals + [after]) + ")")
+            params.extend(equals_params + after_params)
+
+            if rank == 0:
+                equals.append(f"{sort_class} = 0")
+            else:
+                equals.append(f"({sort_class} = {rank} AND {expression} = ?)")
+                equals_params.append(value)
+
+        after_cursor = (" OR ".join(clauses), params)
+        if select_filter:
+            return (
+                f"({select_filter[0]}) AND ({after_cursor[0]})",
+                list(select_filter[1]) + after_cursor[1],
+            )
+        return after_cursor
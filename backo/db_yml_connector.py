@@ -3,21 +3,28 @@ Module providing the Yml DB like
 """
 
 # pylint: disable=logging-fstring-interpolation
+import copy
 import os
 import sys
-import re
-import yaml
 
 # used for developpement
 sys.path.insert(1, "../../stricto")
 
 from stricto import Kparse
 
-from .db_connector import DBConnector
+from .codec import get_codec
+from .db_connector import DBConnector, page_documents, project_document
 from .error import NotFoundError, DBError
+from .filter_translator import ALL_OPERATORS, Condition
 from .log import log_system
+from .yml_catalog import YmlCatalog
 
-KPARSE_MODEL = {"path": {"type": str, "default": "/tmp"}}
+KPARSE_MODEL = {
+    "path": {"type": str, "default": "/tmp"},
+    "codec": {"type": str, "default": "yaml"},
+    "catalog": {"type": bool, "default": False},
+    "indexes": {"type": list, "default": []},
+}
 
 log = log_system.get_or_create_logger("yml")
 
@@ -26,19 +33,44 @@ class DBYmlConnector(DBConnector):  # pylint: disable=too-many-instance-attribut
     """Yaml files database Connector
 
     This is the way to save / store / retrieve objects in yaml files
+    (or json / msgpack files, one file per object)
 
     :param ``**kwargs``:
         - *path=* ``str`` -- The directory to store yaml files
+        - *codec=* ``str`` -- The format of files : ``yaml`` (default), ``json``
+          or ``msgpack`` (see :py:mod:`backo.codec`). Use :func:`convert_directory`
+          to change the format of an existing directory
+        - *catalog=* ``bool`` -- Keep parsed files in memory (see :py:class:`YmlCatalog`).
+          A file is parsed again only if its mtime changed, and filters are done on this catalog
+        - *indexes=* ``list[str]`` -- With catalog, paths to index, ex ``[ "name", "address.town" ]``
 
+    .. code-block:: python
+
+        db = DBYmlConnector(path="/var/books", catalog=True, indexes=["author"])
+        db = DBYmlConnector(path="/var/authors", codec="json")
 
     """
 
+    supports_pagination = True
+    supports_projection = True
+    supports_sort = True
+
     def __init__(self, **kwargs):
         """constructor"""
 
         options = Kparse(kwargs, KPARSE_MODEL)
 
         self._path = options.get("path")
+        self._codec = get_codec(options.get("codec"))
+
+        # ( directory mtime, number of files ) for estimate_count()
+        self._count_cache = None
+
+        self._catalog = None
+        if options.get("catalog") is True:
+            self._catalog = YmlCatalog(self._path, self._codec, options.get("indexes"))
+            # Conditions are matched on the catalog (see translate_filter)
+            self.supported_operators = ALL_OPERATORS
 
         DBConnector.__init__(self, **kwargs)
 
@@ -49,58 +81,151 @@ class DBYmlConnector(DBConnector):  # pylint: disable=too-many-instance-attribut
             raise DBError('Yaml path "{0}" is not a directory', self._path)
 
         if self.restriction_filter is not None:
-            raise DBError("Restriction filter not implemented for yml")
+            raise DBError(
+                "Restriction filter not implemented for yml (use read_filter of the collection)"
+            )
 
     def drop(self) -> None:
         """See :func:`DBConnector.drop`"""
         dirs = os.listdir(self._path)
         for file in dirs:
-            if re.match(r".*\.yml$", file):
+            if self._codec.is_file(file):
                 os.unlink(os.path.join(self._path, file))
+        self._count_cache = None
+        if self._catalog is not None:
+            self._catalog.clear()
+
+    def _read_file(self, filename: str) -> dict:
+        """Read and parse a file"""
+        return self._codec.read(filename)
 
     def save(self, _id: str, o: dict) -> None:
         """See :func:`DBConnector.save`"""
         log.debug(f"save {_id} ")
-        filename = os.path.join(self._path, _id + ".yml")
+        filename = self._codec.filename(self._path, _id)
 
         log.debug(f"try to save {filename}")
-        with open(filename, mode="w", encoding="utf-8") as outfile:
-            yaml.dump(o, outfile, default_flow_style=False)
+        self._codec.write(filename, o)
+        if self._catalog is not None:
+            self._catalog.put(_id, copy.deepcopy(o))
 
     def create(self, o: dict) -> str:
         """See :func:`DBConnector.create`"""
         _id = o["_id"]
 
         log.debug(f"create {_id} ")
-        filename = os.path.join(self._path, _id + ".yml")
+        filename = self._codec.filename(self._path, _id)
 
         if os.path.exists(filename):
             raise DBError('_id "{0}" already exist in path "{1}"', _id, self._path)
 
         log.debug(f"try to create {filename}")
-        with open(filename, mode="w", encoding="utf-8") as outfile:
-            yaml.dump(o, outfile, default_flow_style=False)
+        self._codec.write(filename, o)
+        self._count_cache = None
+        if self._catalog is not None:
+            self._catalog.put(_id, copy.deepcopy(o))
         return _id
 
+    def _existing_ids(self) -> set[str]:
+        """Return _ids of all files (one directory read)"""
+        try:
+            return {
+                self._codec.id_of(file)
+                for file in os.listdir(self._path)
+                if self._codec.is_file(file)
+            }
+        except OSError as e:
+            raise DBError('Error while reading path "{0}"', self._path) from e
+
+    def create_many(self, objects: list[dict]) -> list[str]:
+        """See :func:`DBConnector.create_many`
+
+        The directory is read once to check _ids, before writing any file
+        """
+        existing = self._existing_ids()
+        _ids = []
+        for o in objects:
+            _id = o["_id"]
+            if _id in existing:
+                raise DBError('_id "{0}" already exist in path "{1}"', _id, self._path)
+            existing.add(_id)
+            _ids.append(_id)
+
+        log.debug(f"create_many {len(_ids)} objects")
+        for o in objects:
+            self._codec.write(self._codec.filename(self._path, o["_id"]), o)
+            if self._catalog is not None:
+                self._catalog.put(o["_id"], copy.deepcopy(o))
+        self._count_cache = None
+        return _ids
+
+    def delete_many(self, _ids: list[str]) -> list[str]:
+        """See :func:`DBConnector.delete_many`
+
+        The directory is read once
+        """
+        existing = self._existing_ids()
+        deleted = []
+        for _id in _ids:
+            if _id not in existing:
+                continue
+            existing.discard(_id)
+            os.remove(self._codec.filename(self._path, _id))
+            if self._catalog is not None:
+                self._catalog.remove(_id)
+            deleted.append(_id)
+        self._count_cache = None
+        return deleted
+
     def get_by_id(self, _id: str) -> dict:
         """See :func:`DBConnector.get_by_id`"""
         log.debug(f"read {_id} ")
 
-        filename = os.path.join(self._path, _id + ".yml")
+        filename = self._codec.filename(self._path, _id)
+        if self._catalog is not None:
+            data_loaded = self._catalog.get(_id)
+            if data_loaded is None:
+                raise NotFoundError(
+                    '_id "{0}" not found in path "{1}"', _id, self._path
+                )
+            return copy.deepcopy(data_loaded)
+
         if not os.path.isfile(filename):
             raise NotFoundError('_id "{0}" not found in path "{1}"', _id, self._path)
 
         log.debug(f"try to read {filename}")
-        with open(filename, mode="r", encoding="utf-8") as stream:
-            data_loaded = yaml.safe_load(stream)
-            return data_loaded
+        return self._read_file(filename)
+
+    def get_by_ids(self, _ids: list[str]) -> dict[str, dict]:
+        """See :func:`DBConnector.get_by_ids`
+
+        The directory is read once (or the catalog is used)
+        """
+        log.debug(f"read {len(_ids)} objects")
+        if self._catalog is not None:
+            documents = {_id: self._catalog.get(_id) for _id in _ids}
+            return {
+                _id: copy.deepcopy(document)
+                for _id, document in documents.items()
+                if document is not None
+            }
+
+        existing = self._existing_ids()
+        return {
+            _id: self._read_file(self._codec.filename(self._path, _id))
+            for _id in dict.fromkeys(_ids)
+            if _id in existing
+        }
 
     def delete_by_id(self, _id: str) -> bool:
         """See :func:`DBConnector.delete_by_id`"""
         log.debug(f"delete {_id}")
-        filename = os.path.join(self._path, _id + ".yml")
+        filename = self._codec.filename(self._path, _id)
         if os.path.isfile(filename):
             os.remove(filename)
+            self._count_cache = None
+            if self._catalog is not None:
+                self._catalog.remove(_id)
             return True
         return False
 
@@ -114,7 +239,10 @@ class DBYmlConnector(DBConnector):  # pylint: disable=too-many-instance-attribut
     ) -> list:
         """See :func:`DBConnector.select`
 
-        Params ``select_filter`` and ``projection`` are not used
+        Without catalog, param ``select_filter`` is not used and all files are read.
+        With catalog, ``select_filter`` is a list of conditions (see :func:`translate_filter`)
+        matched on documents of the catalog.
+        Then documents are sorted, paginated and projected.
 
         """
         log.debug(
@@ -126,19 +254,111 @@ class DBYmlConnector(DBConnector):  # pylint: disable=too-many-instance-attribut
             page_size,
         )
 
+        if self._catalog is not None:
+            result_list = page_documents(
+                self._catalog_documents(select_filter),
+                sort_object,
+                page_size,
+                num_of_element_to_skip,
+            )
+            return [copy.deepcopy(project_document(d, projection)) for d in result_list]
+
         try:
             result_list = []
             dirs = os.listdir(self._path)
             for file in dirs:
-                if not re.match(r".*\.yml$", file):
+                if not self._codec.is_file(file):
                     continue
-
-                with open(
-                    os.path.join(self._path, file), mode="r", encoding="utf-8"
-                ) as stream:
-                    data_loaded = yaml.safe_load(stream)
-                result_list.append(data_loaded)
+                result_list.append(self._read_file(os.path.join(self._path, file)))
         except Exception as e:
             raise DBError('Error while select in path "{0}"', self._path) from e
 
-        return result_list
+        result_list = page_documents(
+            result_list, sort_object, page_size, num_of_element_to_skip
+        )
+        return [project_document(d, projection) for d in result_list]
+
+    def count(self, select_filter) -> int:
+        """See :func:`DBConnector.count`
+
+        Without catalog, param ``select_filter`` is not used. Count files without reading them.
+        """
+        if self._catalog is not None:
+            return len(self._catalog_documents(select_filter))
+
+        try:
+            return len(
+                [file for file in os.listdir(self._path) if self._codec.is_file(file)]
+            )
+        except Exception as e:
+            raise DBError('Error while count in path "{0}"', self._path) from e
+
+    def estimate_count(self, select_filter) -> int:
+        """See :func:`DBConnector.estimate_count`
+
+        Without catalog, param ``select_filter`` is not used. The number of files is cached
+        until the directory changes (its mtime)
+        """
+        if self._catalog is not None:
+            return self.count(select_filter)
+
+        try:
+            mtime = os.stat(self._path).st_mtime_ns
+        except OSError as e:
+            raise DBError('Error while count in path "{0}"', self._path) from e
+
+        if self._count_cache is None or self._count_cache[0] != mtime:
+            self._count_cache = (mtime, self.count(select_filter))
+        return self._count_cache[1]
+
+    def state(self):
+        """See :func:`DBConnector.state`
+
+        The number of files and their last modification time, without reading them
+        """
+        count = 0
+        mtime = 0
+        try:
+            with os.scandir(self._path) as entries:
+                for entry in entries:
+                    if self._codec.is_file(entry.name):
+                        count += 1
+                        mtime = max(mtime, entry.stat().st_mtime_ns)
+        except OSError as e:
+            raise DBError('Error while reading path "{0}"', self._path) from e
+        return (count, mtime)
+
+    def translate_filter(self, conditions: list[Condition], select_filter=None):
+        """See :func:`DBConnector.translate_filter`
+
+        Only with catalog. ``select_filter`` is not used.
+
+        :return: the list of conditions
+        :rtype: list[Condition]
+        """
+        if self._catalog is None:
+            return select_filter
+        return list(conditions)
+
+    def translate_cursor(self, cursor, select_filter=None):
+        """See :func:`DBConnector.translate_cursor`
+
+        Only with catalog, the cursor is matched as a condition
+
+        :return: the list of conditions
+        :rtype: list
+        """
+        if self._catalog is None:
+            return None
+        return self._conditions_of(select_filter) + [cursor]
+
+    def _conditions_of(self, select_filter) -> list:
+        """Return the list of conditions of a catalog filter"""
+        return list(select_filter) if isinstance(select_filter, list) else []
+
+    def _catalog_documents(self, select_filter) -> list[dict]:
+        """Return documents of the catalog matching the filter"""
+        try:
+            return self._catalog.documents(self._conditions_of(select_filter))
+        except Exception as e:
+            raise DBError('Error while select in path "{0}"', self._path) from e
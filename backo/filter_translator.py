@@ -0,0 +1,578 @@
+"""
+The filter translator module
+
+Split a stricto filter (see https://github.com/backo-stricto/stricto#matching)
+into conditions a :py:class:`DBConnector` can translate into its native query,
+and the remaining filter which must be evaluated in python on :py:class:`Item`.
+"""
+
+# pylint: disable=wrong-import-position, protected-access, wrong-import-order
+import operator as op
+import re
+import sys
+from typing import Any, Callable
+
+# used for developpement
+sys.path.insert(1, "../../stricto")
+
+from stricto import Bool, Dict, Float, GenericType, In, Int, List, String, Tuple
+
+PRIMITIVE_TYPES = (String, Int, Float, Bool)
+COMPARISON_OPERATORS = {"$eq", "$ne", "$gt", "$gte", "$lt", "$lte"}
+# "$or" is not listed : stricto match it differently, so it stays matched in python
+ALL_OPERATORS = COMPARISON_OPERATORS | {"$reg", "$contains", "$and", "$not"}
+
+MISSING = object()
+"""Returned by :func:`get_path` when the path does not exist in the document"""
+
+COMPARISON_FUNCTIONS = {
+    "$eq": op.eq,
+    "$ne": op.ne,
+    "$gt": op.gt,
+    "$gte": op.ge,
+    "$lt": op.lt,
+    "$lte": op.le,
+}
+
+
+def is_operator_tuple(value: Any) -> bool:
+    """Return True if the value is a filter operator like ``( "$gt", 12 )``
+
+    :param value: the value to check
+    :type value: Any
+    :rtype: bool
+    """
+    return (
+        isinstance(value, tuple)
+        and len(value) == 2
+        and isinstance(value[0], str)
+        and re.match(r"^\$", value[0]) is not None
+    )
+
+
+def filter_key(value: Any) -> tuple | None:
+    """Return a hashable key of a filter, or None if the filter cannot be a key
+
+    Types are in the key (``1``, ``1.0`` and ``True`` are different filters)
+
+    :param value: the filter
+    :rtype: tuple | None
+    """
+    if isinstance(value, dict):
+        items = tuple((k, filter_key(v)) for k, v in value.items())
+        return None if any(v is None for _, v in items) else ("dict", items)
+    if isinstance(value, (list, tuple)):
+        items = tuple(filter_key(v) for v in value)
+        return None if None in items else (type(value).__name__, items)
+    if value is None:
+        return ("None",)
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return (type(value).__name__, value)
+
+
+def get_path(document: dict, path: list[str]) -> Any:
+    """Return the value at path in a raw document, or :py:data:`MISSING`
+
+    :param document: the raw document (as returned by a :py:class:`DBConnector`)
+    :type document: dict
+    :param path: the list of keys, ex ``["address", "town"]``
+    :type path: list[str]
+    """
+    value = document
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return MISSING
+        value = value[key]
+    return value
+
+
+# pylint: disable-next=too-many-return-statements
+def match_value(value: Any, operator: str, operand: Any) -> bool:
+    """Match a raw value with an operator, like stricto does on a field
+
+    :param value: the value to check
+    :param operator: the operator (``$eq``, ``$gt``, ``$reg``, ...)
+    :type operator: str
+    :param operand: the operand of the operator
+    :rtype: bool
+    """
+    try:
+        if operator == "$eq":
+            return value == operand
+        if operator == "$ne":
+            return value != operand
+        if operator == "$gt":
+            return value > operand
+        if operator == "$gte":
+            return value >= operand
+        if operator == "$lt":
+            return value < operand
+        if operator == "$lte":
+            return value <= operand
+        if operator == "$reg":
+            return re.match(operand, value) is not None
+    except Exception:  # pylint: disable=broad-exception-caught
+        # ignore type exception and return False (as stricto does)
+        return False
+
+    if operator == "$contains":
+        if not isinstance(value, list):
+            return False
+        sub = operand if is_operator_tuple(operand) else ("$eq", operand)
+        return any(match_value(item, sub[0], sub[1]) for item in value)
+    if operator == "$and":
+        return all(match_value(value, sub[0], sub[1]) for sub in operand)
+    if operator == "$not":
+        return not match_value(value, operand[0], operand[1])
+
+    return False
+
+
+def compile_path(path: list[str]) -> Callable[[dict], Any]:
+    """Return a function giving the value at path in a raw document dict (see :func:`get_path`)
+
+    :param path: the list of keys, ex ``["address", "town"]``
+    :type path: list[str]
+    :rtype: Callable[[dict], Any]
+    """
+    path = tuple(path)
+    if len(path) == 1:
+        key = path[0]
+        return lambda document: document.get(key, MISSING)
+
+    def get(document):
+        value = document
+        for key in path:
+            if not isinstance(value, dict):
+                return MISSING
+            value = value.get(key, MISSING)
+            if value is MISSING:
+                return MISSING
+        return value
+
+    return get
+
+
+def _false(value: Any) -> bool:  # pylint: disable=unused-argument
+    """Never match"""
+    return False
+
+
+# pylint: disable-next=too-many-return-statements
+def compile_operator(operator: str, operand: Any) -> Callable[[Any], bool]:
+    """Return a function matching a raw value, like :func:`match_value` does
+
+    The operator and the operand are checked once (regex compiled, function bound).
+
+    :param operator: the operator (``$eq``, ``$gt``, ``$reg``, ...)
+    :type operator: str
+    :param operand: the operand of the operator
+    :rtype: Callable[[Any], bool]
+    """
+    if operator in COMPARISON_FUNCTIONS:
+        compare = COMPARISON_FUNCTIONS[operator]
+
+        def check(value):
+            try:
+                return compare(value, operand)
+            except Exception:  # pylint: disable=broad-exception-caught
+                return False
+
+        return check
+
+    if operator == "$reg":
+        try:
+            pattern = re.compile(operand)
+        except Exception:  # pylint: disable=broad-exception-caught
+            return _false
+
+        def check_reg(value):
+            try:
+                return pattern.match(value) is not None
+            except Exception:  # pylint: disable=broad-exception-caught
+                return False
+
+        return check_reg
+
+    if operator == "$contains":
+        sub = operand if is_operator_tuple(operand) else ("$eq", operand)
+        check_item = compile_operator(sub[0], sub[1])
+        return lambda value: isinstance(value, list) and any(map(check_item, value))
+
+    if operator == "$and":
+        checks = [compile_operator(sub[0], sub[1]) for sub in operand]
+        return lambda value: all(check(value) for check in checks)
+
+    if operator == "$not":
+        check_not = compile_operator(operand[0], operand[1])
+        return lambda value: not check_not(value)
+
+    return _false
+
+
+def compile_conditions(conditions: list) -> Callable[[dict], bool]:
+    """Return a predicate on raw documents, true if all conditions match
+
+    :param conditions: objects with a ``match(document)`` method
+        (:py:class:`Condition`, :py:class:`KeysetCursor`)
+    :type conditions: list
+    :rtype: Callable[[dict], bool]
+    """
+    predicates = [
+        c.predicate if isinstance(c, Condition) else c.match for c in conditions
+    ]
+    if not predicates:
+        return lambda document: True
+    if len(predicates) == 1:
+        return predicates[0]
+
+    def match_all(document):
+        for predicate in predicates:
+            if not predicate(document):
+                return False
+        return True
+
+    return match_all
+
+
+class Condition:
+    """A condition on one path of the document, extracted from a filter
+
+    A :py:class:`DBConnector` receives a list of conditions (all of them must match)
+    and translates them into its native query with :func:`DBConnector.translate_filter`
+
+    :param path: the list of keys to reach the field, ex ``["address", "town"]``
+    :type path: list[str]
+    :param operator: the operator (``$eq``, ``$ne``, ``$gt``, ``$reg``, ``$contains``, ``$and``, ...)
+    :type operator: str
+    :param operand: the value of the operator. A list of ``( operator, value )`` for ``$and``
+    :param default: the default value of the field (used when the field is missing in a document)
+    """
+
+    def __init__(self, path: list[str], operator: str, operand: Any, default=None):
+        """Constructor"""
+        self.path = path
+        self.operator = operator
+        self.operand = operand
+        self.default = default
+
+        # Does a document without this field match ?
+        self.default_match = match_value(default, operator, operand)
+
+        self.predicate = self._compile()
+        """The compiled :func:`match` (a function on raw documents)"""
+
+    def __reduce__(self):
+        """Pickle the condition without its predicate (compiled again)"""
+        return Condition, (self.path, self.operator, self.operand, self.default)
+
+    def _compile(self) -> Callable[[dict], bool]:
+        """Return the function matching a raw document"""
+        default_match = self.default_match
+        operand = self.operand
+
+        # The most usual case : a comparison on a first level field
+        if len(self.path) == 1 and self.operator in COMPARISON_FUNCTIONS:
+            key = self.path[0]
+            compare = COMPARISON_FUNCTIONS[self.operator]
+
+            def compare_key(document):
+                value = document.get(key, MISSING)
+                if value is MISSING:
+                    return default_match
+                try:
+                    return compare(value, operand)
+                except Exception:  # pylint: disable=broad-exception-caught
+                    return False
+
+            return compare_key
+
+        get = compile_path(self.path)
+        check = compile_operator(self.operator, operand)
+
+        def predicate(document):
+            value = get(document)
+            if value is MISSING:
+                return default_match
+            return check(value)
+
+        return predicate
+
+    def operators(self) -> set[str]:
+        """Return the set of all operators used by this condition
+
+        :rtype: set[str]
+        """
+        return _operators_of(self.operator, self.operand)
+
+    def match(self, document: dict) -> bool:
+        """Check the condition against a raw document
+
+        :param document: the raw document
+        :type document: dict
+        :rtype: bool
+        """
+        return self.predicate(document)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}("{".".join(self.path)}" {self.operator} {self.operand!r})'
+
+
+def _operators_of(operator: str, operand: Any) -> set[str]:
+    """Return recursively all operators used"""
+    operators = {operator}
+    if operator == "$and":
+        for sub in operand:
+            operators |= _operators_of(sub[0], sub[1])
+    if operator in ("$not", "$contains") and is_operator_tuple(operand):
+        operators |= _operators_of(operand[0], operand[1])
+    return operators
+
+
+def is_plain_field(field: GenericType) -> bool:
+    """
+    Return True if the field and all its parents are always readable
+    and always exist, without computed value. Only those fields can be
+    matched (or sorted) on raw documents.
+
+    :param field: the field of the model
+    :type field: GenericType
+    :rtype: bool
+    """
+    node = field
+    while node is not None:
+        if node._exists is not True:
+            return False
+        if node._permissions.get("read", None) not in (None, True):
+            return False
+        if node._auto_set is not None:
+            return False
+        node = node._parent
+    return True
+
+
+def _has_type_of(field: GenericType, operand: Any) -> bool:
+    """Return True if the operand has a type compatible with the field"""
+    if isinstance(field, Bool):
+        return isinstance(operand, bool)
+    if isinstance(field, (Int, Float)):
+        return isinstance(operand, (int, float)) and not isinstance(operand, bool)
+    if isinstance(field, String):
+        return isinstance(operand, str)
+    return False
+
+
+# pylint: disable-next=too-many-return-statements
+def _is_translatable(field: GenericType, operator: str, operand: Any) -> bool:
+    """Return True if the operator on this field has the same meaning on raw documents"""
+    if operator == "$and":
+        return isinstance(operand, list) and all(
+            is_operator_tuple(sub) and _is_translatable(field, sub[0], sub[1])
+            for sub in operand
+        )
+
+    if operator == "$not":
+        return is_operator_tuple(operand) and _is_translatable(
+            field, operand[0], operand[1]
+        )
+
+    if operator == "$contains":
+        if not isinstance(field, List) or not isinstance(field._type, PRIMITIVE_TYPES):
+            return False
+        sub = operand if is_operator_tuple(operand) else ("$eq", operand)
+        return sub[0] in COMPARISON_OPERATORS | {"$reg"} and _is_translatable(
+            field._type, sub[0], sub[1]
+        )
+
+    if not isinstance(field, PRIMITIVE_TYPES):
+        return False
+
+    if operator in ("$eq", "$ne"):
+        return operand is None or _has_type_of(field, operand)
+
+    if operator in COMPARISON_OPERATORS:
+        return _has_type_of(field, operand)
+
+    if operator == "$reg":
+        if not isinstance(field, String) or not isinstance(operand, str):
+            return False
+        try:
+            re.compile(operand)
+        except re.error:
+            return False
+        return True
+
+    return False
+
+
+def _leaf_condition(field: GenericType, path: list[str], value: Any) -> Condition:
+    """Build the condition for a field, or None if not translatable"""
+    operator, operand = value if is_operator_tuple(value) else ("$eq", value)
+
+    if not _is_translatable(field, operator, operand):
+        return None
+
+    if callable(field._default):
+        return None
+
+    return Condition(path, operator, operand, field._default)
+
+
+def _split_dict(
+    match_filter: dict, model: Dict, path: list[str], db_handler, conditions: list
+) -> dict | None:
+    """Split recursively a dict filter. Return the remaining filter or None"""
+    remaining = {}
+    for key, value in match_filter.items():
+        if key not in model._keys:
+            remaining[key] = value
+            continue
+
+        field = object.__getattribute__(model, key)
+        if not is_plain_field(field):
+            remaining[key] = value
+            continue
+
+        if isinstance(field, Dict) and isinstance(value, dict):
+            sub_remaining = _split_dict(
+                value, field, path + [key], db_handler, conditions
+            )
+            if sub_remaining is not None:
+                remaining[key] = sub_remaining
+            continue
+
+        condition = _leaf_condition(field, path + [key], value)
+        if condition is None or not db_handler.can_translate(condition):
+            remaining[key] = value
+            continue
+
+        conditions.append(condition)
+
+    return remaining or None
+
+
+def split_filter(
+    match_filter: dict | tuple | None, model: Dict, db_handler
+) -> tuple[list[Condition], dict | tuple | None]:
+    """Split a filter in conditions for the database and a remaining filter
+
+    Only conditions on always readable and existing primitive fields
+    (:py:class:`String`, :py:class:`Int`, :py:class:`Float`, :py:class:`Bool`
+    and :py:class:`List` of them with ``$contains``) are given to the database, and only
+    if the :py:class:`DBConnector` accepts them (see :func:`DBConnector.can_translate`)
+
+    :param match_filter: the filter
+    :type match_filter: dict | tuple | None
+    :param model: the model of the documents
+    :type model: Dict
+    :param db_handler: the database connector
+    :type db_handler: DBConnector
+    :return: the list of conditions and the remaining filter (``None`` if nothing remains)
+    :rtype: tuple[list[Condition], dict | tuple | None]
+
+    .. code-block:: python
+
+        conditions, remaining = split_filter(
+            { "name" : ( "$reg", "^ber" ), "address" : { "town" : "Paris" } },
+            books.model,
+            books.db_handler
+        )
+
+    """
+    if not isinstance(match_filter, dict):
+        return [], match_filter
+
+    conditions = []
+    remaining = _split_dict(match_filter, model, [], db_handler, conditions)
+    return conditions, remaining
+
+
+class RawMatcher:  # pylint: disable=too-few-public-methods
+    """
+    Accept all conditions which can be matched on raw documents in python
+
+    Given to :func:`split_filter` instead of a :py:class:`DBConnector`, to
+    match the filter on raw documents before building :py:class:`Item` (see :py:class:`SelectionStream`)
+    """
+
+    supported_operators = ALL_OPERATORS
+
+    def can_translate(self, condition: Condition) -> bool:
+        """See :func:`DBConnector.can_translate`"""
+        return condition.operators() <= self.supported_operators
+
+
+# pylint: disable-next=too-many-return-statements
+def is_projectable(field: GenericType) -> bool:
+    """
+    Return True if no field in this sub-tree depends on other fields
+    (computed values, conditional existence or read permission)
+    """
+    if field._auto_set is not None or callable(field._exists):
+        return False
+    if callable(field._permissions.get("read", None)):
+        return False
+    if isinstance(field, Dict):
+        return all(
+            is_projectable(object.__getattribute__(field, key)) for key in field._keys
+        )
+    if isinstance(field, List):
+        return is_projectable(field._type)
+    if isinstance(field, Tuple):
+        return all(is_projectable(sub) for sub in field._schema)
+    if isinstance(field, In):
+        return all(is_projectable(sub) for sub in field._models)
+    return True
+
+
+def _selector_key(selector: str) -> str | None:
+    """Return the first key of a selector ``$.a.b[0]`` -> ``a``, or None"""
+    match = re.match(r"^\$\.([^.\[]+)", selector)
+    if match is None:
+        return None
+    return match.group(1)
+
+
+def build_projection(
+    selectors: list[str] | None,
+    match_filter: dict | tuple | None,
+    model: Dict,
+    sort_object: dict | None = None,
+) -> dict:
+    """Build the projection to give to :func:`DBConnector.select`
+
+    The projection contains the first level keys used by selectors, by the
+    filter matched in python and by the sort. An empty projection (= the whole document) is returned
+    if no selectors are given or if a field of the model depends on other
+    fields (``set=``, ``exists=`` or ``can_read=`` functions)
+
+    :param selectors: the selectors, ex ``[ "$._id", "$.title", "$.author.name" ]``
+    :type selectors: list[str] | None
+    :param match_filter: the filter matched in python on the :py:class:`Item`
+    :type match_filter: dict | tuple | None
+    :param model: the model of the documents
+    :type model: Dict
+    :param sort_object: the sort, ex ``{ "_meta.mtime" : -1 }``
+    :type sort_object: dict | None
+    :return: the projection, ex ``{ "_id" : 1, "title" : 1, "author" : 1 }``
+    :rtype: dict
+
+    """
+    if selectors is None or not isinstance(match_filter, (dict, type(None))):
+        return {}
+
+    keys = {"_id"} | set((match_filter or {}).keys())
+    keys |= {key.split(".")[0] for key in (sort_object or {})}
+    for selector in selectors:
+        key = _selector_key(selector)
+        if key is None:
+            return {}
+        keys.add(key)
+
+    if not is_projectable(model):
+        return {}
+
+    return {key: 1 for key in sorted(keys)}
@@ -0,0 +1,195 @@
+"""
+The identity map module
+
+Objects read in the database during a request (or a selection) are kept
+by ``( collection name, _id )`` to be read only once. Selections keep them
+in their own map, so streaming a selection does not keep every object.
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, wrong-import-order
+
+import copy
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+from flask import g, has_request_context
+from .error import NotFoundError
+
+_scope: ContextVar = ContextVar("backo_identity_map", default=None)
+
+
+class IdentityMap:
+    """
+    The raw documents read in the database, by collection and _id
+
+    Only one exists at a time (see :func:`current_identity_map`).
+    It is used by :py:func:`Item.load`, so :py:class:`Ref` and :py:class:`RefsList`
+    (filters, selectors and reverse links) load an object once.
+    Objects are forgotten when they are created, saved or deleted.
+    """
+
+    def __init__(self):
+        """Constructor"""
+        self._documents: dict[tuple[str, str], dict] = {}
+        self._missing: set[tuple[str, str]] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get_document(self, collection_name: str, _id: str, loader: Callable) -> dict:
+        """
+        Return a copy of the document, read with ``loader(_id)`` the first time
+
+        :param collection_name: The name of the collection
+        :type collection_name: str
+        :param _id: The _id of the object
+        :type _id: str
+        :param loader: The function to read the object in the database (ex. ``get_by_id``)
+        :type loader: Callable
+        :return: the document (json format)
+        :rtype: dict
+        :raise Error: Errors raised by the loader (ex. NotFoundError)
+        """
+        key = (collection_name, _id)
+        if key in self._missing:
+            raise NotFoundError(
+                '_id "{0}" not found in collection "{1}"', _id, collection_name
+            )
+        document = self._documents.get(key)
+        if document is None:
+            self.misses += 1
+            document = loader(_id)
+            self._documents[key] = document
+        else:
+            self.hits += 1
+        return copy.deepcopy(document)
+
+    def prefetch(self, collection_name: str, _ids: list[str], loader: Callable) -> None:
+        """
+        Read at once objects not already read, with ``loader(_ids)``
+
+        :param collection_name: The name of the collection
+        :type collection_name: str
+        :param _ids: The _ids of objects
+        :type _ids: list[str]
+        :param loader: The function to read objects (ex. ``get_by_ids``)
+        :type loader: Callable
+        """
+        keys = [
+            (collection_name, _id)
+            for _id in dict.fromkeys(_ids)
+            if (collection_name, _id) not in self._documents
+            and (collection_name, _id) not in self._missing
+        ]
+        if not keys:
+            return
+        self.misses += len(keys)
+        documents = loader([_id for _, _id in keys])
+        for key in keys:
+            if key[1] in documents:
+                self._documents[key] = documents[key[1]]
+            else:
+                self._missing.add(key)
+
+    def put(self, collection_name: str, _id: str, document: dict) -> None:
+        """
+        Set the document read in the database
+
+        :param collection_name: The name of the collection
+        :type collection_name: str
+        :param _id: The _id of the object
+        :type _id: str
+        :param document: the document (json format)
+        :type document: dict
+        """
+        self._missing.discard((collection_name, _id))
+        self._documents[(collection_name, _id)] = copy.deepcopy(document)
+
+    def discard(self, collection_name: str, _id: str) -> None:
+        """
+        Forget an object (changed in the database)
+
+        :param collection_name: The name of the collection
+        :type collection_name: str
+        :param _id: The _id of the object
+        :type _id: str
+        """
+        self._documents.pop((collection_name, _id), None)
+        self._missing.discard((collection_name, _id))
+
+    def clear(self) -> None:
+        """
+        Forget all objects
+        """
+        self._documents.clear()
+        self._missing.clear()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+
+def current_identity_map() -> IdentityMap | None:
+    """
+    Return the current identity map
+
+    The one of the :func:`identity_map_scope`, or the one of the flask request
+    (dropped at the end of the request), or ``None`` if there is no scope.
+
+    :rtype: IdentityMap | None
+    """
+    identity_map = _scope.get()
+    if identity_map is not None or not has_request_context():
+        return identity_map
+    if "backo_identity_map" not in g:
+        g.backo_identity_map = IdentityMap()
+    return g.backo_identity_map
+
+
+@contextmanager
+def identity_map_scope(identity_map: IdentityMap | None = None):
+    """
+    Use an identity map in this context
+
+    .. code-block:: python
+
+        with identity_map_scope():
+            for book in books.select({"author": {"name": "Hugo"}}):
+                ...
+
+    Without a map, the current one is used (or a new one if there is none).
+    A map given is used even in a request, so a :py:class:`SelectionStream`
+    keeps the objects it reads in its own map, dropped with it, and not in the
+    map of the request.
+
+    :param identity_map: The map to use (the current one, or a new one by default)
+    :type identity_map: IdentityMap | None
+    :return: the identity map used
+    :rtype: IdentityMap
+    """
+    if identity_map is None:
+        identity_map = current_identity_map()
+        if identity_map is not None:
+            yield identity_map
+            return
+        identity_map = IdentityMap()
+    token = _scope.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        _scope.reset(token)
+
+
+def forget(collection_name: str, _id: str) -> None:
+    """
+    Forget an object in the current identity map, and in the one of the request (if any)
+
+    :param collection_name: The name of the collection
+    :type collection_name: str
+    :param _id: The _id of the object
+    :type _id: str
+    """
+    maps = [_scope.get()]
+    if has_request_context():
+        maps.append(g.get("backo_identity_map"))
+    for identity_map in maps:
+        if identity_map is not None:
+            identity_map.discard(collection_name, _id)
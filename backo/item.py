@@ -14,6 +14,7 @@ from .log import log_system
 from .meta_data_handler import StandardMetaDataHandler, GenericMetaDataHandler
 from .loop_path import LoopPath
 from .status import StatusType
+from .identity_map import current_identity_map, forget
 
 log = log_system.get_or_create_logger("Item")
 
@@ -196,7 +197,13 @@ class Item(Dict):  # pylint: disable=too-many-instance-attributes
 
         _id_to_load = _id.get_value() if isinstance(_id, String) else str(_id)
 
-        obj = self.db_handler.get_by_id(_id_to_load)
+        identity_map = current_identity_map()
+        if identity_map is None:
+            obj = self.db_handler.get_by_id(_id_to_load)
+        else:
+            obj = identity_map.get_document(
+                self._collection.name, _id_to_load, self.db_handler.get_by_id
+            )
         self.disable_permissions()
         self.set(obj)
         self.enable_permissions()
@@ -235,6 +242,9 @@ class Item(Dict):  # pylint: disable=too-many-instance-attributes
             )
 
         obj = self.db_handler.get_by_id(self._id.get_value())
+        identity_map = current_identity_map()
+        if identity_map is not None:
+            identity_map.put(self._collection.name, self._id.get_value(), obj)
         # set as UNSET to be able to modify meta datas.
         self.set_status_unset()
 
@@ -259,6 +269,23 @@ class Item(Dict):  # pylint: disable=too-many-instance-attributes
             - *m_path=* ``[str]`` -- the modification path, to to avoid loop with references
 
 
+        """
+        dict_to_save = self.prepare_save(kwargs)
+        self.db_handler.save(self._id.get_value(), dict_to_save)
+        self.finish_save(kwargs)
+
+    def prepare_save(self, kwargs: dict) -> dict:
+        """
+        First part of :func:`save` : check rights, update meta datas
+        and trig ``before_save``
+
+        :param kwargs: the kwargs of :func:`save` (modified)
+        :type kwargs: dict
+        :return: the object to save in the database
+        :rtype: dict
+
+        :meta private:
+
         """
         # Check for kwargs availability
         Kparse(kwargs, KPARSE_DB_ACCESS, pop=False, strict=True)
@@ -299,11 +326,20 @@ class Item(Dict):  # pylint: disable=too-many-instance-attributes
         self.trigg("before_save", **kwargs)
 
         # print(f"Save {int(datetime.timestamp(datetime.now()))}", self)
-        dict_to_save = self.get_view("save").get_encoded()
+        return self.get_view("save").get_encoded()
 
-        self.db_handler.save(self._id.get_value(), dict_to_save)
+    def finish_save(self, kwargs: dict) -> None:
+        """
+        Last part of :func:`save`, once saved in the database
+
+        :param kwargs: the kwargs given to :func:`prepare_save`
+        :type kwargs: dict
 
+        :meta private:
+
+        """
         log.info("%r/%r modified", self._collection.name, self._id)
+        forget(self._collection.name, self._id.get_value())
 
         self.set_status_saved()
 
@@ -327,7 +363,20 @@ class Item(Dict):  # pylint: disable=too-many-instance-attributes
             - *m_path=* ``[str]`` -- the modification path, to to avoid loop with references
 
         """
+        self.prepare_delete(kwargs)
+        self.db_handler.delete_by_id(self._id.get_value())
+        self.finish_delete(kwargs)
+
+    def prepare_delete(self, kwargs: dict) -> None:
+        """
+        First part of :func:`delete` : check rights and trig ``before_delete``
 
+        :param kwargs: the kwargs of :func:`delete`
+        :type kwargs: dict
+
+        :meta private:
+
+        """
         # Check for kwargs availability
         Kparse(kwargs, KPARSE_DB_ACCESS, pop=False, strict=True)
 
@@ -355,13 +404,24 @@ class Item(Dict):  # pylint: disable=too-many-instance-attributes
 
         # Send delete event before deletion to do  some stufs
         self.trigg("before_delete", **kwargs)
-        self.db_handler.delete_by_id(self._id.get_value())
 
+    def finish_delete(self, kwargs: dict) -> None:
+        """
+        Last part of :func:`delete`, once deleted in the database
+
+        :param kwargs: the kwargs given to :func:`prepare_delete`
+        :type kwargs: dict
+
+        :meta private:
+
+        """
         log.info(
             "%r/%r deleted",
             self._collection.name,
             self._id,
         )
+        forget(self._collection.name, self._id.get_value())
+        self._collection.changed(self._id.get_value(), deleted=True)
 
         self.set_status_unset()
 
@@ -401,6 +461,23 @@ class Item(Dict):  # pylint: disable=too-many-instance-attributes
             - *m_path=* ``[str]`` -- the modification path, to to avoid loop with references
 
 
+        """
+        dict_to_save = self.prepare_create(obj, kwargs)
+        self.finish_create(self.db_handler.create(dict_to_save), kwargs)
+
+    def prepare_create(self, obj: dict, kwargs: dict) -> dict:
+        """
+        First part of :func:`create` : check rights, set the object, its _id and meta datas
+
+        :param obj: The json object struture to create
+        :type obj: dict
+        :param kwargs: the kwargs of :func:`create`
+        :type kwargs: dict
+        :return: the object to create in the database
+        :rtype: dict
+
+        :meta private:
+
         """
 
         # Check for kwargs availability
@@ -434,11 +511,24 @@ class Item(Dict):  # pylint: disable=too-many-instance-attributes
 
         # create
         # dict_to_save = self.get_value()
-        dict_to_save = self.get_view("save").get_encoded()
+        return self.get_view("save").get_encoded()
+
+    def finish_create(self, _id: str, kwargs: dict) -> None:
+        """
+        Last part of :func:`create`, once created in the database
 
+        :param _id: The _id given by the database
+        :type _id: str
+        :param kwargs: the kwargs given to :func:`prepare_create`
+        :type kwargs: dict
+
+        :meta private:
+
+        """
         self.disable_permissions()
-        self._id = self.db_handler.create(dict_to_save)
+        self._id = _id
         self.enable_permissions()
+        forget(self._collection.name, self._id.get_value())
 
         self.set_status_saved()
 
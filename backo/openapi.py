@@ -235,9 +235,133 @@ class OpenAPISpec:
                                 "type": "array",
                                 "items": {"$ref": f"#/components/schemas/{item_name}"},
                             },
-                            "total": {"type": "integer"},
+                            "total": {"type": ["integer", "null"]},
                             "_skip": {"type": "integer"},
                             "_page": {"type": "integer"},
+                            "_cursor": {"type": ["string", "null"]},
+                        },
+                    }
+                }
+            },
+        }
+
+        for error_code, error_msg in errors:
+            spec["responses"][str(error_code)] = {
+                "description": error_msg,
+                "content": {"text/plain": {}},
+            }
+
+        self.__add_spec(route, "get", spec)
+
+    def add_aggregate(
+        self,
+        route: str,
+        item_name: str,
+        ok: tuple[int, str],
+        errors: list[tuple[int, str]],
+    ) -> None:
+        """
+        Set OpenAPI specification for GET /items/_aggregate
+        """
+        spec: dict[str, Any] = {}
+        spec["summary"] = f"Aggregate {item_name}"
+        spec["description"] = (
+            f"Group items in {item_name} collection, with eventual filtering, "
+            "and count them (_group, _sum, _min, _max)."
+        )
+        spec["operationId"] = f"aggregate_{item_name}"
+        spec["parameters"] = [
+            {
+                "name": "qstring",
+                "in": "query",
+                "required": False,
+                "schema": {"type": "string"},
+                "description": "Query string",
+            }
+        ]
+        spec["responses"] = {}
+        spec["responses"][str(ok[0])] = {
+            "description": ok[1],
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "result": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "group": {"type": "object"},
+                                        "count": {"type": "integer"},
+                                        "sum": {"type": "object"},
+                                        "min": {"type": "object"},
+                                        "max": {"type": "object"},
+                                    },
+                                },
+                            },
+                            "total": {"type": "integer"},
+                        },
+                    }
+                }
+            },
+        }
+
+        for error_code, error_msg in errors:
+            spec["responses"][str(error_code)] = {
+                "description": error_msg,
+                "content": {"text/plain": {}},
+            }
+
+        self.__add_spec(route, "get", spec)
+
+    def add_facets(
+        self,
+        route: str,
+        item_name: str,
+        ok: tuple[int, str],
+        errors: list[tuple[int, str]],
+    ) -> None:
+        """
+        Set OpenAPI specification for GET /items/_facets
+        """
+        spec: dict[str, Any] = {}
+        spec["summary"] = f"Facets of {item_name}"
+        spec["description"] = (
+            f"Distinct values of fields of items in {item_name} collection, "
+            "with eventual filtering, and the number of items for each (_fields, _limit)."
+        )
+        spec["operationId"] = f"facets_{item_name}"
+        spec["parameters"] = [
+            {
+                "name": "qstring",
+                "in": "query",
+                "required": False,
+                "schema": {"type": "string"},
+                "description": "Query string",
+            }
+        ]
+        spec["responses"] = {}
+        spec["responses"][str(ok[0])] = {
+            "description": ok[1],
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "result": {
+                                "type": "object",
+                                "additionalProperties": {
+                                    "type": "array",
+                                    "items": {
+                                        "type": "object",
+                                        "properties": {
+                                            "value": {},
+                                            "count": {"type": "integer"},
+                                        },
+                                    },
+                                },
+                            },
                         },
                     }
                 }
@@ -703,9 +827,10 @@ class OpenAPISpec:
                                         "$ref": f"#/components/schemas/{item_name}"
                                     },
                                 },
-                                "total": {"type": "integer"},
+                                "total": {"type": ["integer", "null"]},
                                 "_skip": {"type": "integer"},
                                 "_page": {"type": "integer"},
+                                "_cursor": {"type": ["string", "null"]},
                             },
                         }
                     }
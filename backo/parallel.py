@@ -0,0 +1,209 @@
+"""
+The parallel module
+
+Filters of a selection can be matched by a pool of worker processes
+(see the ``workers`` option of :py:class:`Selection`).
+
+Workers are started with a fork-safe method (``forkserver``, or ``spawn``), so they
+do not inherit the threads, locks and connections of the application. Each stream
+sends them a :py:class:`MatchJob` (the model, the conditions, the filter, the read
+right and the current user), pickled once, then chunks of raw documents.
+References to collections and database connectors are not sent: a chunk a worker
+cannot match alone (ex. a filter through a :py:class:`Ref`) is matched by the
+application.
+
+Pools are kept by selection, started on first use, and shut down at exit.
+"""
+
+# pylint: disable=wrong-import-position, wrong-import-order, protected-access, logging-fstring-interpolation
+import atexit
+import io
+import multiprocessing
+import pickle
+import sys
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# used for developpement
+sys.path.insert(1, "../../stricto")
+
+from stricto import GenericType
+
+from .current_user import current_user
+from .db_connector import DBConnector
+from .error import SessionError
+from .filter_translator import compile_conditions
+from .log import log_system
+from .prototype import ItemPrototype
+
+log = log_system.get_or_create_logger("parallel")
+
+PARALLEL_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+"""How worker processes are started"""
+
+WORKER_JOBS_SIZE = 8
+"""The number of jobs kept by a worker process"""
+
+_POOLS = weakref.WeakSet()
+
+_WORKER_JOBS: OrderedDict = OrderedDict()
+
+
+def _detached():
+    """Return what replaces a collection or a connector in a worker"""
+    return None
+
+
+def _new_node(cls):
+    """Return an empty node of a model (see :py:class:`_JobPickler`)"""
+    return cls.__new__(cls)
+
+
+def _set_node_state(node, state: dict):
+    """Set the attributes of a node (see :py:class:`_JobPickler`)"""
+    object.__setattr__(node, "__dict__", state)
+    return node
+
+
+class _JobPickler(pickle.Pickler):
+    """
+    Pickle a job without the collections and connectors it refers to
+
+    Nodes of the model are pickled with their attributes (stricto types
+    forward unknown attributes to their value, so are not pickled as is).
+    """
+
+    def reducer_override(self, obj):
+        """Detach collections and connectors, pickle nodes by their attributes"""
+        # pylint: disable=import-outside-toplevel, cyclic-import
+        from .collection import Collection
+
+        if isinstance(obj, (Collection, DBConnector)):
+            return _detached, ()
+        if isinstance(obj, GenericType):
+            state = dict(object.__getattribute__(obj, "__dict__"))
+            return _new_node, (type(obj),), state, None, None, _set_node_state
+        return NotImplemented
+
+
+class MatchJob:  # pylint: disable=too-few-public-methods
+    """
+    What a worker process needs to match the raw documents of a stream
+
+    :param stream: the stream
+    :type stream: SelectionStream
+    """
+
+    def __init__(self, stream):
+        """Constructor"""
+        self.model = stream.collection.model
+        self.permissions = stream.collection._permissions
+        self.raw_conditions = stream.raw_conditions
+        self.remaining_filter = stream.remaining_filter
+        self.need_match = stream.need_match
+        try:
+            self.user = current_user.retrieve_current_user()
+        except (SessionError, RuntimeError):
+            self.user = current_user.anonymous
+        self._prototype = None
+        self._raw_match = None
+
+    def dumps(self) -> bytes | None:
+        """Return the pickled job, or None if it cannot be sent to a worker"""
+        buffer = io.BytesIO()
+        try:
+            _JobPickler(buffer).dump(self)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            log.debug(f"Cannot send the job to workers ({e}), matched here")
+            return None
+        return buffer.getvalue()
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        state["_prototype"] = None
+        state["_raw_match"] = None
+        return state
+
+    def match(self, chunk: tuple[dict]) -> list[bool]:
+        """Return True for each matching document of the chunk"""
+        if self._prototype is None:
+            self._prototype = ItemPrototype(self.model)
+            self._raw_match = compile_conditions(self.raw_conditions)
+        current_user.standalone = True
+        current_user.user_without_session = self.user
+
+        result = []
+        for obj in chunk:
+            if not self._raw_match(obj):
+                result.append(False)
+                continue
+            if not self.need_match:
+                result.append(True)
+                continue
+            o = self._prototype.new_item()
+            o.set(obj)
+            o.enable_permissions()
+            result.append(
+                self.permissions.is_allowed_to("read", o) is True
+                and (
+                    self.remaining_filter is None
+                    or o.match(self.remaining_filter) is True
+                )
+            )
+        return result
+
+
+def match_chunk(token: str, payload: bytes, chunk: tuple[dict]) -> list[bool] | None:
+    """
+    Match raw documents in a worker process (see :func:`SelectionStream._match_in_workers`)
+
+    :param token: the token of the stream, to unpickle its job once
+    :type token: str
+    :param payload: the pickled :py:class:`MatchJob`
+    :type payload: bytes
+    :param chunk: the raw documents
+    :type chunk: tuple[dict]
+    :return: True for each matching document, or None if the chunk cannot be matched here
+    :rtype: list[bool] | None
+
+    :meta private:
+
+    """
+    job = _WORKER_JOBS.get(token)
+    if job is None:
+        job = pickle.loads(payload)
+        _WORKER_JOBS[token] = job
+        while len(_WORKER_JOBS) > WORKER_JOBS_SIZE:
+            _WORKER_JOBS.popitem(last=False)
+    try:
+        return job.match(chunk)
+    except Exception:  # pylint: disable=broad-exception-caught
+        return None
+
+
+def new_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Return a new pool of worker processes, shut down at exit
+
+    :param workers: the number of processes
+    :type workers: int
+    :rtype: ProcessPoolExecutor
+    """
+    pool = ProcessPoolExecutor(
+        workers, mp_context=multiprocessing.get_context(PARALLEL_START_METHOD)
+    )
+    _POOLS.add(pool)
+    return pool
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    """
+    Shut down all pools of worker processes
+    """
+    for pool in list(_POOLS):
+        pool.shutdown(wait=True, cancel_futures=True)
+    _POOLS.clear()
@@ -0,0 +1,142 @@
+"""
+The prototype module
+
+An :py:class:`ItemPrototype` creates the new (empty) :py:class:`Item` of a
+collection (see :func:`Collection.new_item`) from its model, without copying
+the schema tree.
+
+The model is compiled once into a flat list of nodes. A new item is built node
+by node, each node sharing with the node of the model its definition
+(constraints, views, transforms, keys...) and its events, and holding only its
+own value, its parent and its permissions (copied, as by :func:`copy.copy`).
+
+Nodes with their own copy (ex. :py:class:`Tuple`, :py:class:`File`) or with a
+mutable value (ex. a :py:class:`List` with a default) are copied as before.
+"""
+
+# pylint: disable=wrong-import-position, wrong-import-order, protected-access
+import copy
+import sys
+import threading
+from datetime import date, datetime, time
+
+# used for developpement
+sys.path.insert(1, "../../stricto")
+
+from stricto import Dict, GenericType
+from stricto.list_and_tuple import ListAndTuple
+
+from .item import Item
+
+SHARED = 0
+"""A node built on the node of the model"""
+
+DICT = 1
+"""A :py:class:`Dict` built on the node of the model, with its own keys"""
+
+COPIED = 2
+"""A node copied from the node of the model"""
+
+IMMUTABLE_TYPES = (type(None), bool, int, float, str, bytes, date, datetime, time)
+"""Values shared between the model and new items"""
+
+_SHARED_COPIES = (GenericType.__copy__, ListAndTuple.__copy__, Dict.__copy__)
+
+
+def _is_shared(node: GenericType) -> bool:
+    """Return True if a node can be built on the node of the model
+
+    The copy of its class must be one of stricto (or :py:class:`Item`)
+    and its values immutable.
+    """
+    node_copy = type(node).__copy__
+    if node_copy is Item.__copy__:
+        node_copy = Dict.__copy__
+    if node_copy not in _SHARED_COPIES:
+        return False
+    return isinstance(node._value, IMMUTABLE_TYPES) and isinstance(
+        node._old_value, IMMUTABLE_TYPES
+    )
+
+
+class ItemPrototype:  # pylint: disable=too-few-public-methods
+    """
+    Create new items of a model
+
+    .. code-block:: python
+
+        prototype = ItemPrototype(books.model)
+        book = prototype.new_item()
+        # the same as books.model.copy()
+
+    The model is compiled on the first new item, and again when keys are
+    added to (or removed from) one of its :py:class:`Dict`. Its definitions are
+    shared with all items and must not be modified by an item (ex. constraints);
+    permissions are copied, so an item can change its own.
+
+    :param model: the model
+    :type model: Item
+    """
+
+    def __init__(self, model: Item):
+        """Constructor"""
+        self.model = model
+        self._nodes: list[tuple] = []
+        self._keys: list[tuple[list, list]] | None = None
+        self._lock = threading.Lock()
+
+    def _compile(self) -> None:
+        """Flatten the model into nodes ``( node, attributes, kind, parent index, key )``,
+        parents first (the lock is held)"""
+        nodes = [(self.model, vars(self.model), None, None)]
+        self._nodes = []
+        self._keys = []
+        for index, (node, attributes, parent, key) in enumerate(nodes):
+            if not _is_shared(node):
+                self._nodes.append((node, attributes, COPIED, parent, key))
+                continue
+            if not isinstance(node, Dict):
+                self._nodes.append((node, attributes, SHARED, parent, key))
+                continue
+            self._nodes.append((node, attributes, DICT, parent, key))
+            self._keys.append((attributes["_keys"], list(attributes["_keys"])))
+            for child_key in attributes["_keys"]:
+                child = attributes[child_key]
+                nodes.append((child, vars(child), index, child_key))
+
+    def _is_compiled(self) -> bool:
+        """Return True if the keys of the model did not change since compiled"""
+        return self._keys is not None and all(
+            keys == compiled for keys, compiled in self._keys
+        )
+
+    def new_item(self) -> Item:
+        """Return a new empty item
+
+        :return: an empty Item
+        :rtype: Item
+        """
+        if not self._is_compiled():
+            with self._lock:
+                if not self._is_compiled():
+                    self._compile()
+
+        objects = []
+        for node, attributes, kind, parent, key in self._nodes:
+            if kind == COPIED:
+                obj = copy.copy(node)
+                obj_attributes = object.__getattribute__(obj, "__dict__")
+            else:
+                cls = type(node)
+                obj = cls.__new__(cls)
+                obj_attributes = attributes.copy()
+                object.__setattr__(obj, "__dict__", obj_attributes)
+                obj_attributes["_permissions"] = copy.copy(attributes["_permissions"])
+                if kind == DICT:
+                    obj_attributes["_keys"] = attributes["_keys"].copy()
+            if parent is not None:
+                obj_attributes["_parent"] = objects[parent][0]
+                obj_attributes["_attribute_name"] = key
+                objects[parent][1][key] = obj
+            objects.append((obj, obj_attributes))
+        return objects[0][0]
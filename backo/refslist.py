@@ -18,6 +18,7 @@ from stricto import String, List, Selector, Dict, SSyntaxError, STypeError, Kpar
 from .loop_path import LoopPath
 from .error import PathNotFoundError, BackoError
 from .log import log_system, LogLevel
+from .identity_map import identity_map_scope
 from .api_toolbox import append_path_to_filter
 
 # WARNING: Specific import for cycling import beetween Ref and RefsLists
@@ -344,10 +345,12 @@ class RefsList(List):
         # With FillStrategy.FILL, try to delete the corresponding field
         if self._fill_strategy == FillStrategy.FILL:
             # try to load the coresponding field
-            for reference in me:
-                other = me._coll_ref.new()
-                other.load(reference.get_value(), **kwargs)
-                other.delete(**kwargs)
+            with identity_map_scope():
+                me._coll_ref.prefetch(me)
+                for reference in me:
+                    other = me._coll_ref.new()
+                    other.load(reference.get_value(), **kwargs)
+                    other.delete(**kwargs)
         else:
             # with FillStrategy.NO_FILL select all for deletion
             other_list = me.get_other_with_a_select(root._id.get_value())
@@ -454,75 +457,81 @@ class RefsList(List):
         looper.append(root._collection.name, root._id.get_value(), me.path_name())
 
         # Change the correspondant field to the new one
-        for reference in list_of_refs:
-            other = me._coll_ref.new()
-            other.load(reference.get_value(), **kwargs)
+        with identity_map_scope():
+            me._coll_ref.prefetch(list_of_refs)
+            for reference in list_of_refs:
+                other = me._coll_ref.new()
+                other.load(reference.get_value(), **kwargs)
 
-            reverse_field = other.select(me._reverse)
-            if reverse_field is None:
-                raise PathNotFoundError(
-                    'Path "{0}" not found in collection "{1}"',
-                    me._reverse,
-                    self._collection,
-                )
+                reverse_field = other.select(me._reverse)
+                if reverse_field is None:
+                    raise PathNotFoundError(
+                        'Path "{0}" not found in collection "{1}"',
+                        me._reverse,
+                        self._collection,
+                    )
 
-            if not isinstance(reverse_field, (ref.Ref, RefsList)):
-                raise STypeError(
-                    "{0}.{1} is not a Ref or a RefsList", self._collection, me._reverse
-                )
+                if not isinstance(reverse_field, (ref.Ref, RefsList)):
+                    raise STypeError(
+                        "{0}.{1} is not a Ref or a RefsList",
+                        self._collection,
+                        me._reverse,
+                    )
 
-            if looper.is_loop(
-                other._collection.name, reference.get_value(), reverse_field.path_name()
-            ):
-                log.debug(
-                    f"Ignore following ref due to fucking loop ( {root._collection.name}, {root._id.get_value()}, {me.path_name()})"
-                )
-                continue
-
-            other_modified_flag = False
-
-            if isinstance(reverse_field, ref.Ref):
-                # The reverse field is a Ref, modify it
-                log.debug(
-                    "Change Ref %r/%r.%r -> %r",
-                    me._collection,
-                    reference,
-                    me._reverse,
-                    new_ref,
-                )
+                if looper.is_loop(
+                    other._collection.name,
+                    reference.get_value(),
+                    reverse_field.path_name(),
+                ):
+                    log.debug(
+                        f"Ignore following ref due to fucking loop ( {root._collection.name}, {root._id.get_value()}, {me.path_name()})"
+                    )
+                    continue
 
-                reverse_field.set(new_ref)
-                other_modified_flag = True
-            else:
-                # the reverse field is a refsList.
-                # Append to the new one if not exists or clean if None
-                if new_ref is None:
-                    if root._id in reverse_field:
-                        log.debug(
-                            "RefsList %r/%r.%r=%r remove %r",
-                            me._collection,
-                            reference,
-                            me._reverse,
-                            reverse_field,
-                            root._id,
-                        )
-                        reverse_field.remove(root._id)
-                        other_modified_flag = True
+                other_modified_flag = False
 
-                elif new_ref not in reverse_field:
+                if isinstance(reverse_field, ref.Ref):
+                    # The reverse field is a Ref, modify it
                     log.debug(
-                        "%r/%r.%r=%r add %r",
+                        "Change Ref %r/%r.%r -> %r",
                         me._collection,
                         reference,
                         me._reverse,
-                        reverse_field,
                         new_ref,
                     )
-                    reverse_field.append(new_ref)
+
+                    reverse_field.set(new_ref)
                     other_modified_flag = True
+                else:
+                    # the reverse field is a refsList.
+                    # Append to the new one if not exists or clean if None
+                    if new_ref is None:
+                        if root._id in reverse_field:
+                            log.debug(
+                                "RefsList %r/%r.%r=%r remove %r",
+                                me._collection,
+                                reference,
+                                me._reverse,
+                                reverse_field,
+                                root._id,
+                            )
+                            reverse_field.remove(root._id)
+                            other_modified_flag = True
+
+                    elif new_ref not in reverse_field:
+                        log.debug(
+                            "%r/%r.%r=%r add %r",
+                            me._collection,
+                            reference,
+                            me._reverse,
+                            reverse_field,
+                            new_ref,
+                        )
+                        reverse_field.append(new_ref)
+                        other_modified_flag = True
 
-            if other_modified_flag:
-                other.save(**kwargs)
+                if other_modified_flag:
+                    other.save(**kwargs)
 
     def on_created(
         self, event_name, root, me, **kwargs
@@ -647,17 +656,19 @@ class RefsList(List):
 
         # Continue further with a list of ids
         if isinstance(list_ids_or_id, (RefsList, list, List)):
-            a = []
-            for other_id in list_ids_or_id:
-                other = self._coll_ref.new()
-                try:
-                    other.load(other_id)
-                except Exception:  # pylint: disable=broad-exception-caught
-                    continue
-                result = other.get_selectors(None, sel.copy())
-                if result is not None:
-                    a.append(result)
-            return a
+            with identity_map_scope():
+                self._coll_ref.prefetch(list_ids_or_id)
+                a = []
+                for other_id in list_ids_or_id:
+                    other = self._coll_ref.new()
+                    try:
+                        other.load(other_id)
+                    except Exception:  # pylint: disable=broad-exception-caught
+                        continue
+                    result = other.get_selectors(None, sel.copy())
+                    if result is not None:
+                        a.append(result)
+                return a
 
         # Continue further with a uniq id
         other = self._coll_ref.new()
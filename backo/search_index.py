@@ -0,0 +1,221 @@
+"""
+The search index module
+
+A :py:class:`SearchIndex` is an inverted index on the searchable
+:py:class:`String` fields of a collection (see the ``searchable`` option of
+:py:class:`Collection`). It gives, for a text query, the ``_id`` of matching
+objects ranked by relevance (BM25), without reading the other objects.
+
+The index is built on first use with one pass on the collection, then
+updated on each object created, saved or deleted (see :func:`Collection.changed`).
+"""
+
+# pylint: disable=wrong-import-position, wrong-import-order
+import math
+import re
+import sys
+import threading
+import unicodedata
+from typing import Any, Callable, Iterable
+
+# used for developpement
+sys.path.insert(1, "../../stricto")
+
+from stricto import SSyntaxError, String
+
+from .cursor import readable_field
+from .aggregation import parse_facet_keys
+from .filter_translator import MISSING, get_path, is_plain_field
+
+BM25_K1 = 1.2
+"""Saturation of the term frequency"""
+
+BM25_B = 0.75
+"""Normalization by the length of the text"""
+
+
+def tokenize(text: Any) -> list[str]:
+    """Return the words of a text, lower case and without accents
+
+    .. code-block:: python
+
+        tokenize("Les Misérables, tome 1")
+        # [ "les", "miserables", "tome", "1" ]
+
+    :param text: the text (or a list of texts)
+    :type text: Any
+    :rtype: list[str]
+    """
+    if isinstance(text, (list, tuple)):
+        return [token for t in text for token in tokenize(t)]
+    if not isinstance(text, str):
+        return []
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"\w+", text)
+
+
+def document_tokens(document: dict, paths: list[list[str]]) -> list[str]:
+    """Return the words of some fields of a raw document
+
+    :param document: the raw document (as returned by a :py:class:`DBConnector`)
+    :type document: dict
+    :param paths: the paths of fields, ex ``[["title"], ["about", "summary"]]``
+    :type paths: list[list[str]]
+    :rtype: list[str]
+    """
+    tokens = []
+    for path in paths:
+        value = get_path(document, path)
+        if value is not MISSING:
+            tokens.extend(tokenize(value))
+    return tokens
+
+
+def parse_searchable_fields(model, value: str | list[str]) -> list[str]:
+    """Return the searchable fields of a collection (see :py:class:`Collection`)
+
+    Each field must be a :py:class:`String` read as is in the database
+    (see :func:`is_plain_field`)
+
+    :param model: the model of the documents
+    :type model: Item
+    :param value: the fields, ex ``"title,$.summary"``
+    :type value: str | list[str]
+    :rtype: list[str]
+    :raise SSyntaxError: invalid field
+    """
+    fields = parse_facet_keys(value)
+    for key in fields:
+        field = readable_field(model, key)
+        if not isinstance(field, String) or not is_plain_field(field):
+            raise SSyntaxError('Field "{0}" cannot be searched', key)
+    return fields
+
+
+class SearchIndex:
+    """
+    An inverted index ``word -> { _id : number of occurrences }`` on some fields
+
+    .. code-block:: python
+
+        index = SearchIndex(["title", "summary"], loader)
+        index.search("miserables hugo")
+        # [ ( "Book_b0", 1.87 ), ( "Book_b3", 0.42 ) ]
+
+    :param fields: the indexed fields
+    :type fields: list[str]
+    :param loader: a function returning all documents, given the projection
+        (see :func:`projection`), called to build the index
+    :type loader: Callable[[dict], Iterable[dict]]
+    """
+
+    def __init__(self, fields: list[str], loader: Callable[[dict], Iterable[dict]]):
+        """Constructor"""
+        self.fields = fields
+        self._paths = [key.split(".") for key in fields]
+        self._loader = loader
+        self._postings: dict[str, dict[str, int]] | None = None
+        self._documents: dict[str, tuple[int, set[str]]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def projection(self) -> dict:
+        """Return the projection to read the indexed fields"""
+        return {"_id": 1} | {path[0]: 1 for path in self._paths}
+
+    def _tokens(self, document: dict) -> list[str]:
+        """Return the words of the indexed fields of a document"""
+        return document_tokens(document, self._paths)
+
+    def _build(self) -> None:
+        """Read all documents (the lock is held)"""
+        self._postings = {}
+        self._documents = {}
+        self._total_length = 0
+        for document in self._loader(self.projection()):
+            self._add(str(document["_id"]), document)
+
+    def _add(self, _id: str, document: dict) -> None:
+        """Index a document (the lock is held)"""
+        tokens = self._tokens(document)
+        for token in tokens:
+            postings = self._postings.setdefault(token, {})
+            postings[_id] = postings.get(_id, 0) + 1
+        self._documents[_id] = (len(tokens), set(tokens))
+        self._total_length += len(tokens)
+
+    def _remove(self, _id: str) -> None:
+        """Forget a document (the lock is held)"""
+        length, tokens = self._documents.pop(_id, (0, ()))
+        self._total_length -= length
+        for token in tokens:
+            postings = self._postings[token]
+            del postings[_id]
+            if not postings:
+                del self._postings[token]
+
+    def update(self, _id: str, document: dict | None) -> None:
+        """
+        Index the new version of a document (``None`` if deleted)
+
+        Nothing is done while the index is not built.
+
+        :param _id: the _id of the document
+        :type _id: str
+        :param document: the document (json format)
+        :type document: dict | None
+        """
+        with self._lock:
+            if self._postings is None:
+                return
+            self._remove(_id)
+            if document is not None:
+                self._add(_id, document)
+
+    def clear(self) -> None:
+        """
+        Forget all documents, the index is built again on next search
+        """
+        with self._lock:
+            self._postings = None
+            self._documents = {}
+            self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def search(self, query: str) -> list[tuple[str, float]]:
+        """
+        Return the ``( _id, score )`` of documents containing all words of the query,
+        the most relevant first (then by ``_id``)
+
+        :param query: the text query
+        :type query: str
+        :rtype: list[tuple[str, float]]
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        with self._lock:
+            if self._postings is None:
+                self._build()
+            postings = [self._postings.get(token) for token in tokens]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+
+            count = len(self._documents)
+            average = self._total_length / count if count else 0
+            scores = dict.fromkeys(postings[0], 0.0)
+            for p in postings[1:]:
+                scores = {_id: s for _id, s in scores.items() if _id in p}
+            for p in postings:
+                idf = math.log(1 + (count - len(p) + 0.5) / (len(p) + 0.5))
+                for _id in scores:
+                    tf = p[_id]
+                    length = self._documents[_id][0]
+                    norm = 1 - BM25_B + BM25_B * length / (average or 1)
+                    scores[_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
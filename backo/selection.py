@@ -2,9 +2,15 @@
 The Collection module
 """
 
-# pylint: disable=logging-fstring-interpolation
+# pylint: disable=logging-fstring-interpolation, too-many-lines
+import bisect
 import copy
+import heapq
+import itertools
 import sys
+import threading
+import uuid
+from collections import OrderedDict, deque
 from typing import Callable
 
 # used for developpement
@@ -21,20 +27,59 @@ from stricto import (
 
 # from .item import Item
 # from .action import Action
+from .aggregation import (
+    Aggregation,
+    Facets,
+    facet_values,
+    parse_facet_keys,
+    split_reference,
+)
+from .api_toolbox import make_etag
 from .collection_addon import CollectionAddon
 from .log import log_system, LogLevel
-from .error import DBError
+from .cursor import KeysetCursor, normalize_sort, readable_field, sort_field
+from .db_connector import document_sort_key
+from .filter_translator import (
+    MISSING,
+    RawMatcher,
+    build_projection,
+    compile_conditions,
+    filter_key,
+    get_path,
+    is_plain_field,
+    is_projectable,
+    split_filter,
+)
+from .error import NotFoundError
+from .identity_map import IdentityMap, identity_map_scope
+from .parallel import MatchJob, match_chunk, new_pool
+from .selection_cache import CachedSelectionStream, SelectionCache, copy_row
 
 log = log_system.get_or_create_logger("select", LogLevel.INFO)
 
+COUNT_MODES = ("exact", "estimate", "none")
+"""How the ``total`` of a selection is computed (see :func:`Selection.select`)"""
+
+PLAN_CACHE_SIZE = 256
+"""The number of filters whose split is kept by each selection (see :func:`Selection.plan`)"""
+
+MATERIALIZED_BATCH_SIZE = 100
+"""The number of objects read at once to build the rows of a materialized selection"""
+
 KPARSE_MODEL = {
     "can_read|read": {"type": bool | Callable, "default": True},
     "filter": Callable | dict | tuple,
     "db_filter": Callable,
+    "materialized": {"type": bool, "default": False},
+    "materialized_rows": {"type": bool, "default": False},
+    "cache_ttl": {"type": int | float, "default": 0},
+    "cache_size": {"type": int, "default": 128},
+    "workers": {"type": int, "default": 0},
+    "chunk_size": {"type": int, "default": 1000},
 }
 
 
-class Selection(CollectionAddon):
+class Selection(CollectionAddon):  # pylint: disable=too-many-instance-attributes
     """
     The Selection refer to a select on a "table"
 
@@ -48,6 +93,18 @@ class Selection(CollectionAddon):
           the filter whe want. See stricto for details
         - *db_filter=* ``dict`` --
           The filter to pass to the :py:class:`DBConnector`
+        - *materialized=* ``bool`` --
+          Keep the ``_id`` of matching objects in memory (see :func:`materialize`)
+        - *materialized_rows=* ``bool`` --
+          Keep also the rows (implies ``materialized``)
+        - *cache_ttl=* ``float`` --
+          Keep pages for this number of seconds (0 = no cache, see :func:`stream`)
+        - *cache_size=* ``int`` --
+          The number of pages kept (default 128)
+        - *workers=* ``int`` --
+          Match the filter in this number of processes (0 = no parallel scan, see :func:`select`)
+        - *chunk_size=* ``int`` --
+          The number of objects given at once to a process (default 1000)
 
 
 
@@ -68,8 +125,8 @@ class Selection(CollectionAddon):
         fb = Selection( [ "$.title", "$.subtitle" ], filter={ "$.author.nationality.a2" : "FR" } )
         books.register_selection("french_book", fb )
 
-        nfb = Selection( [ "$.title", "$.subtitle" ], filter={ "$.author.nationality.a2" : ( "$ne", "FR" ) } )
-        books.register_selection("non_french_book", nfb )
+        nsb = Selection( [ "$.title" ], filter={ "$.subtitle" : None }, materialized=True )
+        books.register_selection("no_subtitle_book", nsb )
 
         # ...
     """
@@ -84,6 +141,18 @@ class Selection(CollectionAddon):
           the filter whe want. See stricto for details
         - *db_filter=* ``dict`` --
           The filter to pass to the :py:class:`DBConnector`
+        - *materialized=* ``bool`` --
+          Keep the ``_id`` of matching objects in memory
+        - *materialized_rows=* ``bool`` --
+          Keep also the rows
+        - *cache_ttl=* ``float`` --
+          Keep pages for this number of seconds
+        - *cache_size=* ``int`` --
+          The number of pages kept
+        - *workers=* ``int`` --
+          The number of processes matching the filter
+        - *chunk_size=* ``int`` --
+          The number of objects given at once to a process
 
         """
         options = Kparse(kwargs, KPARSE_MODEL)
@@ -94,11 +163,54 @@ class Selection(CollectionAddon):
 
         self._filter = options.get("filter")
         self._db_filter = options.get("db_filter")
+        self._plans = OrderedDict()
+        self._plans_lock = threading.Lock()
+
+        # The materialized selection (built on first use)
+        self._keep_rows = (
+            options.get("materialized_rows") is True and self._selectors is not None
+        )
+        self._materialized = (
+            options.get("materialized") is True
+            or options.get("materialized_rows") is True
+        )
+        if self._materialized and callable(self._filter):
+            raise SSyntaxError(
+                "A selection with a filter function cannot be materialized"
+            )
+        self._ids: list[str] | None = None
+        self._rows: dict[str, list] = {}
+        self._depends_on_others = False
+        self._materialized_lock = threading.Lock()
+
+        # The cache of pages
+        self._cache = None
+        if options.get("cache_ttl") > 0:
+            self._cache = SelectionCache(
+                options.get("cache_size"), options.get("cache_ttl")
+            )
+
+        # Parallel scans
+        self._workers = options.get("workers")
+        self._chunk_size = options.get("chunk_size")
+        self._pool = None
+        self._pool_lock = threading.Lock()
 
         CollectionAddon.__init__(self)
         self._permissions = Permissions(**kwargs)
         self._permissions.add_or_modify_permission("read", options.get("can_read"))
 
+    def pool(self):
+        """Return the pool of worker processes of the selection (started on first use)
+
+        :meta private:
+
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = new_pool(self._workers)
+            return self._pool
+
     def get_schema(self) -> dict:
         """
         Return schema for this selection
@@ -148,70 +260,1270 @@ class Selection(CollectionAddon):
 
         return f
 
-    def select(
+    def plan(self, match_filter=None) -> tuple:
+        """
+        Merge the filter with the selection filter and split it (see :func:`split_filter`)
+        in conditions for the database, conditions matched on raw documents and
+        the filter remaining to match on Items
+
+        The result is cached by filter, so conditions (and their compiled predicates)
+        are built once for filters used again.
+
+        :param match_filter: The filter given to :func:`select`
+        :return: the conditions for the database, for raw documents and the remaining filter
+        :rtype: tuple[list[Condition], list[Condition], dict | tuple | None]
+
+        :meta private:
+
+        """
+        key = filter_key(match_filter)
+        if key is not None:
+            with self._plans_lock:
+                plan = self._plans.get(key)
+                if plan is not None:
+                    self._plans.move_to_end(key)
+                    return plan
+
+        filter_object = self._merge_and_filter(self._filter, match_filter)
+        db_conditions, remaining = split_filter(
+            filter_object, self.collection.model, self.collection.db_handler
+        )
+        raw_conditions, remaining = split_filter(
+            remaining, self.collection.model, RawMatcher()
+        )
+        plan = (db_conditions, raw_conditions, remaining)
+
+        if key is not None:
+            with self._plans_lock:
+                self._plans[key] = plan
+                while len(self._plans) > PLAN_CACHE_SIZE:
+                    self._plans.popitem(last=False)
+        return plan
+
+    def materialize(self) -> tuple[list[str], dict | None] | None:
+        """
+        Return the sorted ``_id`` of objects matching the filter of the selection,
+        and the rows kept (if ``materialized_rows``), or ``None`` if not materialized
+
+        The list is built on first use, then updated on each object created, saved
+        or deleted in the collection (see :func:`on_write`). A :func:`select` without
+        filter nor sort is served from it, without scanning the collection.
+
+        Read permissions are checked when objects are returned (not here).
+        Only changes done by this backoffice are seen.
+
+        :rtype: tuple[list[str], dict | None] | None
+        """
+        if not self._materialized:
+            return None
+        with self._materialized_lock:
+            if self._ids is None:
+                self._ids = self._build_ids()
+            return self._ids, (self._rows if self._keep_rows else None)
+
+    def _build_ids(self) -> list[str]:
+        """
+        Read the ``_id`` of all objects matching the filter of the selection
+
+        :meta private:
+
+        """
+        db_handler = self.collection.db_handler
+        conditions, raw_conditions, remaining = self.plan(None)
+        db_filter = db_handler.translate_filter(conditions, self._db_filter)
+        raw_match = compile_conditions(raw_conditions) if raw_conditions else None
+        self._depends_on_others = remaining is not None
+        self._rows.clear()
+
+        projection = {}
+        if db_handler.supports_projection and remaining is None:
+            projection = {"_id": 1} | {c.path[0]: 1 for c in raw_conditions}
+
+        ids = []
+        with identity_map_scope():
+            for obj in db_handler.select_iter(db_filter, projection, 0, 0, {}):
+                obj["_id"] = str(obj["_id"])
+                if raw_match is not None and not raw_match(obj):
+                    continue
+                if remaining is not None:
+                    o = self.collection.new_item()
+                    o.set(obj)
+                    o.set_status_saved()
+                    if o.match(remaining) is not True:
+                        continue
+                ids.append(obj["_id"])
+        log.debug(f"materialize {self.name} with {len(ids)} objects")
+        return sorted(ids)
+
+    def on_write(self, _id: str | None, o=None, deleted: bool = False) -> None:
+        """
+        Update the materialized selection after a write in the collection
+
+        The object is matched with the filter of the selection. With a native
+        filter (``db_filter``, or the ``restriction`` of the connector), a
+        matching object may be excluded by the database: the ``_id`` are read
+        again (see :func:`_build_ids`).
+
+        :param _id: The _id of the object (``None`` for all objects)
+        :type _id: str | None
+        :param o: The object created or saved (``None`` if written directly in the database)
+        :type o: Item | None
+        :param deleted: the object is deleted
+        :type deleted: bool
+
+        :meta private:
+
+        """
+        if not self._materialized:
+            return
+        matching = False
+        if o is not None and not deleted:
+            matching = self._filter is None or o.match(self._filter) is True
+
+        # Native filters given to the database (see _build_ids) cannot be matched here
+        native = (
+            self._db_filter is not None
+            or self.collection.db_handler.restriction_filter is not None
+        )
+
+        with self._materialized_lock:
+            if _id is None or (o is None and not deleted) or (matching and native):
+                self._rows.clear()
+                self._ids = None
+                return
+            self._rows.pop(_id, None)
+            if self._ids is None:
+                return
+            ids = self._ids
+            i = bisect.bisect_left(ids, _id)
+            present = i < len(ids) and ids[i] == _id
+            # A new list, so streams keep the one they are reading
+            if matching and not present:
+                self._ids = ids[:i] + [_id] + ids[i:]
+            elif present and not matching:
+                self._ids = ids[:i] + ids[i + 1 :]
+
+    def on_other_write(self) -> None:
+        """
+        Update the materialized selection after a write in another collection
+
+        Rows are dropped (they may show referenced objects), and the ``_id``
+        are read again if the filter is not only on fields of the object.
+
+        :meta private:
+
+        """
+        if not self._materialized:
+            return
+        with self._materialized_lock:
+            self._rows.clear()
+            if self._depends_on_others:
+                self._ids = None
+
+    def keep_row(self, _id: str, ids: list[str], row: list) -> None:
+        """
+        Keep the row of an object of the materialized selection
+
+        :meta private:
+
+        """
+        with self._materialized_lock:
+            if self._keep_rows and ids is self._ids:
+                self._rows[_id] = row
+
+    def stream(
         self,
         match_filter=None,
         page_size=0,
         num_of_element_to_skip=0,
         db_sort_object={"_id": 1},
-    ):
+        cursor: str | None = None,
+        count: str = "exact",
+        query: str | None = None,
+    ) -> (
+        "SelectionStream"
+    ):  # pylint: disable=too-many-arguments, too-many-positional-arguments
         """
-        Do the selection
+        Do the selection, row by row
+
+        Same parameters as :func:`select`, but rows are produced on demand
+        (see :py:class:`SelectionStream`)
+
+        With a ``cache_ttl``, pages are kept. The same page (same filter, page, skip,
+        sort, cursor, count, query and user if permissions depend on it) is read again
+        only if an object of the backoffice has changed, or once the TTL is over.
+
+        :return: an iterable on the rows
+        :rtype: SelectionStream | CachedSelectionStream
         """
-        if self.collection is None:
-            raise SSyntaxError(
-                'The selection "{0}" is not registered into a collection. (miss register_selection ?)',
-                self.name,
-            )
+        key = self._cache_key(
+            match_filter,
+            page_size,
+            num_of_element_to_skip,
+            db_sort_object,
+            cursor,
+            count,
+            query,
+        )
+        if key is not None:
+            if self.can_read() is False:
+                raise SRightError("Execute {0} selection is forbidden", self.name)
+            versions = self.collection.versions()
+            entry = self._cache.get(key, versions)
+            if entry is not None:
+                return CachedSelectionStream(entry, page_size, num_of_element_to_skip)
 
+        rows = SelectionStream(
+            self,
+            match_filter,
+            page_size,
+            num_of_element_to_skip,
+            db_sort_object,
+            cursor,
+            count,
+            query,
+        )
+        if key is not None:
+            rows.cache = (self._cache, key, versions)
+        return rows
+
+    def etag(  # pylint: disable=too-many-arguments, too-many-positional-arguments
+        self,
+        match_filter=None,
+        page_size=0,
+        num_of_element_to_skip=0,
+        db_sort_object={"_id": 1},
+        cursor: str | None = None,
+        count: str = "exact",
+        query: str | None = None,
+    ) -> str | None:
+        """
+        Return the ``ETag`` of a page, without reading it
+
+        Same parameters as :func:`stream`. The etag is a hash of the parameters,
+        the user and the states of collections read in the database
+        (see :func:`Collection.states`), so it changes as soon as an object
+        of the backoffice is written, whatever the process writing it.
+        States may only have a precision of one second (``_meta.mtime``), so
+        versions of collections are added for writes done by this process.
+        The etag is None if there is no user, or if states are unknown.
+
+        :rtype: str | None
+
+        :meta private:
+
+        """
         if self.can_read() is False:
             raise SRightError("Execute {0} selection is forbidden", self.name)
+        user_key = self.collection.user_key()
+        if user_key is None:
+            return None
+        states = self.collection.states()
+        if states is None:
+            return None
+        return make_etag(
+            self.collection.name,
+            self.name,
+            states,
+            self.collection.versions(),
+            user_key,
+            match_filter,
+            page_size,
+            num_of_element_to_skip,
+            db_sort_object,
+            cursor,
+            count,
+            query,
+        )
+
+    def _cache_key(self, *args) -> tuple | None:
+        """
+        Return the key of a page in the cache, or None if not cachable
+
+        :meta private:
+
+        """
+        if self._cache is None:
+            return None
+        key = filter_key(args)
+        if key is None:
+            return None
 
-        # Do the DB selection without pagination
-        db_list = self.collection.db_handler.select(
-            self._db_filter, {}, 0, 0, db_sort_object
+        collection = self.collection
+        functions = [
+            collection._permissions.get("read", True),
+            self._permissions.get("read", True),
+            self._filter,
+            self._db_filter,
+            collection.db_handler.restriction_filter,
+            collection._read_filter,
+        ]
+        if any(callable(f) for f in functions) or not is_projectable(collection.model):
+            # The result depends on the user
+            user_key = collection.user_key()
+            return None if user_key is None else (key, user_key)
+        return (key,)
+
+    def aggregate(
+        self,
+        match_filter=None,
+        group_by: str | list[str] | None = None,
+        metrics: dict | None = None,
+    ) -> dict:
+        """
+        Group the objects of the selection and count them (see :py:class:`Aggregation`)
+
+        .. code-block:: python
+
+            selection.aggregate({"owner": "bebert"}, "status", {"sum": "price"})
+            # { "result" : [ { "group" : { "status" : "open" }, "count" : 3,
+            #                  "sum" : { "price" : 12 } }, ... ], "total" : 2 }
+
+        Objects are not sent, only groups. The aggregation is done by the database
+        if possible (like the filter, see :func:`select`), otherwise in one pass on objects.
+
+        :param match_filter: the filter, merged with the filter of the selection
+        :type match_filter: dict | None
+        :param group_by: the fields to group by, ex ``"status,owner"`` (none = one group)
+        :type group_by: str | list[str] | None
+        :param metrics: fields for ``sum``, ``min`` and ``max``, ex ``{ "sum" : [ "price" ] }``
+        :type metrics: dict | None
+        :return: a dict with the ``result`` list of groups and the ``total`` number of groups
+        :rtype: dict
+        :raise SSyntaxError: invalid field or operator
+        """
+        aggregation = Aggregation(self.collection.model, group_by, metrics)
+        rows = SelectionStream(self, match_filter, 0, 0, {"_id": 1}, None, "none")
+        result = rows.aggregate(aggregation)
+        return {"result": result, "total": len(result)}
+
+    def facets(
+        self, match_filter=None, fields: str | list[str] | None = None, limit: int = 0
+    ) -> dict[str, list[dict]]:
+        """
+        Return the distinct values of fields of the selection, with the number
+        of objects for each value (see :py:class:`Facets`)
+
+        .. code-block:: python
+
+            selection.facets({"year": ("$gt", 1900)}, "status,author.nationality")
+            # { "status" : [ { "value" : "open", "count" : 3 }, ... ],
+            #   "author.nationality" : [ { "value" : "FR", "count" : 4 }, ... ] }
+
+        All fields are computed in one pass (or by the database, like :func:`aggregate`).
+        A field of a referenced object (through a :py:class:`Ref`) is read once
+        by referenced object.
+
+        :param match_filter: the filter, merged with the filter of the selection
+        :type match_filter: dict | None
+        :param fields: the fields, ex ``"status,owner"``
+        :type fields: str | list[str] | None
+        :param limit: the maximum number of values by field (0 = all)
+        :type limit: int
+        :return: the values by field, the most frequent first
+        :rtype: dict[str, list[dict]]
+        :raise SSyntaxError: invalid field
+        """
+        keys = parse_facet_keys(fields)
+        references = {key: self._facet_reference(key) for key in keys}
+        facets = Facets(
+            self.collection.model,
+            [references[key][0] if references[key] else key for key in keys],
         )
-        if not isinstance(db_list, list):
-            raise DBError(
-                'select "{0}" return a database error (not a list)', self.name
-            )
+        rows = SelectionStream(self, match_filter, 0, 0, {"_id": 1}, None, "none")
+        values = rows.facets(facets)
 
-        output = {
-            "result": [],
-            "total": 0,
+        result = {}
+        for key in keys:
+            if references[key] is None:
+                result[key] = values[key]
+            else:
+                local_key, collection, other_key = references[key]
+                result[key] = self._follow_reference(
+                    collection, other_key, values[local_key]
+                )
+            if limit > 0:
+                result[key] = result[key][:limit]
+        return result
+
+    def _facet_reference(self, key: str) -> tuple | None:
+        """
+        Return ``( key of the Ref, referenced collection, key in it )``
+        for a key going through references, or None. Check all fields.
+
+        :meta private:
+
+        """
+        reference = None
+        collection, path = self.collection, key
+        while True:
+            local_key, name, other_key = split_reference(collection.model, path)
+            readable_field(collection.model, local_key)
+            if name is None:
+                return reference
+            other = collection.get_other_collection(name)
+            if other is None:
+                raise SSyntaxError('Unknown collection "{0}" for "{1}"', name, key)
+            if reference is None:
+                reference = (local_key, other, other_key)
+            collection, path = other, other_key
+
+    def _follow_reference(self, collection, key: str, values: list[dict]) -> list[dict]:
+        """
+        Return values of a field of referenced objects, from values of the Ref
+        (objects not readable give ``None``)
+
+        :meta private:
+
+        """
+        ids = [v["value"] for v in values if v["value"] is not None]
+        with identity_map_scope():
+            objects = {o._id.get_value(): o for o in collection.get_by_ids(ids)}
+            counts = {}
+            for v in values:
+                value = None
+                o = objects.get(v["value"])
+                if (
+                    o is not None
+                    and collection.is_allowed_to("read", o) is True
+                    and collection.matches_read_filter(o)
+                ):
+                    field = o.select(f"$.{key}")
+                    value = field.get_value() if field is not None else None
+                counts[value] = counts.get(value, 0) + v["count"]
+        return facet_values(counts)
+
+    def select(
+        self,
+        match_filter=None,
+        page_size=0,
+        num_of_element_to_skip=0,
+        db_sort_object={"_id": 1},
+        cursor: str | None = None,
+        count: str = "exact",
+        query: str | None = None,
+    ):  # pylint: disable=too-many-arguments, too-many-positional-arguments
+        """
+        Do the selection
+
+        Conditions of the filter the :py:class:`DBConnector` can translate are given
+        to the database (see :func:`split_filter`), the others are matched on each :py:class:`Item`.
+        If nothing remains to match, the pagination is done by the database too.
+
+        With ``workers``, objects are matched by a pool of processes, ``chunk_size``
+        objects at once (see :py:class:`MatchJob`). Matching objects keep the order
+        of the database.
+
+        :param match_filter: the filter, merged with the filter of the selection
+        :type match_filter: dict | None
+        :param page_size: number of elements per page (0 = all)
+        :type page_size: int
+        :param num_of_element_to_skip: number of element to skip from beginning
+        :type num_of_element_to_skip: int
+        :param db_sort_object: the sort given to the database
+        :type db_sort_object: dict
+        :param cursor: the ``_cursor`` of the previous page, to start after its last element
+        :type cursor: str | None
+        :param count: how to compute the ``total``. ``exact`` (default), ``estimate``
+            (cheap, may be more than the exact total) or ``none`` (``total`` is ``None``).
+            Except for ``exact``, the selection stops as soon as the page is full.
+        :type count: str
+        :param query: a text query on the searchable fields of the collection
+            (see :py:class:`SearchIndex`). Only objects containing the words are read,
+            the most relevant first if the sort is the default one (on ``_id``).
+        :type query: str | None
+        :return: a dict with the ``result`` list, the ``total`` number of matching elements
+            and the ``_cursor`` for the next page (``None`` if the page is not full)
+        :rtype: dict
+        """
+        rows = self.stream(
+            match_filter,
+            page_size,
+            num_of_element_to_skip,
+            db_sort_object,
+            cursor,
+            count,
+            query,
+        )
+        result = list(rows)
+        return {
+            "result": result,
+            "total": rows.total,
             "_skip": num_of_element_to_skip,
             "_page": page_size,
+            "_cursor": rows.next_cursor,
         }
 
-        # build the filter with filter given and self_filter
+
+class SelectionStream:  # pylint: disable=too-many-instance-attributes, too-few-public-methods
+    """
+    The rows of a selection, produced one by one
+
+    The filter is split and the permissions are checked at creation.
+    Rows are read from the :py:class:`DBConnector` while iterating, and only rows
+    returned are hydrated into an :py:class:`Item` (plus rows needing a match in python).
+
+    :py:attr:`total` and :py:attr:`next_cursor` are available once the iteration is over.
+
+    :param selection: the selection
+    :type selection: Selection
+
+    .. code-block:: python
+
+        rows = fb.stream({}, 10, 0)
+        for row in rows:
+            print(row)
+        print(rows.total)
+
+    """
+
+    def __init__(
+        self,
+        selection: Selection,
+        match_filter=None,
+        page_size=0,
+        num_of_element_to_skip=0,
+        db_sort_object={"_id": 1},
+        cursor: str | None = None,
+        count: str = "exact",
+        query: str | None = None,
+    ):  # pylint: disable=too-many-arguments, too-many-positional-arguments, too-many-statements, too-many-branches
+        """Constructor"""
+        if selection.collection is None:
+            raise SSyntaxError(
+                'The selection "{0}" is not registered into a collection. (miss register_selection ?)',
+                selection.name,
+            )
+
+        if selection.can_read() is False:
+            raise SRightError("Execute {0} selection is forbidden", selection.name)
+
+        if count not in COUNT_MODES:
+            raise SSyntaxError(
+                'Invalid count "{0}" (must be one of {1})', count, COUNT_MODES
+            )
+
+        self.query = query or None
+        if self.query is not None:
+            if not selection.collection.searchable:
+                raise SSyntaxError(
+                    'Collection "{0}" has no searchable field',
+                    selection.collection.name,
+                )
+            if cursor:
+                raise SSyntaxError("A cursor cannot be used with a text query")
+
+        self.selection = selection
+        self.count = count
+        self.collection = selection.collection
+        self.page_size = page_size
+        self.num_of_element_to_skip = num_of_element_to_skip
+
+        # The _id ends the sort, so the order is the same for each page
+        self.sort = normalize_sort(db_sort_object)
+        self.db_sort_object = dict(self.sort)
+        self.cursor = KeysetCursor.decode(cursor, self.sort) if cursor else None
+
+        # Keys of computed fields are sorted with values of Items
+        self.sort_on_items = []
+        for key, _ in self.sort:
+            field = sort_field(self.collection.model, key)
+            if field is not None and not is_plain_field(field):
+                self.sort_on_items.append(key)
+
+        # Sort here (with a heap) if the database cannot
+        self.sort_in_python = (
+            not selection.collection.db_handler.supports_sort
+            or len(self.sort_on_items) > 0
+        )
+
+        self.total = None
+        """The number of matching elements (set at the end of the iteration)"""
+
+        self.next_cursor = None
+        """The cursor for the next page (set at the end of the iteration if the page is full)"""
+
+        # Objects the user can read are given by the read filter (if any)
+        read_filter = self.collection.get_read_filter()
+
+        # Without filter nor sort, read the materialized selection (if any)
+        self.materialized = None
+        if (
+            not match_filter
+            and read_filter is None
+            and self.query is None
+            and self.sort == [("_id", 1)]
+        ):
+            self.materialized = selection.materialize()
+
+        self.identity_map = IdentityMap()
+        """Objects loaded by references in filters and selectors, dropped with the stream"""
+
+        self.cache = None
+        """The ``( cache, key, versions )`` to keep the page once read (see :func:`Selection.stream`)"""
+
+        db_handler = self.collection.db_handler
+
+        # build the filter with filter given and self_filter, and
+        # give to the database all conditions it can handle
         # --------------------------------------------------
-        filter_object = self._merge_and_filter(self._filter, match_filter)
+        if read_filter is not None:
+            match_filter = selection._merge_and_filter(match_filter, read_filter)
+        conditions, self.raw_conditions, self.remaining_filter = selection.plan(
+            match_filter
+        )
+        self.db_filter = db_handler.translate_filter(conditions, selection._db_filter)
+        self.db_conditions = conditions
 
-        # Do the selection on the object
-        index = 0
-        log.debug(f"try match {filter_object} for {len(db_list)}")
-        for obj in db_list:
+        # Filters only on columns of the collection are evaluated on them
+        self.column_conditions = conditions + self.raw_conditions
+        self.columns = self._column_store()
+
+        # Conditions the database cannot handle are first matched on raw documents
+        self.raw_match = (
+            compile_conditions(self.raw_conditions) if self.raw_conditions else None
+        )
+
+        # Without remaining filter nor read restriction, no Item is needed to match
+        self.need_match = (
+            self.remaining_filter is not None
+            or self.collection._permissions.is_strictly_allowed_to("read") is not True
+        )
+
+        # Match in worker processes if asked, when filtering is needed
+        # and what is needed can be sent to them
+        self.job = None
+        """The pickled :py:class:`MatchJob` given to worker processes"""
+        if selection._workers > 1 and (self.need_match or self.raw_match is not None):
+            self.job = MatchJob(self).dumps()
+        self.parallel = self.job is not None
+
+        # The database can do the pagination only if no more filtering is needed
+        self.paginate_in_db = (
+            db_handler.supports_pagination
+            and not self.need_match
+            and self.raw_match is None
+            and not self.sort_in_python
+        )
+
+        # The filter for the page. The cursor is checked in python if not translatable
+        self.page_filter = self.db_filter
+        self.cursor_in_db = False
+        if self.cursor is not None and self.paginate_in_db:
+            cursor_filter = db_handler.translate_cursor(self.cursor, self.db_filter)
+            if cursor_filter is None:
+                self.paginate_in_db = False
+            else:
+                self.page_filter = cursor_filter
+                self.cursor_in_db = True
+
+        # Read only the fields we need (the whole object if the read permission is a function)
+        self.projection = {}
+        if (
+            db_handler.supports_projection
+            and not self.sort_on_items
+            and not callable(self.collection._permissions.get("read", True))
+        ):
+            self.projection = build_projection(
+                selection._selectors,
+                self.remaining_filter,
+                self.collection.model,
+                self.db_sort_object,
+            )
+            if self.projection:
+                self.projection.update((c.path[0], 1) for c in self.raw_conditions)
+
+        log.debug(
+            f"select {selection.name} db_filter={self.db_filter} "
+            f"raw={self.raw_conditions} remaining={self.remaining_filter} paginate_in_db={self.paginate_in_db} "
+            f"cursor={self.cursor} cursor_in_db={self.cursor_in_db} projection={self.projection}"
+        )
+
+    def _column_store(self):
+        """Return the :py:class:`ColumnStore` if the filter can be evaluated on it"""
+        column_store = self.collection.column_store
+        if column_store is None or self.materialized is not None:
+            return None
+        if self.query is not None or self.remaining_filter is not None:
+            return None
+        if self.selection._db_filter is not None:
+            return None
+        if self.collection.db_handler.restriction_filter is not None:
+            return None
+        if not column_store.has(".".join(c.path) for c in self.column_conditions):
+            return None
+        return column_store
+
+    def _hydrate(self, obj: dict):
+        """Build the Item from the raw document"""
+        o = self.collection.new_item()
+        o.set(obj)
+        o.enable_permissions()
+        o.set_status_saved()
+        return o
+
+    def _match(self, obj: dict):
+        """Return the Item from the raw document if readable and matching, or None"""
+        o = self._hydrate(obj)
+
+        # Ignore all elements matched by the refuse filter
+        if self.collection._permissions.is_allowed_to("read", o) is not True:
+            return None
+
+        if (
+            self.remaining_filter is not None
+            and o.match(self.remaining_filter) is not True
+        ):
+            log.debug(f"No match {self.remaining_filter} for {o}")
+            return None
+        return o
+
+    def _sort_document(self, obj: dict, o) -> dict:
+        """Return the document giving the values of sort keys"""
+        if not self.sort_on_items:
+            return obj
+        return self._values_document(
+            obj, o, [k for k, _ in self.sort], self.sort_on_items
+        )
+
+    def _values_document(
+        self, obj: dict, o, keys: list[str], keys_on_items: list[str]
+    ) -> dict:
+        """Return a document with values of keys, read in the Item for ``keys_on_items``"""
+        document = {}
+        for key in keys:
+            if key in keys_on_items:
+                field = o.select(f"$.{key}")
+                value = field.get_value() if field is not None else None
+            else:
+                value = get_path(obj, key.split("."))
+                if value is MISSING:
+                    continue
+            path = key.split(".")
+            node = document
+            for name in path[:-1]:
+                node = node.setdefault(name, {})
+            node[path[-1]] = value
+        return document
+
+    def aggregate(self, aggregation: Aggregation) -> list[dict]:
+        """Return the groups of matching objects (see :func:`Selection.aggregate`)
+
+        The aggregation is evaluated on the :py:class:`ColumnStore` if it has all
+        fields, or given to the database if no filtering remains, and no
+        computed field is used. Otherwise, it is evaluated here in one pass.
+
+        :param aggregation: The aggregation
+        :type aggregation: Aggregation
+        :rtype: list[dict]
+        """
+        if self._on_columns(aggregation):
+            return self._evaluate_on_columns(aggregation)
+        keys_on_items = self._keys_on_items(aggregation.keys())
+        if not self.need_match and self.raw_match is None and not keys_on_items:
+            return self.collection.db_handler.aggregate(self.db_filter, aggregation)
+        return self._evaluate(aggregation, keys_on_items)
+
+    def facets(self, facets: Facets) -> dict[str, list[dict]]:
+        """Return the values of fields of matching objects (see :func:`Selection.facets`)
+
+        Like :func:`aggregate`, evaluated on the columns, given to the database
+        or evaluated here in one pass.
+
+        :param facets: The facets
+        :type facets: Facets
+        :rtype: dict[str, list[dict]]
+        """
+        if self._on_columns(facets):
+            return self._evaluate_on_columns(facets)
+        keys_on_items = self._keys_on_items(facets.keys())
+        if not self.need_match and self.raw_match is None and not keys_on_items:
+            return self.collection.db_handler.facets(self.db_filter, facets)
+        return self._evaluate(facets, keys_on_items)
+
+    def _on_columns(self, aggregation: Aggregation | Facets) -> bool:
+        """Return True if the aggregation can be evaluated on the columns"""
+        return (
+            self.columns is not None
+            and not self.need_match
+            and self.columns.has(aggregation.keys())
+        )
+
+    def _evaluate_on_columns(
+        self, aggregation: Aggregation | Facets
+    ) -> list[dict] | dict[str, list[dict]]:
+        """Evaluate an aggregation (or facets) on the :py:class:`ColumnStore`"""
+        for document in self.columns.select(self.column_conditions).values():
+            aggregation.add(document)
+        return aggregation.result()
+
+    def _keys_on_items(self, keys: list[str]) -> list[str]:
+        """Return keys of computed fields (read in Items)"""
+        return [
+            key
+            for key in keys
+            if not is_plain_field(sort_field(self.collection.model, key))
+        ]
+
+    def _evaluate(
+        self, aggregation: Aggregation | Facets, keys_on_items: list[str]
+    ) -> list[dict] | dict[str, list[dict]]:
+        """Evaluate an aggregation (or facets) in one pass on matching objects"""
+        db_handler = self.collection.db_handler
+        keys = aggregation.keys()
+        projection = {}
+        if (
+            db_handler.supports_projection
+            and not keys_on_items
+            and not callable(self.collection._permissions.get("read", True))
+        ):
+            projection = build_projection(
+                [], self.remaining_filter, self.collection.model, dict.fromkeys(keys, 1)
+            )
+            if projection:
+                projection.update((c.path[0], 1) for c in self.raw_conditions)
+
+        rows, raw_match, need_match = self._filtering(
+            db_handler.select_iter(self.db_filter, projection, 0, 0, {})
+        )
+        for obj in rows:
             obj["_id"] = str(obj["_id"])
-            o = self.collection.new_item()
+            if raw_match is not None and not raw_match(obj):
+                continue
+            if not need_match and not keys_on_items:
+                aggregation.add(obj)
+                continue
+            with identity_map_scope(self.identity_map):
+                o = self._match(obj) if need_match else self._hydrate(obj)
+            if o is not None:
+                aggregation.add(self._values_document(obj, o, keys, keys_on_items))
+        return aggregation.result()
+
+    def _filtering(self, rows) -> tuple:
+        """Return the rows to iterate, and the raw match and need of match to do on them
+
+        In parallel, the rows are only the matching ones, nothing remains to match.
+        """
+        if not self.parallel:
+            return rows, self.raw_match, self.need_match
+        return self._match_in_workers(rows), None, False
+
+    def _match_in_workers(self, rows):
+        """Yield the matching raw documents, matched by worker processes
+
+        Chunks are given to the pool as rows are read (a few ahead of the result),
+        and results are read in the same order.
+        """
+        workers, chunk_size = self.selection._workers, self.selection._chunk_size
+        pool = self.selection.pool()
+        token = uuid.uuid4().hex
+        pending = deque()
+        try:
+            for chunk in itertools.batched(rows, chunk_size):
+                for obj in chunk:
+                    obj["_id"] = str(obj["_id"])
+                future = pool.submit(match_chunk, token, self.job, chunk)
+                pending.append((chunk, future))
+                if len(pending) >= 2 * workers:
+                    yield from self._matching(*pending.popleft())
+            while pending:
+                yield from self._matching(*pending.popleft())
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def _matching(self, chunk: tuple[dict], future):
+        """Return the matching documents of a chunk, matched here if the worker could not"""
+        matches = future.result()
+        if matches is None:
+            matches = []
+            for obj in chunk:
+                if self.raw_match is not None and not self.raw_match(obj):
+                    matches.append(False)
+                    continue
+                if not self.need_match:
+                    matches.append(True)
+                    continue
+                with identity_map_scope(self.identity_map):
+                    matches.append(self._match(obj) is not None)
+        return itertools.compress(chunk, matches)
+
+    def _load(self, _id: str):
+        """Return the Item by _id, or None if not found"""
+        o = self.collection.new_item()
+        try:
+            o.load(_id)
+        except NotFoundError:
+            return None
+        return o
+
+    def _iter_ids(  # pylint: disable=too-many-locals, too-many-branches
+        self,
+        ids: list[str],
+        start: int = 0,
+        rows: dict | None = None,
+        documents: dict | None = None,
+    ):
+        """Yield the rows of the page from the sorted ``_id`` of matching objects
+        (of the materialized selection or of the :py:class:`ColumnStore`)
+
+        Without read restriction, only the page is read.
+
+        :param ids: the _id, in the order of the sort
+        :param start: the index of the first _id after the cursor
+        :param rows: the rows kept by the materialized selection
+        :param documents: the values of the sort keys by _id (for the next cursor)
+        """
+        check_read = (
+            self.collection._permissions.is_strictly_allowed_to("read") is not True
+        )
+        skip, page_size = self.num_of_element_to_skip, self.page_size
+        # Objects before the cursor are read only for an exact count
+        before = start if check_read and self.count == "exact" else 0
+        if check_read:
+            candidates = ids[start - before :]
+            index = 0
+        else:
+            candidates = ids[
+                start + skip : start + skip + page_size if page_size else None
+            ]
+            index = skip
+
+        total = 0
+        returned = 0
+        last = None
+        complete = True
+        for chunk in itertools.batched(candidates, MATERIALIZED_BATCH_SIZE):
+            with identity_map_scope(self.identity_map):
+                self.collection.prefetch(
+                    [
+                        _id
+                        for _id in chunk
+                        if check_read or rows is None or _id not in rows
+                    ]
+                )
+                for _id in chunk:
+                    before -= 1
+                    row = rows.get(_id) if rows is not None and not check_read else None
+                    if row is None:
+                        o = self._load(_id)
+                        if o is None:
+                            continue
+                        if (
+                            check_read
+                            and self.collection._permissions.is_allowed_to("read", o)
+                            is not True
+                        ):
+                            continue
+                        row = o.multi_select(self.selection._selectors)
+                        if rows is not None and not check_read:
+                            self.selection.keep_row(_id, ids, row)
+
+                    total += 1
+                    if before >= 0:
+                        continue
+                    in_page = index >= skip and (
+                        page_size == 0 or index < skip + page_size
+                    )
+                    index += 1
+                    if in_page:
+                        last, returned = _id, returned + 1
+                        yield copy.copy(row) if rows is not None else row
+                        if (
+                            returned == page_size
+                            and check_read
+                            and self.count != "exact"
+                        ):
+                            complete = False
+                            break
+            # Objects of the page are read once: only referenced objects are kept
+            for _id in chunk:
+                self.identity_map.discard(self.collection.name, _id)
+            if not complete:
+                break
+
+        if self.count == "none":
+            self.total = None
+        elif check_read and complete and (start == 0 or self.count == "exact"):
+            self.total = total
+        else:
+            self.total = len(ids)
+
+        if returned == page_size > 0:
+            self.next_cursor = KeysetCursor.from_document(
+                self.sort, documents[last] if documents is not None else {"_id": last}
+            ).encode()
 
-            o.set(obj)
-            o.enable_permissions()
-            o.set_status_saved()
-            # Do the post match filtering
+    def _search(self) -> tuple[list[tuple[str, float]], Callable | None]:
+        """Return the ``( _id, score )`` of objects containing the words of the query,
+        and the predicate to check conditions given to the database (if not done by it)
+        """
+        db_handler = self.collection.db_handler
+        ranked = db_handler.text_search(
+            self.db_filter, self.query, self.collection.searchable
+        )
+        if ranked is not None:
+            return ranked, None
+
+        ranked = self.collection.search_index.search(self.query)
+        if self.selection._db_filter is not None or (
+            db_handler.restriction_filter is not None
+        ):
+            # Native filters are only known by the database
+            projection = {"_id": 1} if db_handler.supports_projection else {}
+            allowed = {
+                str(obj["_id"])
+                for obj in db_handler.select_iter(self.db_filter, projection, 0, 0, {})
+            }
+            ranked = [(_id, score) for _id, score in ranked if _id in allowed]
+        return ranked, compile_conditions(self.db_conditions)
+
+    def _iter_search(self):  # pylint: disable=too-many-locals, too-many-branches
+        """Yield the rows of the page from the objects matching the text query
+
+        Only these objects are read. With the default sort, the most relevant first.
+        """
+        db_handler = self.collection.db_handler
+        ranked, db_match = self._search()
+        by_relevance = self.sort == [("_id", 1)]
+        skip, page_size = self.num_of_element_to_skip, self.page_size
+
+        total = 0
+        page = []
+        complete = True
+        for chunk in itertools.batched(
+            [_id for _id, _ in ranked], MATERIALIZED_BATCH_SIZE
+        ):
+            documents = db_handler.get_by_ids(list(chunk))
+            for _id in chunk:
+                obj = documents.get(_id)
+                if obj is None:
+                    continue
+                obj["_id"] = str(obj["_id"])
+                if db_match is not None and not db_match(obj):
+                    continue
+                if self.raw_match is not None and not self.raw_match(obj):
+                    continue
+
+                o = None
+                if self.need_match or self.sort_on_items:
+                    with identity_map_scope(self.identity_map):
+                        o = self._match(obj) if self.need_match else self._hydrate(obj)
+                    if o is None:
+                        continue
+
+                total += 1
+                if not by_relevance:
+                    page.append((self._sort_document(obj, o), obj, o))
+                elif total > skip and (page_size == 0 or total <= skip + page_size):
+                    page.append((None, obj, o))
+                    if len(page) == page_size and self.count != "exact":
+                        complete = False
+                        break
+            if not complete:
+                break
+
+        if not by_relevance:
+            page.sort(key=lambda candidate: document_sort_key(candidate[0], self.sort))
+            page = page[skip : skip + page_size if page_size else None]
+
+        for _, obj, o in page:
+            with identity_map_scope(self.identity_map):
+                if o is None:
+                    o = self._hydrate(obj)
+                row = o.multi_select(self.selection._selectors)
+            yield row
+
+        if self.count == "none":
+            self.total = None
+        elif complete:
+            self.total = total
+        else:
+            self.total = len(ranked)
+
+    def _iter_materialized(self, ids: list[str], rows: dict | None):
+        """Yield the rows of the page from the ``_id`` of the materialized selection"""
+        start = bisect.bisect_right(ids, self.cursor.values[0]) if self.cursor else 0
+        yield from self._iter_ids(ids, start, rows)
+
+    def _iter_columns(self):
+        """Yield the rows of the page, the filter and the sort done on the columns"""
+        documents = self.columns.select(self.column_conditions)
+        sort = self.sort
+        ids = sorted(documents, key=lambda _id: document_sort_key(documents[_id], sort))
+        start = 0
+        if self.cursor is not None:
+            start = bisect.bisect_left(
+                ids, True, key=lambda _id: self.cursor.match(documents[_id])
+            )
+        yield from self._iter_ids(ids, start, documents=documents)
 
-            # Ignore all elements matched by the refuse filter
-            if self.collection._permissions.is_allowed_to("read", o) is not True:
+    def _iter_sorted_in_python(self):
+        """Yield the rows of the page, sorted here
+
+        Only the objects up to the end of the page are kept, in a heap.
+        """
+        rows = self.collection.db_handler.select_iter(
+            self.db_filter, self.projection, 0, 0, {}
+        )
+        total = 0
+
+        def candidates():
+            nonlocal total
+            matching, raw_match, need_match = self._filtering(rows)
+            for obj in matching:
+                obj["_id"] = str(obj["_id"])
+                if raw_match is not None and not raw_match(obj):
+                    continue
+
+                o = None
+                if need_match or self.sort_on_items:
+                    with identity_map_scope(self.identity_map):
+                        o = self._match(obj) if need_match else self._hydrate(obj)
+                    if o is None:
+                        continue
+
+                total += 1
+                sort_document = self._sort_document(obj, o)
+                if self.cursor is None or self.cursor.match(sort_document):
+                    yield (sort_document, obj, o)
+
+        def key(candidate):
+            return document_sort_key(candidate[0], self.sort)
+
+        if self.page_size > 0:
+            limit = self.num_of_element_to_skip + self.page_size
+            page = heapq.nsmallest(limit, candidates(), key=key)
+        else:
+            page = sorted(candidates(), key=key)
+        page = page[self.num_of_element_to_skip :]
+
+        for _, obj, o in page:
+            with identity_map_scope(self.identity_map):
+                if o is None:
+                    o = self._hydrate(obj)
+                row = o.multi_select(self.selection._selectors)
+            yield row
+
+        self.total = None if self.count == "none" else total
+
+        # A full page has a next one (may be empty)
+        if len(page) == self.page_size > 0:
+            self.next_cursor = KeysetCursor.from_document(
+                self.sort, page[-1][0]
+            ).encode()
+
+    def __iter__(self):
+        """Yield the rows of the page (the result of :func:`Item.multi_select`)"""
+        if self.cache is None:
+            yield from self._iter_rows()
+            return
+
+        rows = []
+        for row in self._iter_rows():
+            rows.append(copy_row(row))
+            yield row
+        cache, key, versions = self.cache
+        cache.put(key, versions, rows, self.total, self.next_cursor)
+
+    def _iter_rows(
+        self,
+    ):  # pylint: disable=too-many-branches, too-many-statements, too-many-locals
+        """Yield the rows of the page"""
+        db_handler = self.collection.db_handler
+
+        if self.query is not None:
+            yield from self._iter_search()
+            return
+
+        if self.materialized is not None:
+            yield from self._iter_materialized(*self.materialized)
+            return
+
+        if self.columns is not None and self.columns.has(k for k, _ in self.sort):
+            yield from self._iter_columns()
+            return
+
+        if self.sort_in_python:
+            yield from self._iter_sorted_in_python()
+            return
+
+        if self.paginate_in_db:
+            skip, page_size = 0, 0
+            rows = db_handler.select_iter(
+                self.page_filter,
+                self.projection,
+                self.page_size,
+                self.num_of_element_to_skip,
+                self.db_sort_object,
+            )
+        else:
+            skip, page_size = self.num_of_element_to_skip, self.page_size
+            rows = db_handler.select_iter(
+                self.db_filter, self.projection, 0, 0, self.db_sort_object
+            )
+
+        # Count all matching objects, and the position of those after the cursor
+        total = 0
+        index = 0
+        returned = 0
+        last = None
+        complete = True
+        counted = True
+        rows, raw_match, need_match = self._filtering(rows)
+        for obj in rows:
+            obj["_id"] = str(obj["_id"])
+            if raw_match is not None and not raw_match(obj):
+                continue
+            after_cursor = (
+                self.cursor is None or self.cursor_in_db or self.cursor.match(obj)
+            )
+            if not after_cursor and self.count != "exact":
+                # Not matched, so not counted (the total is estimated)
+                counted = False
                 continue
 
-            if o.match(filter_object) is True:
-                if index >= num_of_element_to_skip:
-                    if page_size == 0 or (
-                        page_size > 0 and index < (num_of_element_to_skip + page_size)
-                    ):
-                        output["result"].append(o.multi_select(self._selectors))
-                index += 1
-            else:
-                log.debug(f"No match {filter_object} for {o}")
+            o = None
+            if need_match:
+                with identity_map_scope(self.identity_map):
+                    o = self._match(obj)
+                if o is None:
+                    continue
+
+            in_page = (
+                after_cursor
+                and index >= skip
+                and (page_size == 0 or index < skip + page_size)
+            )
+            total += 1
+            index += 1 if after_cursor else 0
+
+            if in_page:
+                last, returned = obj, returned + 1
+                with identity_map_scope(self.identity_map):
+                    if o is None:
+                        o = self._hydrate(obj)
+                    row = o.multi_select(self.selection._selectors)
+                yield row
+
+                # No need to go further without exact count
+                if returned == self.page_size and self.count != "exact":
+                    complete = False
+                    break
+
+        # All matching objects were read if the database did not paginate
+        all_read = not self.paginate_in_db or (
+            self.page_size == 0 and self.num_of_element_to_skip == 0 and not self.cursor
+        )
+        if self.count == "none":
+            self.total = None
+        elif complete and counted and all_read:
+            self.total = total
+        elif self.count == "estimate":
+            self.total = max(total, db_handler.estimate_count(self.db_filter))
+        else:
+            self.total = db_handler.count(self.db_filter)
 
-        output["total"] = index
-        return output
+        # A full page has a next one (may be empty)
+        if returned == self.page_size > 0:
+            self.next_cursor = KeysetCursor.from_document(self.sort, last).encode()
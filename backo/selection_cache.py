@@ -0,0 +1,125 @@
+"""
+The selection cache module
+
+Pages of a :py:class:`Selection` are kept for a short time, so identical
+requests arriving in bursts (ex. a front-end polling a list) are served
+without reading the database. An entry is valid while no object of the
+collections it depends on has changed (see :func:`Collection.changed`).
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+CACHE_MAX_ROWS = 1000
+"""Pages with more rows are not kept"""
+
+
+def copy_row(row: Any) -> Any:
+    """Return a copy of a row of a selection (an Item or a list of fields)
+
+    :param row: the row
+    :rtype: Any
+    """
+    if isinstance(row, list):
+        return [copy.copy(value) for value in row]
+    return copy.copy(row)
+
+
+class CachedSelectionStream:  # pylint: disable=too-few-public-methods
+    """
+    The rows of a selection read in the :py:class:`SelectionCache`
+
+    Same interface as :py:class:`SelectionStream`, each iteration gives copies of rows.
+    """
+
+    def __init__(self, entry: tuple, page_size: int, num_of_element_to_skip: int):
+        """Constructor"""
+        self._rows, self.total, self.next_cursor = entry
+        self.page_size = page_size
+        self.num_of_element_to_skip = num_of_element_to_skip
+
+    def __iter__(self):
+        """Yield copies of rows"""
+        for row in self._rows:
+            yield copy_row(row)
+
+
+class SelectionCache:
+    """
+    The pages of a selection, with a LRU eviction and a TTL
+
+    :param max_size: the number of pages kept
+    :type max_size: int
+    :param ttl: the time to live of a page, in seconds
+    :type ttl: float
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        """Constructor"""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, versions: tuple) -> tuple | None:
+        """
+        Return the entry ``( rows, total, next_cursor )``, or None if not found
+
+        :param key: the key of the page
+        :type key: tuple
+        :param versions: the versions of collections (see :func:`Collection.changed`)
+        :type versions: tuple
+        :rtype: tuple | None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != versions or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(
+        self, key: tuple, versions: tuple, rows: list, total: int | None, next_cursor
+    ) -> None:  # pylint: disable=too-many-arguments, too-many-positional-arguments
+        """
+        Keep a page, read with these versions of collections
+
+        :param key: the key of the page
+        :type key: tuple
+        :param versions: the versions of collections before reading the page
+        :type versions: tuple
+        :param rows: copies of the rows
+        :type rows: list
+        :param total: the total of the selection
+        :type total: int | None
+        :param next_cursor: the cursor of the next page
+        :type next_cursor: str | None
+        """
+        if len(rows) > CACHE_MAX_ROWS:
+            return
+        with self._lock:
+            self._entries[key] = (
+                versions,
+                time.monotonic() + self.ttl,
+                (rows, total, next_cursor),
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Forget all pages
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
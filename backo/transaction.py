@@ -6,6 +6,7 @@ The transaction module
 
 from enum import Enum, auto
 from .log import log_system
+from .identity_map import forget
 
 log = log_system.get_or_create_logger("transaction")
 
@@ -44,21 +45,21 @@ class Transaction:  # pylint: disable=too-few-public-methods
         backoffice is the Backoffice Object
         """
         collection = backoffice.collections.get(self.collection_name)
+        forget(self.collection_name, self._id)
 
         # delete the created obj
         if self.operation == OperatorType.CREATE:
             log.debug(f"Rollback CREATION {self._id} -> delete {self._id}")
             collection.db_handler.delete_by_id(self._id)
-            return
 
         # re-save the deleted obj
-        if self.operation == OperatorType.DELETE:
+        elif self.operation == OperatorType.DELETE:
             log.debug(f"Rollback DELETE {self._id} -> re-populate it")
             collection.db_handler.save(self._id, self.obj)
-            return
 
         # re-save the updated obj
-        if self.operation == OperatorType.UPDATE:
+        elif self.operation == OperatorType.UPDATE:
             log.debug(f"Rollback UPDATE {self._id} -> re-populate it")
             collection.db_handler.save(self._id, self.obj)
-            return
+
+        collection.changed(self._id)
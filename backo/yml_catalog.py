@@ -0,0 +1,183 @@
+"""
+Module providing the in memory catalog of a :py:class:`DBYmlConnector`
+"""
+
+# pylint: disable=logging-fstring-interpolation
+import os
+import threading
+
+from .codec import Codec
+from .filter_translator import MISSING, Condition, compile_conditions, get_path
+from .log import log_system
+
+log = log_system.get_or_create_logger("yml")
+
+UNINDEXED = object()
+"""Index key for values which can't be indexed (lists, dicts)"""
+
+INDEXABLE_TYPES = (str, int, float, bool, type(None))
+
+
+class YmlCatalog:
+    """Parsed files, keyed by ``_id``
+
+    A file is parsed again only if its mtime changed. Secondary indexes
+    (value -> set of ``_id``) are kept for the given paths, and used by
+    :func:`documents` for ``$eq`` conditions.
+
+    :param path: The directory of files
+    :type path: str
+    :param codec: The codec of files
+    :type codec: Codec
+    :param indexes: the paths to index, ex ``[ "name", "address.town" ]``
+    :type indexes: list[str]
+
+    """
+
+    def __init__(self, path: str, codec: Codec, indexes: list[str] | None = None):
+        """Constructor"""
+        self._path = path
+        self._codec = codec
+        self._documents: dict[str, dict] = {}
+        self._mtimes: dict[str, int] = {}
+        self._indexes: dict[str, dict] = {path: {} for path in indexes or []}
+        self._lock = threading.RLock()
+
+    def _filename(self, _id: str) -> str:
+        """Return the filename for this _id"""
+        return self._codec.filename(self._path, _id)
+
+    def _index_keys(self, document: dict, path: str):
+        """Return the key of the document in the index of this path"""
+        value = get_path(document, path.split("."))
+        if value is MISSING:
+            return MISSING
+        if isinstance(value, INDEXABLE_TYPES):
+            return value
+        return UNINDEXED
+
+    def _add(self, _id: str, document: dict, mtime: int) -> None:
+        """Add a document and index it"""
+        self._documents[_id] = document
+        self._mtimes[_id] = mtime
+        for path, index in self._indexes.items():
+            index.setdefault(self._index_keys(document, path), set()).add(_id)
+
+    def _remove(self, _id: str) -> None:
+        """Remove a document and its indexes"""
+        document = self._documents.pop(_id, None)
+        self._mtimes.pop(_id, None)
+        if document is None:
+            return
+        for path, index in self._indexes.items():
+            key = self._index_keys(document, path)
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(_id)
+                if not ids:
+                    del index[key]
+
+    def put(self, _id: str, document: dict) -> None:
+        """Set the document just written in the file
+
+        :param _id: the _id
+        :type _id: str
+        :param document: the document (must not be modified later)
+        :type document: dict
+        """
+        with self._lock:
+            self._remove(_id)
+            self._add(_id, document, os.stat(self._filename(_id)).st_mtime_ns)
+
+    def remove(self, _id: str) -> None:
+        """Remove the document of a deleted file
+
+        :param _id: the _id
+        :type _id: str
+        """
+        with self._lock:
+            self._remove(_id)
+
+    def clear(self) -> None:
+        """Remove all documents"""
+        with self._lock:
+            self._documents.clear()
+            self._mtimes.clear()
+            for index in self._indexes.values():
+                index.clear()
+
+    def get(self, _id: str) -> dict | None:
+        """Return the document, read again only if the file changed
+
+        :param _id: the _id
+        :type _id: str
+        :return: the document (must not be modified), or None if no file
+        :rtype: dict | None
+        """
+        filename = self._filename(_id)
+        with self._lock:
+            try:
+                mtime = os.stat(filename).st_mtime_ns
+            except FileNotFoundError:
+                self._remove(_id)
+                return None
+
+            if self._mtimes.get(_id) != mtime:
+                log.debug(f"catalog read {filename}")
+                self._remove(_id)
+                self._add(_id, self._codec.read(filename), mtime)
+            return self._documents[_id]
+
+    def refresh(self) -> None:
+        """Follow the directory : read new and modified files, forget deleted ones"""
+        with self._lock:
+            seen = set()
+            with os.scandir(self._path) as entries:
+                for entry in entries:
+                    if not self._codec.is_file(entry.name):
+                        continue
+                    _id = self._codec.id_of(entry.name)
+                    seen.add(_id)
+                    mtime = entry.stat().st_mtime_ns
+                    if self._mtimes.get(_id) != mtime:
+                        log.debug(f"catalog read {entry.path}")
+                        self._remove(_id)
+                        self._add(_id, self._codec.read(entry.path), mtime)
+
+            for _id in set(self._documents) - seen:
+                self._remove(_id)
+
+    def _candidates(self, conditions: list) -> list[str] | None:
+        """Return the _ids given by indexes, or None if no index is usable"""
+        ids = None
+        for condition in conditions:
+            if not isinstance(condition, Condition) or condition.operator != "$eq":
+                continue
+            index = self._indexes.get(".".join(condition.path))
+            if index is None:
+                continue
+            found = set(index.get(condition.operand, ())) | index.get(UNINDEXED, set())
+            if condition.default_match:
+                found |= index.get(MISSING, set())
+            ids = found if ids is None else ids & found
+        return ids
+
+    def documents(self, conditions: list | None = None) -> list[dict]:
+        """Return documents matching all conditions, after a :func:`refresh`
+
+        :param conditions: objects with a ``match(document)`` method
+            (:py:class:`Condition`, :py:class:`KeysetCursor`)
+        :type conditions: list | None
+        :return: the documents (must not be modified)
+        :rtype: list[dict]
+        """
+        conditions = conditions or []
+        with self._lock:
+            self.refresh()
+            ids = self._candidates(conditions)
+            if ids is None:
+                documents = list(self._documents.values())
+            else:
+                documents = [self._documents[_id] for _id in ids]
+
+        return list(filter(compile_conditions(conditions), documents))
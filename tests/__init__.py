@@ -20,3 +20,19 @@ from .test_current_user import TestCurrentUser
 from .test_migrations import TestMigrations
 from .test_file import TestFile
 from .test_rest_api_connector import TestRestApiConnector
+from .test_filter_translator import TestFilterTranslator
+from .test_yml_catalog import TestYmlCatalog
+from .test_codec import TestCodec
+from .test_log_connector import TestLogConnector
+from .test_sqlite_connector import TestSqliteConnector
+from .test_bulk import TestBulk
+from .test_identity_map import TestIdentityMap
+from .test_aggregation import TestAggregation
+from .test_materialized import TestMaterialized
+from .test_selection_cache import TestSelectionCache
+from .test_read_filter import TestReadFilter
+from .test_facets import TestFacets
+from .test_search import TestSearch
+from .test_column_store import TestColumnStore
+from .test_parallel import TestParallel
+from .test_prototype import TestPrototype
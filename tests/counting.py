@@ -0,0 +1,63 @@
+"""
+connectors counting calls, for tests
+"""
+
+# pylint: disable=wrong-import-position, import-error, wrong-import-order
+
+from backo import DBYmlConnector
+
+
+class CountingMixin:
+    """
+    Count calls to the connector
+
+    - ``scans`` : the number of ``select_iter``
+    - ``read`` : the number of objects read by ``get_by_id`` and ``get_by_ids``
+    - ``loaded`` : the _id read by ``get_by_id``
+    - ``calls`` : the ``( method, number of objects )`` of bulk operations and reads
+    """
+
+    def __init__(self, **kwargs):
+        """Constructor"""
+        self.scans = 0
+        self.read = 0
+        self.loaded = []
+        self.calls = []
+        super().__init__(**kwargs)
+
+    def select_iter(self, *args, **kwargs):
+        """Count calls"""
+        self.scans += 1
+        return super().select_iter(*args, **kwargs)
+
+    def get_by_id(self, _id):
+        """Count objects"""
+        self.read += 1
+        self.loaded.append(_id)
+        self.calls.append(("get_by_id", 1))
+        return super().get_by_id(_id)
+
+    def get_by_ids(self, _ids):
+        """Count objects"""
+        self.read += len(_ids)
+        self.calls.append(("get_by_ids", len(_ids)))
+        return super().get_by_ids(_ids)
+
+    def create_many(self, objects):
+        """Count calls"""
+        self.calls.append(("create_many", len(objects)))
+        return super().create_many(objects)
+
+    def save_many(self, objects):
+        """Count calls"""
+        self.calls.append(("save_many", len(objects)))
+        return super().save_many(objects)
+
+    def delete_many(self, _ids):
+        """Count calls"""
+        self.calls.append(("delete_many", len(_ids)))
+        return super().delete_many(_ids)
+
+
+class CountingYml(CountingMixin, DBYmlConnector):
+    """Yml connector counting calls"""
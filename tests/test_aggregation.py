@@ -0,0 +1,214 @@
+"""
+test for aggregations (count / group by / sum / min / max)
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import json
+import unittest
+from flask import Flask
+
+from backo import Item, Collection, Backoffice, current_user
+from backo import DBYmlConnector, DBLogConnector, DBSqliteConnector
+from backo import Aggregation, SSyntaxError
+from backo import String, Int, Bool
+
+YML_DIR = "/tmp/backo_tests_aggregation"
+
+PRODUCTS = [
+    ("p0", "open", "bob", 10),
+    ("p1", "open", "bob", 5),
+    ("p2", "closed", "bob", None),
+    ("p3", "open", "alice", 7),
+    ("p4", "closed", "alice", 1),
+    ("p5", None, "alice", 3),
+]
+
+
+class TestAggregation(unittest.TestCase):
+    """
+    Aggregations on collections
+    """
+
+    def make_collection(self, db_handler, **kwargs):
+        """
+        return a backoffice with products
+        """
+        current_user.standalone = True
+        db_handler.generate_id = lambda o: f"Product_{o.name}"
+        db_handler.drop()
+        backo = Backoffice("myApp")
+        backo.register_collection(
+            Collection(
+                "products",
+                Item(
+                    {
+                        "name": String(),
+                        "status": String(),
+                        "owner": String(),
+                        "price": Int(),
+                        "expensive": Bool(set=lambda o: (o.price.get_value() or 0) > 6),
+                    }
+                ),
+                db_handler,
+                **kwargs,
+            )
+        )
+        backo.products.create_many(
+            [
+                {"name": name, "status": status, "owner": owner, "price": price}
+                for name, status, owner, price in PRODUCTS
+            ]
+        )
+        return backo
+
+    def check_aggregate(self, db_handler):
+        """
+        the same groups with all connectors
+        """
+        backo = self.make_collection(db_handler)
+        products = backo.products
+
+        self.assertEqual(
+            products.aggregate(),
+            [{"group": {}, "count": 6}],
+        )
+        self.assertEqual(
+            products.aggregate({"status": "open"}, None, {"sum": "price"}),
+            [{"group": {}, "count": 3, "sum": {"price": 22}}],
+        )
+        self.assertEqual(
+            products.aggregate(
+                None, "status", {"sum": "price", "min": "price,name", "max": "price"}
+            ),
+            [
+                {
+                    "group": {"status": None},
+                    "count": 1,
+                    "sum": {"price": 3},
+                    "min": {"price": 3, "name": "p5"},
+                    "max": {"price": 3},
+                },
+                {
+                    "group": {"status": "closed"},
+                    "count": 2,
+                    "sum": {"price": 1},
+                    "min": {"price": 1, "name": "p2"},
+                    "max": {"price": 1},
+                },
+                {
+                    "group": {"status": "open"},
+                    "count": 3,
+                    "sum": {"price": 22},
+                    "min": {"price": 5, "name": "p0"},
+                    "max": {"price": 10},
+                },
+            ],
+        )
+
+        # Filters matched in python and computed fields
+        for match_filter in [{"name": ("$reg", "p[1-4]")}, {"expensive": False}]:
+            self.assertEqual(
+                [
+                    (g["group"]["owner"], g["count"])
+                    for g in products.aggregate(match_filter, ["owner"])
+                ],
+                [("alice", 2), ("bob", 2)],
+            )
+        self.assertEqual(
+            products.aggregate(None, "expensive,owner", {"max": "price"})[-1],
+            {
+                "group": {"expensive": True, "owner": "bob"},
+                "count": 1,
+                "max": {"price": 10},
+            },
+        )
+        return backo
+
+    def test_yml(self):
+        """
+        aggregate with yml files
+        """
+        backo = self.check_aggregate(DBYmlConnector(path=YML_DIR + "/products"))
+
+        for wrong in [
+            {"group_by": "unknown"},
+            {"metrics": {"avg": "price"}},
+            {"metrics": {"sum": ["price", 1]}},
+        ]:
+            with self.assertRaises(SSyntaxError):
+                backo.products.aggregate(**wrong)
+
+        # One pass on documents
+        aggregation = Aggregation(backo.products.model, "owner", {"sum": "price"})
+        self.assertEqual(aggregation.projection(), {"_id": 1, "owner": 1, "price": 1})
+        for document in [{"owner": "bob", "price": 2}, {"price": "3"}, {}]:
+            aggregation.add(document)
+        self.assertEqual(
+            [(g["group"]["owner"], g["count"], g["sum"]) for g in aggregation.result()],
+            [(None, 2, {"price": 0}), ("bob", 1, {"price": 2})],
+        )
+
+    def test_log(self):
+        """
+        aggregate with a log file
+        """
+        self.check_aggregate(DBLogConnector(path=YML_DIR + "/products.log"))
+
+    def test_sqlite(self):
+        """
+        aggregate with sqlite
+        """
+        self.check_aggregate(
+            DBSqliteConnector(path=YML_DIR + "/db.sqlite", table="products")
+        )
+
+    def test_read_restriction(self):
+        """
+        objects not readable are not counted
+        """
+        backo = self.make_collection(
+            DBYmlConnector(path=YML_DIR + "/products"),
+            can_read=lambda right_name, o: o is None or o.owner != "bob",
+        )
+        self.assertEqual(
+            backo.products.aggregate(None, "owner", {"sum": "price"}),
+            [{"group": {"owner": "alice"}, "count": 3, "sum": {"price": 11}}],
+        )
+
+    def test_route(self):
+        """
+        GET /_aggregate
+        """
+        backo = self.make_collection(DBYmlConnector(path=YML_DIR + "/products"))
+        flask = Flask(__name__)
+        backo.build_routes(flask)
+        client = flask.test_client()
+
+        response = client.get(
+            "/myApp/products/_aggregate?owner=bob&_group=status&_sum=price&_max=price"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.data),
+            {
+                "result": [
+                    {
+                        "group": {"status": "closed"},
+                        "count": 1,
+                        "sum": {"price": 0},
+                        "max": {"price": None},
+                    },
+                    {
+                        "group": {"status": "open"},
+                        "count": 2,
+                        "sum": {"price": 15},
+                        "max": {"price": 10},
+                    },
+                ],
+                "total": 2,
+            },
+        )
+
+        response = client.get("/myApp/products/_aggregate?_group=unknown")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,248 @@
+"""
+test for create_many / save_many / delete_many
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import os
+import unittest
+
+from backo import Item, Collection, Backoffice, current_user
+from backo import DBConnector, DBYmlConnector, DBLogConnector, DBSqliteConnector
+from backo import DBError, NotFoundError, StatusType
+from backo import String, Int, Ref, RefsList, DeleteStrategy
+
+from .counting import CountingYml
+
+YML_DIR = "/tmp/backo_tests_bulk"
+
+
+class TestBulk(unittest.TestCase):
+    """
+    Bulk operations on collections
+    """
+
+    def make_backoffice(self, db_users, db_sites):
+        """
+        return a backoffice with users and sites
+        """
+        db_users.generate_id = lambda o: f"User_{o.name}"
+        db_sites.generate_id = lambda o: f"Site_{o.name}"
+        db_users.drop()
+        db_sites.drop()
+
+        backo = Backoffice("myApp")
+        backo.register_collection(
+            Collection(
+                "users",
+                Item(
+                    {
+                        "name": String(),
+                        "age": Int(),
+                        "site": Ref(coll="sites", field="$.users"),
+                    }
+                ),
+                db_users,
+            )
+        )
+        backo.register_collection(
+            Collection(
+                "sites",
+                Item(
+                    {
+                        "name": String(),
+                        "users": RefsList(
+                            coll="users",
+                            field="$.site",
+                            ods=DeleteStrategy.UNLINK_REFERENCED_ITEMS,
+                        ),
+                    }
+                ),
+                db_sites,
+            )
+        )
+        return backo
+
+    def setUp(self):
+        """
+        standalone user
+        """
+        current_user.standalone = True
+
+    def check_bulk(self, db_users, db_sites):
+        """
+        create, save and delete many users on a connector
+        """
+        backo = self.make_backoffice(db_users, db_sites)
+        site = backo.sites.create({"name": "moon"})
+
+        users = backo.users.create_many(
+            [{"name": f"u{i}", "age": i, "site": site._id} for i in range(7)],
+            batch_size=3,
+        )
+        self.assertEqual([u._id for u in users], [f"User_u{i}" for i in range(7)])
+        self.assertEqual(backo.users.get_by_id("User_u5").age, 5)
+
+        # events are done for each item (reverse references)
+        site.reload()
+        self.assertEqual(len(site.users), 7)
+
+        for u in users:
+            u.age = u.age + 10
+        backo.users.save_many(users[2:], batch_size=2)
+        self.assertEqual(backo.users.get_by_id("User_u5").age, 15)
+        self.assertEqual(backo.users.get_by_id("User_u1").age, 1)
+        self.assertEqual(
+            backo.users.get_by_id("User_u5")._meta.ctime, users[5]._meta.ctime
+        )
+
+        # one change per deleted item
+        version = backo.users.version
+        backo.users.delete_many([users[0], "User_u1", users[6]], batch_size=2)
+        self.assertEqual(backo.users.version, version + 3)
+        with self.assertRaises(NotFoundError):
+            backo.users.get_by_id("User_u1")
+        self.assertEqual(
+            sorted(o.name for o in backo.users.select({})),
+            ["u2", "u3", "u4", "u5"],
+        )
+        site.reload()
+        self.assertEqual(len(site.users), 4)
+
+        # multi-get
+        self.assertEqual(
+            [o.name for o in backo.users.get_by_ids(["User_u3", "User_u1", "User_u2"])],
+            ["u3", "u2"],
+        )
+        self.assertEqual(
+            list(db_users.get_by_ids(["User_u5", "User_u1", "User_u5"])), ["User_u5"]
+        )
+
+        # rollback of a transaction with bulk operations
+        t_id = backo.start_transaction()
+        backo.users.create_many([{"name": "x"}, {"name": "y"}], transaction_id=t_id)
+        backo.users.delete_many(["User_u2"], transaction_id=t_id)
+        backo.rollback_transaction(t_id)
+        self.assertEqual(
+            sorted(o.name for o in backo.users.select({})),
+            ["u2", "u3", "u4", "u5"],
+        )
+        return backo
+
+    def test_delete_many_stale(self):
+        """
+        items no longer in the database are skipped by delete_many
+        """
+        for db_users, db_sites in [
+            (
+                DBYmlConnector(path=YML_DIR + "/users"),
+                DBYmlConnector(path=YML_DIR + "/sites"),
+            ),
+            (
+                DBLogConnector(path=YML_DIR + "/users.log"),
+                DBLogConnector(path=YML_DIR + "/sites.log"),
+            ),
+            (
+                DBSqliteConnector(path=YML_DIR + "/db.sqlite", table="users"),
+                DBSqliteConnector(path=YML_DIR + "/db.sqlite", table="sites"),
+            ),
+        ]:
+            with self.subTest(connector=type(db_users).__name__):
+                backo = self.make_backoffice(db_users, db_sites)
+                site = backo.sites.create({"name": "moon"})
+                backo.users.create_many(
+                    [{"name": f"u{i}", "age": i, "site": site._id} for i in range(3)]
+                )
+
+                stale = backo.users.get_by_id("User_u2")
+                self.assertEqual(
+                    db_users.delete_many(["User_u2", "User_u9"]), ["User_u2"]
+                )
+                version = backo.users.version
+                backo.users.delete_many([stale, "User_u1", "User_u9"])
+                self.assertEqual(backo.users.version, version + 1)
+                self.assertEqual(stale._status, StatusType.SAVED)
+                self.assertEqual([o.name for o in backo.users.select({})], ["u0"])
+
+    def test_yml(self):
+        """
+        bulk with yml files
+        """
+        db_users = CountingYml(path=YML_DIR + "/users")
+        backo = self.check_bulk(db_users, DBYmlConnector(path=YML_DIR + "/sites"))
+
+        self.assertEqual(
+            [c for c in db_users.calls if c[0].endswith("_many")][:7],
+            [
+                ("create_many", 3),
+                ("create_many", 3),
+                ("create_many", 1),
+                ("save_many", 2),
+                ("save_many", 2),
+                ("save_many", 1),
+                ("delete_many", 2),
+            ],
+        )
+
+        # references are read at once
+        site = backo.sites.get_by_id("Site_moon")
+        db_users.calls.clear()
+        self.assertEqual(sorted(site.select("$.users.name")), ["u2", "u3", "u4", "u5"])
+        self.assertEqual(db_users.calls, [("get_by_ids", 4)])
+
+    def test_yml_duplicate(self):
+        """
+        nothing is written if an _id already exists
+        """
+        backo = self.make_backoffice(
+            DBYmlConnector(path=YML_DIR + "/users", catalog=True),
+            DBYmlConnector(path=YML_DIR + "/sites"),
+        )
+        backo.users.create({"name": "u1"})
+        with self.assertRaises(DBError):
+            backo.users.create_many([{"name": "u0"}, {"name": "u1"}])
+        self.assertEqual(os.listdir(YML_DIR + "/users"), ["User_u1.yml"])
+
+    def test_default_delete_many(self):
+        """
+        the default delete_many returns _ids of calls to delete_by_id without error
+        """
+        db = DBYmlConnector(path=YML_DIR + "/default")
+        db.drop()
+        for _id in ("a", "b", "c"):
+            db.create({"_id": _id})
+        delete_by_id = db.delete_by_id
+
+        def delete_without_result(_id):
+            """Delete and return nothing"""
+            if not delete_by_id(_id):
+                raise NotFoundError("{0} not found", _id)
+
+        db.delete_by_id = delete_without_result
+        self.assertEqual(DBConnector.delete_many(db, ["a", "b"]), ["a", "b"])
+        with self.assertRaises(NotFoundError):
+            DBConnector.delete_many(db, ["c", "a"])
+        self.assertEqual(db.count(None), 0)
+
+    def test_log(self):
+        """
+        bulk with log files
+        """
+        self.check_bulk(
+            DBLogConnector(path=YML_DIR + "/users.log"),
+            DBLogConnector(path=YML_DIR + "/sites.log"),
+        )
+
+    def test_sqlite(self):
+        """
+        bulk with sqlite
+        """
+        db_users = DBSqliteConnector(path=YML_DIR + "/db.sqlite", table="users")
+        backo = self.check_bulk(
+            db_users, DBSqliteConnector(path=YML_DIR + "/db.sqlite", table="sites")
+        )
+
+        # nothing is written if an _id already exists
+        with self.assertRaises(DBError):
+            backo.users.create_many([{"name": "u0"}, {"name": "u2"}])
+        self.assertEqual(db_users.count(None), 4)
@@ -0,0 +1,147 @@
+"""
+test for codecs of the yml connector
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import datetime
+import os
+import shutil
+import unittest
+
+from backo import Item, Collection, Backoffice, current_user
+from backo import DBYmlConnector, DBError, convert_directory
+from backo import String, Int, Dict
+from backo.codec import msgpack, get_codec
+
+YML_DIR = "/tmp/backo_tests_codec"
+
+
+class TestCodec(unittest.TestCase):
+    """
+    yml connector with json / msgpack files
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        init this tests
+        """
+        super().__init__(*args, **kwargs)
+
+    def get_users(self, **kwargs):
+        """
+        return a collection of users with this connector options
+        """
+        db = DBYmlConnector(path=YML_DIR, **kwargs)
+        db.generate_id = lambda o: f"User_{o.name}"
+        backo = Backoffice("myApp")
+        users = Collection(
+            "users",
+            Item(
+                {
+                    "name": String(),
+                    "age": Int(),
+                    "address": Dict({"town": String(default="Paris")}),
+                }
+            ),
+            db,
+        )
+        backo.register_collection(users)
+        return users
+
+    def setUp(self):
+        """
+        start with an empty directory
+        """
+        shutil.rmtree(YML_DIR, ignore_errors=True)
+        current_user.standalone = True
+
+    def test_unknown_codec(self):
+        """
+        bad codec name
+        """
+        with self.assertRaises(DBError) as e:
+            DBYmlConnector(path=YML_DIR, codec="xml")
+        self.assertEqual(e.exception.to_string(), 'Unknown codec "xml"')
+
+    def test_json(self):
+        """
+        crud and selection with json files
+        """
+        users = self.get_users(codec="json")
+        users.create({"name": "bert", "age": 12})
+        u = users.create({"name": "paul", "age": 30, "address": {"town": "Lyon"}})
+        self.assertEqual(
+            sorted(os.listdir(YML_DIR)), ["User_bert.json", "User_paul.json"]
+        )
+
+        u.age = 31
+        u.save()
+        self.assertEqual(users.get_by_id("User_paul").age, 31)
+        self.assertEqual(users.get_by_id("User_paul").address.town, "Lyon")
+        self.assertEqual(len(users.select({"age": ("$gt", 20)})), 1)
+        self.assertEqual(users.db_handler.count(None), 2)
+
+        u.delete()
+        self.assertEqual([o.name for o in users.select({})], ["bert"])
+
+        users.db_handler.drop()
+        self.assertEqual(os.listdir(YML_DIR), [])
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack(self):
+        """
+        crud with msgpack files
+        """
+        users = self.get_users(codec="msgpack", catalog=True)
+        users.create({"name": "bert", "age": 12})
+        self.assertEqual(os.listdir(YML_DIR), ["User_bert.msgpack"])
+        self.assertEqual(users.get_by_id("User_bert").age, 12)
+        self.assertEqual(len(users.select({"age": 12})), 1)
+
+    def test_typed_values(self):
+        """
+        dates and datetimes keep their type in all codecs
+        """
+        os.makedirs(YML_DIR)
+        document = {
+            "_id": "a",
+            "day": datetime.date(2024, 1, 31),
+            "at": datetime.datetime(2024, 1, 31, 10, 30),
+            "tags": [{"$date": 1}],
+        }
+        for name in ["yaml", "json"] + (["msgpack"] if msgpack else []):
+            with self.subTest(codec=name):
+                codec = get_codec(name)
+                filename = codec.filename(YML_DIR, "a")
+                codec.write(filename, document)
+                self.assertEqual(codec.read(filename), document)
+
+    def test_convert_directory(self):
+        """
+        convert files from yaml to json and back
+        """
+        users = self.get_users()
+        users.create({"name": "bert", "age": 12})
+        users.create({"name": "paul", "age": 30})
+        with open(os.path.join(YML_DIR, "README"), "w", encoding="utf-8") as f:
+            f.write("not a document")
+
+        self.assertEqual(convert_directory(YML_DIR, "yaml", "json"), 2)
+        self.assertEqual(
+            sorted(os.listdir(YML_DIR)), ["README", "User_bert.json", "User_paul.json"]
+        )
+        users = self.get_users(codec="json", catalog=True)
+        self.assertEqual(users.get_by_id("User_paul").age, 30)
+        self.assertEqual(
+            users.get_by_id("User_paul")._meta.ctime.get_value().year > 2000, True
+        )
+        self.assertEqual([o.name for o in users.select({"age": 12})], ["bert"])
+
+        self.assertEqual(convert_directory(YML_DIR, "json", "json"), 0)
+        self.assertEqual(convert_directory(YML_DIR, "json", "yaml"), 2)
+        users = self.get_users()
+        self.assertEqual(users.get_by_id("User_bert").age, 12)
+
+        with self.assertRaises(DBError):
+            convert_directory("/tmp/backo_tests_codec_not_here", "yaml", "json")
@@ -0,0 +1,208 @@
+"""
+test for the column store
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import unittest
+
+from backo import Item, Collection, Backoffice, current_user
+from backo import DBYmlConnector, DBSqliteConnector
+from backo import ColumnStore, Condition, SSyntaxError
+from backo import String, Int, Float, Dict
+
+from .counting import CountingYml
+
+YML_DIR = "/tmp/backo_tests_column_store"
+
+
+FILTERS = [
+    None,
+    {"year": ("$gte", 1900)},
+    {"year": ("$lt", 1900), "price": ("$gt", 9.5)},
+    {"year": 1950},
+    {"lang": "fr"},
+    {"lang": ("$ne", "fr")},
+    {"lang": ("$reg", r"^e")},
+    {"stock": {"shop": ("$lte", 3)}},
+    {"price": ("$lte", 3)},
+]
+
+SORTS = [{"_id": 1}, {"year": -1}, {"price": 1, "year": -1}, {"stock.shop": 1}]
+
+
+class TestColumnStore(unittest.TestCase):
+    """
+    Selections evaluated on columns
+    """
+
+    def make_collection(self, db_handler, name, **kwargs):
+        """
+        return a collection of books
+        """
+        db_handler.generate_id = lambda o: f"Book_{o.title}"
+        db_handler.drop()
+        backo = Backoffice(name)
+        books = Collection(
+            "books",
+            Item(
+                {
+                    "title": String(),
+                    "lang": String(),
+                    "year": Int(),
+                    "price": Float(),
+                    "stock": Dict({"shop": Int()}),
+                }
+            ),
+            db_handler,
+            **kwargs,
+        )
+        backo.register_collection(books)
+        books.create_many(
+            [
+                {
+                    "title": f"b{i:02}",
+                    "lang": ["fr", "en", None][i % 3],
+                    "year": 1850 + (i * 25) % 200,
+                    "price": (i * 7) % 13 + 0.5,
+                    "stock": {"shop": i % 5},
+                }
+                for i in range(20)
+            ]
+        )
+        return books
+
+    def setUp(self):
+        """
+        the same books, with and without columns
+        """
+        current_user.standalone = True
+        current_user.set({"_id": "1", "login": "bob", "roles": []})
+        self.db_books = CountingYml(path=YML_DIR + "/books")
+        self.books = self.make_collection(
+            self.db_books, "columns", columns="lang,year,price,stock.shop,mtime"
+        )
+        self.reference = self.make_collection(
+            DBSqliteConnector(path=YML_DIR + "/db.sqlite", table="books"), "reference"
+        )
+
+    def select(self, collection, *args, **kwargs):
+        """
+        return titles and total
+        """
+        rep = collection._selections["_all"].select(*args, **kwargs)
+        return (
+            [o.title.get_value() for o in rep["result"]],
+            rep["total"],
+            rep["_cursor"],
+        )
+
+    def test_same_results(self):
+        """
+        columns give the same results as the database
+        """
+        for match_filter in FILTERS:
+            for sort in SORTS:
+                for page, skip in [(0, 0), (4, 0), (4, 6)]:
+                    args = (match_filter, page, skip, sort)
+                    with self.subTest(args=args):
+                        rows = self.books._selections["_all"].stream(*args)
+                        self.assertIsNotNone(rows.columns)
+                        self.assertEqual(
+                            self.select(self.books, *args)[:2],
+                            self.select(self.reference, *args)[:2],
+                        )
+
+        # Aggregations and facets
+        self.assertEqual(
+            self.books.aggregate({"year": ("$gt", 1900)}, "lang", {"sum": "price"}),
+            self.reference.aggregate({"year": ("$gt", 1900)}, "lang", {"sum": "price"}),
+        )
+        self.assertEqual(
+            self.books.facets(None, "lang,stock.shop"),
+            self.reference.facets(None, "lang,stock.shop"),
+        )
+
+    def test_pages(self):
+        """
+        only objects of the page are read
+        """
+        self.assertEqual(
+            self.select(self.books, {"year": ("$gte", 1950)}, 2, 0, {"year": -1})[:2],
+            (["b07", "b15"], 8),
+        )
+        scans, read = self.db_books.scans, self.db_books.read
+        self.select(self.books, {"year": ("$gte", 1950)}, 2, 2, {"price": 1})
+        self.assertEqual(self.db_books.scans, scans)
+        self.assertEqual(self.db_books.read, read + 2)
+        self.assertEqual(
+            self.books.aggregate(None, "lang")[0], {"group": {"lang": None}, "count": 6}
+        )
+        self.assertEqual(self.db_books.scans, scans)
+
+        # Cursors
+        titles, _, cursor = self.select(self.books, None, 8, 0, {"price": -1})
+        next_titles = self.select(self.books, None, 8, 0, {"price": -1}, cursor)[0]
+        self.assertEqual(
+            titles + next_titles,
+            self.select(self.reference, None, 16, 0, {"price": -1})[0],
+        )
+
+        # Other fields use the database
+        rows = self.books._selections["_all"].stream({"title": "b01"})
+        self.assertIsNone(rows.columns)
+        self.assertEqual(self.select(self.books, {"title": "b01"})[:2], (["b01"], 1))
+
+    def test_writes(self):
+        """
+        columns follow created, saved and deleted objects
+        """
+        self.assertEqual(
+            self.select(self.books, {"year": 1850})[:2], (["b00", "b08", "b16"], 3)
+        )
+        book = self.books.get_by_id("Book_b08")
+        book.year = 1851
+        book.save()
+        self.books.get_by_id("Book_b16").delete()
+        self.books.create({"title": "b99", "year": 1850})
+        self.assertEqual(
+            self.select(self.books, {"year": 1850})[:2], (["b00", "b99"], 2)
+        )
+        self.assertEqual(self.select(self.books, {"year": ("$lt", 1852)})[1], 3)
+        self.assertEqual(len(self.books.column_store), 20)
+
+        self.books.changed(None)
+        self.assertEqual(len(self.books.column_store), 0)
+        self.assertEqual(self.select(self.books, {"year": 1850})[1], 2)
+
+    def test_permissions(self):
+        """
+        objects not readable are not returned
+        """
+        self.books._permissions.add_or_modify_permission(
+            "read", lambda right_name, o: o is None or o.title != "b07"
+        )
+        self.assertEqual(
+            self.select(self.books, {"year": ("$gte", 1950)}, 2, 0, {"year": -1})[:2],
+            (["b15", "b06"], 7),
+        )
+
+    def test_wrong_columns(self):
+        """
+        only scalar fields
+        """
+        for columns in ["stock", "unknown", "title,"]:
+            with self.assertRaises(SSyntaxError):
+                self.make_collection(
+                    DBYmlConnector(path=YML_DIR + "/wrong"), "wrong", columns=columns
+                )
+
+        store = ColumnStore(
+            self.books.model,
+            "year",
+            lambda projection: [{"_id": "a", "year": 2}, {"_id": "b", "year": 1}],
+        )
+        self.assertEqual(list(store.select([Condition(["year"], "$gte", 2)])), ["a"])
+        store.update("c", {"year": 3})
+        store.update("a", None)
+        self.assertEqual(list(store.select([Condition(["year"], "$gt", 1)])), ["c"])
@@ -0,0 +1,214 @@
+"""
+test for facets (distinct values and counts)
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import json
+import unittest
+from flask import Flask
+
+from backo import Item, Collection, Backoffice, current_user
+from backo import DBYmlConnector, DBLogConnector, DBSqliteConnector
+from backo import Facets, SSyntaxError
+from backo import String, Int, Dict, Ref, RefsList, DeleteStrategy
+
+YML_DIR = "/tmp/backo_tests_facets"
+
+BOOKS = [
+    ("b0", "fr", "hugo", 1862),
+    ("b1", "fr", "hugo", 1831),
+    ("b2", "en", "twain", 1884),
+    ("b3", "fr", "verne", 1870),
+    ("b4", None, "twain", 1876),
+]
+
+
+class TestFacets(unittest.TestCase):
+    """
+    Facets on collections
+    """
+
+    def make_backoffice(self, db_books, **kwargs):
+        """
+        return a backoffice with books and authors
+        """
+        current_user.standalone = True
+        current_user.set({"_id": "1", "login": "bob", "roles": []})
+        db_authors = DBYmlConnector(path=YML_DIR + "/authors")
+        db_books.generate_id = lambda o: f"Book_{o.title}"
+        db_authors.generate_id = lambda o: f"Author_{o.name}"
+        db_books.drop()
+        db_authors.drop()
+
+        backo = Backoffice("myApp")
+        backo.register_collection(
+            Collection(
+                "books",
+                Item(
+                    {
+                        "title": String(),
+                        "lang": String(),
+                        "year": Int(),
+                        "century": Int(
+                            set=lambda o: (o.year.get_value() or 0) // 100 + 1
+                        ),
+                        "author": Ref(coll="authors", field="$.books"),
+                    }
+                ),
+                db_books,
+                **kwargs,
+            )
+        )
+        backo.register_collection(
+            Collection(
+                "authors",
+                Item(
+                    {
+                        "name": String(),
+                        "nationality": Dict({"a2": String(), "name": String()}),
+                        "books": RefsList(
+                            coll="books",
+                            field="$.author",
+                            ods=DeleteStrategy.UNLINK_REFERENCED_ITEMS,
+                        ),
+                    }
+                ),
+                db_authors,
+            )
+        )
+        for name, a2 in [("hugo", "FR"), ("verne", "FR"), ("twain", "US")]:
+            backo.authors.create({"name": name, "nationality": {"a2": a2}})
+        for title, lang, author, year in BOOKS:
+            backo.books.create(
+                {
+                    "title": title,
+                    "lang": lang,
+                    "year": year,
+                    "author": f"Author_{author}",
+                }
+            )
+        return backo
+
+    def check_facets(self, db_books):
+        """
+        the same values with all connectors
+        """
+        backo = self.make_backoffice(db_books)
+        books = backo.books
+
+        self.assertEqual(
+            books.facets(None, "lang,$.author.nationality.a2,century"),
+            {
+                "lang": [
+                    {"value": "fr", "count": 3},
+                    {"value": None, "count": 1},
+                    {"value": "en", "count": 1},
+                ],
+                "author.nationality.a2": [
+                    {"value": "FR", "count": 3},
+                    {"value": "US", "count": 2},
+                ],
+                "century": [{"value": 19, "count": 5}],
+            },
+        )
+        self.assertEqual(
+            books.facets({"year": ("$gt", 1865)}, ["author"], 1),
+            {"author": [{"value": "Author_twain", "count": 2}]},
+        )
+
+    def test_yml(self):
+        """
+        facets with yml files
+        """
+        self.check_facets(DBYmlConnector(path=YML_DIR + "/books"))
+
+    def test_log(self):
+        """
+        facets with a log file
+        """
+        self.check_facets(DBLogConnector(path=YML_DIR + "/books.log"))
+
+    def test_sqlite(self):
+        """
+        facets with sqlite
+        """
+        self.check_facets(DBSqliteConnector(path=YML_DIR + "/db.sqlite", table="books"))
+
+    def test_wrong_fields(self):
+        """
+        unknown fields
+        """
+        backo = self.make_backoffice(DBYmlConnector(path=YML_DIR + "/books"))
+        for fields in ["unknown", "author.unknown", "author.nationality", "lang,"]:
+            with self.assertRaises(SSyntaxError):
+                backo.books.facets(None, fields)
+
+        # One pass on documents
+        facets = Facets(backo.books.model, "lang,$.year")
+        self.assertEqual(facets.projection(), {"_id": 1, "lang": 1, "year": 1})
+        for document in [{"lang": "fr", "year": 1}, {"lang": "fr"}]:
+            facets.add(document)
+        self.assertEqual(
+            facets.result(),
+            {
+                "lang": [{"value": "fr", "count": 2}],
+                "year": [{"value": None, "count": 1}, {"value": 1, "count": 1}],
+            },
+        )
+
+    def test_permissions(self):
+        """
+        only readable objects are counted
+        """
+        backo = self.make_backoffice(
+            DBYmlConnector(path=YML_DIR + "/books"),
+            read_filter={"lang": "fr"},
+        )
+        self.assertEqual(
+            backo.books.facets(None, "author"),
+            {
+                "author": [
+                    {"value": "Author_hugo", "count": 2},
+                    {"value": "Author_verne", "count": 1},
+                ]
+            },
+        )
+
+        # Referenced objects not readable give None
+        backo.authors._permissions.add_or_modify_permission(
+            "read", lambda right_name, o: o is None or o.name != "verne"
+        )
+        self.assertEqual(
+            backo.books.facets(None, "author.name")["author.name"],
+            [{"value": "hugo", "count": 2}, {"value": None, "count": 1}],
+        )
+
+    def test_route(self):
+        """
+        GET /_facets
+        """
+        backo = self.make_backoffice(DBYmlConnector(path=YML_DIR + "/books"))
+        flask = Flask(__name__)
+        backo.build_routes(flask)
+        client = flask.test_client()
+
+        response = client.get(
+            "/myApp/books/_facets?lang=fr&_fields=author.nationality.a2&_fields=year&_limit=2"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.data),
+            {
+                "result": {
+                    "author.nationality.a2": [{"value": "FR", "count": 3}],
+                    "year": [
+                        {"value": 1831, "count": 1},
+                        {"value": 1862, "count": 1},
+                    ],
+                }
+            },
+        )
+
+        response = client.get("/myApp/books/_facets?_fields=unknown")
+        self.assertEqual(response.status_code, 400)
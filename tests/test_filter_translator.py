@@ -0,0 +1,288 @@
+"""
+test for filter translation (pushdown to the database)
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import unittest
+
+from bson.objectid import ObjectId
+
+from backo import Item, Collection, Backoffice
+from backo import DBYmlConnector, DBMongoConnector
+from backo import String, Int, Bool, List, Dict
+from backo import split_filter, build_projection, Condition, Selection
+from backo.filter_translator import (
+    MISSING,
+    compile_conditions,
+    filter_key,
+    get_path,
+    match_value,
+)
+
+YML_DIR = "/tmp/backo_tests_filter_translator"
+
+
+class TestFilterTranslator(unittest.TestCase):
+    """
+    Filter translation
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        init this tests
+        """
+        super().__init__(*args, **kwargs)
+
+        # No connection is done (mongo client is lazy)
+        self.db_mongo = DBMongoConnector(
+            connection_string="mongodb://localhost:27017/testMongo", collection="Users"
+        )
+        self.db_yml = DBYmlConnector(path=YML_DIR)
+
+        self.model = Item(
+            {
+                "name": String(),
+                "age": Int(),
+                "male": Bool(default=True),
+                "secret": String(can_read=lambda right_name, o: False),
+                "tags": List(String()),
+                "address": Dict({"town": String(), "zip": Int()}),
+            }
+        )
+        self.backo = Backoffice("myApp")
+        self.users = Collection("users", self.model, self.db_mongo)
+        self.backo.register_collection(self.users)
+
+    def test_no_operators(self):
+        """
+        a connector without operators keep the whole filter
+        """
+        f = {"name": "bob", "age": ("$gt", 12)}
+        conditions, remaining = split_filter(f, self.users.model, self.db_yml)
+        self.assertEqual(conditions, [])
+        self.assertEqual(remaining, f)
+        self.assertEqual(self.db_yml.translate_filter(conditions, None), None)
+
+    def test_split(self):
+        """
+        split a filter
+        """
+        conditions, remaining = split_filter(
+            {
+                "name": ("$reg", "^bo"),
+                "age": ("$or", [("$lt", 2), ("$gt", 60)]),
+                "secret": "xx",
+                "unknown": 1,
+                "address": {"town": "Paris", "zip": "not an int"},
+                "tags": ("$contains", "a"),
+            },
+            self.users.model,
+            self.db_mongo,
+        )
+        self.assertEqual(
+            [(c.path, c.operator, c.operand) for c in conditions],
+            [
+                (["name"], "$reg", "^bo"),
+                (["address", "town"], "$eq", "Paris"),
+                (["tags"], "$contains", "a"),
+            ],
+        )
+        self.assertEqual(
+            remaining,
+            {
+                "age": ("$or", [("$lt", 2), ("$gt", 60)]),
+                "secret": "xx",
+                "unknown": 1,
+                "address": {"zip": "not an int"},
+            },
+        )
+
+        conditions, remaining = split_filter({}, self.users.model, self.db_mongo)
+        self.assertEqual(conditions, [])
+        self.assertIsNone(remaining)
+
+    def test_condition_match(self):
+        """
+        match raw documents
+        """
+        c = Condition(["male"], "$eq", True, True)
+        self.assertTrue(c.match({"male": True}))
+        self.assertFalse(c.match({"male": False}))
+        # missing -> default value
+        self.assertTrue(c.match({}))
+
+        c = Condition(["address", "town"], "$not", ("$reg", "Pa"))
+        self.assertFalse(c.match({"address": {"town": "Paris"}}))
+        self.assertTrue(c.match({"address": {"town": "Lyon"}}))
+        self.assertTrue(c.match({"address": {"town": None}}))
+
+        c = Condition(["tags"], "$contains", ("$gt", "b"))
+        self.assertTrue(c.match({"tags": ["a", "c"]}))
+        self.assertFalse(c.match({"tags": ["a"]}))
+        self.assertFalse(c.match({"tags": None}))
+
+    def test_compiled_predicates(self):
+        """
+        compiled conditions match like match_value
+        """
+        documents = [
+            {},
+            {"age": None, "name": None, "tags": None, "address": None},
+            {
+                "age": 12,
+                "name": "bob",
+                "tags": ["a", "c"],
+                "address": {"town": "Paris"},
+            },
+            {"age": 12.5, "name": 3, "tags": [], "address": {"zip": 75}},
+            {"age": "12", "name": "alice", "tags": "a", "address": "Lyon"},
+        ]
+        operations = [
+            ("$eq", 12),
+            ("$ne", None),
+            ("$gt", 12),
+            ("$gte", 12),
+            ("$lt", "b"),
+            ("$lte", 12.5),
+            ("$reg", "^b"),
+            ("$reg", "("),
+            ("$contains", "a"),
+            ("$contains", ("$gt", "b")),
+            ("$and", [("$gt", 1), ("$lt", 13)]),
+            ("$not", ("$eq", 12)),
+        ]
+        for path in (["age"], ["name"], ["tags"], ["address", "town"]):
+            for operator, operand in operations:
+                for default in (None, 12):
+                    c = Condition(path, operator, operand, default)
+                    for d in documents:
+                        value = get_path(d, path)
+                        expected = (
+                            c.default_match
+                            if value is MISSING
+                            else match_value(value, operator, operand)
+                        )
+                        self.assertEqual(bool(c.match(d)), bool(expected), (c, d))
+
+        predicate = compile_conditions(
+            [Condition(["age"], "$gte", 12), Condition(["name"], "$reg", "^b")]
+        )
+        self.assertEqual(
+            [bool(predicate(d)) for d in documents], [False, False, True, False, False]
+        )
+        self.assertTrue(compile_conditions([])({}))
+
+    def test_filter_key(self):
+        """
+        filters as cache keys
+        """
+        self.assertEqual(
+            filter_key({"a": ("$gt", 1), "b": [1, "x"]}),
+            filter_key({"a": ("$gt", 1), "b": [1, "x"]}),
+        )
+        self.assertNotEqual(filter_key({"a": 1}), filter_key({"a": True}))
+        self.assertNotEqual(filter_key({"a": 1}), filter_key({"a": 1.0}))
+        self.assertNotEqual(filter_key(("$eq", [1])), filter_key(("$eq", (1,))))
+        self.assertIsNone(filter_key({"a": {1, 2}}))
+        self.assertEqual(filter_key(None), ("None",))
+
+    def test_plan_cache(self):
+        """
+        the split of a filter is done once
+        """
+        sel = Selection(["$.name"], filter={"male": True})
+        self.users.register_selection("males", sel)
+        plan = sel.plan({"age": ("$gt", 12)})
+        self.assertIs(sel.plan({"age": ("$gt", 12)}), plan)
+        self.assertIsNot(sel.plan({"age": ("$gt", 13)}), plan)
+        self.assertEqual(
+            [(c.path, c.operator, c.operand) for c in plan[0]],
+            [(["male"], "$eq", True), (["age"], "$gt", 12)],
+        )
+        # Not hashable filters are not cached
+        self.assertIsNot(sel.plan({"tags": {"a"}}), sel.plan({"tags": {"a"}}))
+
+    def test_mongo_translation(self):
+        """
+        translate to a mongo filter
+        """
+        _id = str(ObjectId())
+        conditions, remaining = split_filter(
+            {
+                "_id": _id,
+                "age": ("$and", [("$gte", 2), ("$lt", 60)]),
+                "male": ("$ne", True),
+                "name": ("$ne", "bob"),
+            },
+            self.users.model,
+            self.db_mongo,
+        )
+        self.assertIsNone(remaining)
+        self.assertEqual(
+            self.db_mongo.translate_filter(conditions, {"flag": 1}),
+            {
+                "$and": [
+                    {"flag": 1},
+                    {"_id": {"$eq": ObjectId(_id)}},
+                    {"$and": [{"age": {"$gte": 2}}, {"age": {"$lt": 60}}]},
+                    # a missing "male" is True (the default) and must not match
+                    {
+                        "$and": [
+                            {"male": {"$exists": True}},
+                            {"male": {"$ne": True}},
+                        ]
+                    },
+                    {"name": {"$ne": "bob"}},
+                ]
+            },
+        )
+
+        # default value True match missing fields
+        conditions, remaining = split_filter(
+            {"male": True, "name": ("$reg", "b")}, self.users.model, self.db_mongo
+        )
+        self.assertEqual(
+            self.db_mongo.translate_filter(conditions),
+            {
+                "$and": [
+                    {"$or": [{"male": {"$eq": True}}, {"male": {"$exists": False}}]},
+                    {"name": {"$regex": "^(?:b)"}},
+                ]
+            },
+        )
+
+        # _id which are not ObjectId stay in python
+        conditions, remaining = split_filter(
+            {"_id": "not_an_object_id"}, self.users.model, self.db_mongo
+        )
+        self.assertEqual(conditions, [])
+        self.assertEqual(remaining, {"_id": "not_an_object_id"})
+
+    def test_build_projection(self):
+        """
+        projection from selectors and filter
+        """
+        model = Item(
+            {
+                "name": String(),
+                "age": Int(),
+                "tags": List(String()),
+                "address": Dict({"town": String(), "zip": Int()}),
+            }
+        )
+        self.assertEqual(build_projection(None, None, model), {})
+        self.assertEqual(
+            build_projection(
+                ["$._id", "$.name", "$.address.town", "$.tags[0]"],
+                {"age": ("$gt", 2)},
+                model,
+            ),
+            {"_id": 1, "address": 1, "age": 1, "name": 1, "tags": 1},
+        )
+        # filter as a tuple or strange selector -> all
+        self.assertEqual(build_projection(["$.name"], ("$ne", None), model), {})
+        self.assertEqual(build_projection(["$"], None, model), {})
+
+        # a field depends on others (here, a read permission) -> all
+        self.assertEqual(build_projection(["$.name"], None, self.users.model), {})
@@ -0,0 +1,191 @@
+"""
+test for the identity map (objects loaded once per request)
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import json
+import unittest
+from flask import Flask
+
+from backo import Item, Collection, Backoffice, current_user, Selection
+from backo import IdentityMap, identity_map_scope
+from backo import current_identity_map
+from backo import String, Ref, RefsList, DeleteStrategy
+
+from .counting import CountingYml
+
+YML_DIR = "/tmp/backo_tests_identity_map"
+
+
+class TestIdentityMap(unittest.TestCase):
+    """
+    Identity map
+    """
+
+    def setUp(self):
+        """
+        books and authors
+        """
+        current_user.standalone = True
+        self.db_books = CountingYml(path=YML_DIR + "/books")
+        self.db_authors = CountingYml(path=YML_DIR + "/authors")
+        self.db_books.generate_id = lambda o: f"Book_{o.title}"
+        self.db_authors.generate_id = lambda o: f"Author_{o.name}"
+        self.db_books.drop()
+        self.db_authors.drop()
+
+        self.backo = Backoffice("myApp")
+        self.books = Collection(
+            "books",
+            Item(
+                {
+                    "title": String(),
+                    "author": Ref(coll="authors", field="$.books"),
+                }
+            ),
+            self.db_books,
+        )
+        self.books.register_selection(
+            "with_author", Selection(["$.title", "$.author.name"])
+        )
+        self.books.register_selection(
+            "materialized",
+            Selection(["$.title", "$.author.name"], materialized=True),
+        )
+        self.backo.register_collection(self.books)
+        self.backo.register_collection(
+            Collection(
+                "authors",
+                Item(
+                    {
+                        "name": String(),
+                        "books": RefsList(
+                            coll="books",
+                            field="$.author",
+                            ods=DeleteStrategy.UNLINK_REFERENCED_ITEMS,
+                        ),
+                    }
+                ),
+                self.db_authors,
+            )
+        )
+
+        hugo = self.backo.authors.create({"name": "hugo"})
+        zola = self.backo.authors.create({"name": "zola"})
+        for i in range(4):
+            self.books.create({"title": f"h{i}", "author": hugo._id})
+        self.books.create({"title": "z0", "author": zola._id})
+        self.db_authors.loaded.clear()
+
+    def test_map(self):
+        """
+        documents are read once, and forgotten
+        """
+        identity_map = IdentityMap()
+        d = identity_map.get_document(
+            "authors", "Author_hugo", self.db_authors.get_by_id
+        )
+        d["name"] = "changed"
+        d = identity_map.get_document(
+            "authors", "Author_hugo", self.db_authors.get_by_id
+        )
+        self.assertEqual(d["name"], "hugo")
+        self.assertEqual(self.db_authors.loaded, ["Author_hugo"])
+        self.assertEqual((identity_map.hits, identity_map.misses), (1, 1))
+
+        identity_map.discard("authors", "Author_hugo")
+        self.assertEqual(len(identity_map), 0)
+
+        # No scope outside requests
+        self.assertIsNone(current_identity_map())
+        with identity_map_scope(identity_map) as current:
+            self.assertIs(current_identity_map(), identity_map)
+            with identity_map_scope() as inner:
+                self.assertIs(inner, current)
+        self.assertIsNone(current_identity_map())
+
+    def test_selection(self):
+        """
+        selectors load each referenced object once per selection
+        """
+        rep = self.books._selections["with_author"].select({})
+        self.assertEqual(
+            sorted(tuple(o[1:]) for o in rep["result"]),
+            [
+                ("h0", "hugo"),
+                ("h1", "hugo"),
+                ("h2", "hugo"),
+                ("h3", "hugo"),
+                ("z0", "zola"),
+            ],
+        )
+        self.assertEqual(sorted(self.db_authors.loaded), ["Author_hugo", "Author_zola"])
+
+        # Another selection read them again
+        self.books._selections["with_author"].select({})
+        self.assertEqual(len(self.db_authors.loaded), 4)
+
+    def test_writes(self):
+        """
+        saved and deleted objects are read again
+        """
+        with identity_map_scope():
+            hugo = self.backo.authors.get_by_id("Author_hugo")
+            self.assertEqual(len(hugo.books), 4)
+
+            # reverse links load and save the author
+            self.books.create({"title": "h4", "author": "Author_hugo"})
+            self.assertEqual(len(self.backo.authors.get_by_id("Author_hugo").books), 5)
+
+            book = self.books.get_by_id("Book_h0")
+            book.delete()
+            self.assertEqual(len(self.backo.authors.get_by_id("Author_hugo").books), 4)
+
+            # rollback
+            t_id = self.backo.start_transaction()
+            self.books.create(
+                {"title": "h5", "author": "Author_hugo"}, transaction_id=t_id
+            )
+            self.assertEqual(len(self.backo.authors.get_by_id("Author_hugo").books), 5)
+            self.backo.rollback_transaction(t_id)
+            self.assertEqual(len(self.backo.authors.get_by_id("Author_hugo").books), 4)
+
+    def test_request(self):
+        """
+        the identity map lives during the request
+        """
+        flask = Flask(__name__)
+        self.backo.build_routes(flask)
+        client = flask.test_client()
+
+        response = client.get("/myApp/books/_selections/with_author")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.data)["result"]), 5)
+        self.assertEqual(sorted(self.db_authors.loaded), ["Author_hugo", "Author_zola"])
+
+        with flask.test_request_context("/"):
+            identity_map = current_identity_map()
+            self.assertIs(current_identity_map(), identity_map)
+            self.backo.authors.get_by_id("Author_hugo")
+            self.backo.authors.get_by_id("Author_hugo")
+            self.assertEqual(len(identity_map), 1)
+        with flask.test_request_context("/"):
+            self.assertEqual(len(current_identity_map()), 0)
+
+    def test_stream(self):
+        """
+        a stream keeps its own objects, not in the map of the request
+        """
+        flask = Flask(__name__)
+        for name in ("with_author", "materialized"):
+            with flask.test_request_context("/"):
+                rows = self.books._selections[name].stream({}, 0, 0)
+                self.assertEqual(len(list(rows)), 5)
+                self.assertEqual(len(current_identity_map()), 0)
+
+                # Only referenced objects are kept by the stream
+                self.assertEqual(
+                    sorted(key for key in rows.identity_map._documents),
+                    [("authors", "Author_hugo"), ("authors", "Author_zola")],
+                )
@@ -0,0 +1,171 @@
+"""
+test for the append-only log connector
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import os
+import unittest
+
+from backo import Item, Collection, Backoffice, current_user
+from backo import DBLogConnector, DBError, NotFoundError
+from backo import String, Int, Dict
+from backo.db_log_connector import log
+
+LOG_FILE = "/tmp/backo_tests_log/users.log"
+
+
+class TestLogConnector(unittest.TestCase):
+    """
+    append-only log connector
+    """
+
+    def setUp(self):
+        """
+        start with an empty log
+        """
+        current_user.standalone = True
+        self.db = DBLogConnector(path=LOG_FILE)
+        self.db.drop()
+        self.db.generate_id = lambda o: f"User_{o.name}"
+
+        self.backo = Backoffice("myApp")
+        self.users = Collection(
+            "users",
+            Item(
+                {
+                    "name": String(),
+                    "age": Int(),
+                    "address": Dict({"town": String(default="Paris")}),
+                }
+            ),
+            self.db,
+        )
+        self.backo.register_collection(self.users)
+
+    def test_crud(self):
+        """
+        create, save, delete
+        """
+        self.users.create({"name": "bert", "age": 12})
+        u = self.users.create({"name": "paul", "age": 30})
+        with self.assertRaises(DBError):
+            self.db.create({"_id": "User_paul"})
+
+        u.age = 31
+        u.save()
+        self.assertEqual(self.users.get_by_id("User_paul").age, 31)
+        self.assertEqual(self.db.count(None), 2)
+
+        u.delete()
+        with self.assertRaises(NotFoundError):
+            self.db.get_by_id("User_paul")
+        self.assertFalse(self.db.delete_by_id("User_paul"))
+        self.assertEqual(self.db.count(None), 1)
+
+        # Another connector rebuild the index from the log
+        db = DBLogConnector(path=LOG_FILE)
+        self.assertEqual(db.get_by_id("User_bert")["age"], 12)
+        self.assertEqual(db.count(None), 1)
+        self.assertEqual(db._dead_size, self.db._dead_size)
+
+    def test_selection(self):
+        """
+        filters, sort and pagination are done by the connector
+        """
+        for i, name in enumerate(["bert", "paul", "marc", "jo"]):
+            self.users.create({"name": name, "age": 10 * i})
+
+        rows = self.users._selections["_all"].stream({"age": ("$gte", 10)})
+        self.assertIsNone(rows.remaining_filter)
+        self.assertTrue(rows.paginate_in_db)
+        self.assertEqual(sorted(o.name for o in rows), ["jo", "marc", "paul"])
+
+        rep = self.users._selections["_all"].select(
+            {"age": ("$gte", 10)}, 2, 0, {"age": -1}
+        )
+        self.assertEqual([o.name for o in rep["result"]], ["jo", "marc"])
+        self.assertEqual(rep["total"], 3)
+        rep = self.users._selections["_all"].select(
+            {"age": ("$gte", 10)}, 2, 0, {"age": -1}, cursor=rep["_cursor"]
+        )
+        self.assertEqual([o.name for o in rep["result"]], ["paul"])
+
+    def test_truncated_record(self):
+        """
+        an incomplete record at the end (crash) is removed
+        """
+        self.users.create({"name": "bert", "age": 12})
+        size = os.path.getsize(LOG_FILE)
+        with open(LOG_FILE, "ab") as f:
+            f.write(b'["p","User_paul",{"_id":')
+
+        db = DBLogConnector(path=LOG_FILE)
+        self.assertEqual(os.path.getsize(LOG_FILE), size)
+        self.assertEqual(db.count(None), 1)
+
+    def test_compact(self):
+        """
+        compaction keep the last version of objects
+        """
+        u = self.users.create({"name": "bert", "age": 0})
+        self.users.create({"name": "paul", "age": 30})
+        for i in range(1, 20):
+            u.age = i
+            u.save()
+        self.users.get_by_id("User_paul").delete()
+        size = os.path.getsize(LOG_FILE)
+
+        self.db.compact()
+        self.assertLess(os.path.getsize(LOG_FILE), size / 10)
+        self.assertEqual(self.db._dead_size, 0)
+        self.assertEqual(self.users.get_by_id("User_bert").age, 19)
+        self.assertEqual(self.db.count(None), 1)
+        self.assertEqual(
+            DBLogConnector(path=LOG_FILE).get_by_id("User_bert")["age"], 19
+        )
+
+        # Compaction in background
+        db = DBLogConnector(path=LOG_FILE, compact_ratio=0.5, compact_min_size=1)
+        db.save("User_bert", {"_id": "User_bert", "age": 20})
+        db._compaction.join()
+        self.assertEqual(db._dead_size, 0)
+        self.assertEqual(db.get_by_id("User_bert")["age"], 20)
+        self.assertEqual(
+            os.path.getsize(LOG_FILE),
+            len(b'["p","User_bert",{"_id":"User_bert","age":20}]\n'),
+        )
+
+    def test_compact_error(self):
+        """
+        an error of the compaction in background is raised by the next write
+        """
+        db = DBLogConnector(path=LOG_FILE, compact_ratio=0.5, compact_min_size=1)
+        db.save("User_bert", {"_id": "User_bert", "age": 19})
+        db.save("User_bert", {"_id": "User_bert", "age": 20})
+        db._compaction.join()
+
+        def failing_compact():
+            """No space left"""
+            raise OSError(28, "No space left on device")
+
+        db.compact = failing_compact
+        with self.assertLogs(log, level="ERROR"):
+            db.save("User_bert", {"_id": "User_bert", "age": 21})
+            db._compaction.join()
+        with self.assertRaises(DBError):
+            db.save("User_bert", {"_id": "User_bert", "age": 22})
+        self.assertEqual(db.get_by_id("User_bert")["age"], 21)
+
+        # raised once, then writes go on
+        db.compact = lambda: None
+        db.save("User_bert", {"_id": "User_bert", "age": 22})
+        self.assertEqual(db.get_by_id("User_bert")["age"], 22)
+
+        # or raised by close
+        db.compact = failing_compact
+        with self.assertLogs(log, level="ERROR"):
+            db.save("User_bert", {"_id": "User_bert", "age": 23})
+            db._compaction.join()
+        with self.assertRaises(DBError):
+            db.close()
@@ -0,0 +1,186 @@
+"""
+test for materialized selections
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import unittest
+
+from backo import Item, Collection, Backoffice, current_user, Selection
+from backo import SSyntaxError
+from backo import String, Ref, RefsList, DeleteStrategy
+
+from .counting import CountingYml
+
+YML_DIR = "/tmp/backo_tests_materialized"
+
+
+def author_country(o):
+    """
+    the country of the author of the book
+    """
+    country = o.select("$.author.country")
+    return country.get_value() if country is not None else None
+
+
+class TestMaterialized(unittest.TestCase):
+    """
+    Materialized selections
+    """
+
+    def setUp(self):
+        """
+        books and authors
+        """
+        current_user.standalone = True
+        self.db_books = CountingYml(path=YML_DIR + "/books")
+        self.db_authors = CountingYml(path=YML_DIR + "/authors")
+        self.db_books.generate_id = lambda o: f"Book_{o.title}"
+        self.db_authors.generate_id = lambda o: f"Author_{o.name}"
+        self.db_books.drop()
+        self.db_authors.drop()
+
+        self.backo = Backoffice("myApp")
+        self.books = Collection(
+            "books",
+            Item(
+                {
+                    "title": String(),
+                    "lang": String(),
+                    "author": Ref(coll="authors", field="$.books"),
+                    "country": String(set=author_country),
+                }
+            ),
+            self.db_books,
+        )
+        self.books.register_selection(
+            "english",
+            Selection(["$.title"], filter={"lang": "en"}, materialized_rows=True),
+        )
+        self.books.register_selection(
+            "by_french",
+            Selection(
+                ["$.title", "$.author.name"],
+                filter={"country": "FR"},
+                materialized=True,
+            ),
+        )
+        self.backo.register_collection(self.books)
+        self.backo.register_collection(
+            Collection(
+                "authors",
+                Item(
+                    {
+                        "name": String(),
+                        "country": String(),
+                        "books": RefsList(
+                            coll="books",
+                            field="$.author",
+                            ods=DeleteStrategy.UNLINK_REFERENCED_ITEMS,
+                        ),
+                    }
+                ),
+                self.db_authors,
+            )
+        )
+
+        hugo = self.backo.authors.create({"name": "hugo", "country": "FR"})
+        twain = self.backo.authors.create({"name": "twain", "country": "US"})
+        for i in range(3):
+            self.books.create({"title": f"h{i}", "lang": "fr", "author": hugo._id})
+            self.books.create({"title": f"t{i}", "lang": "en", "author": twain._id})
+
+    def titles(self, selection_name, *args):
+        """
+        return titles of the selection
+        """
+        rep = self.books._selections[selection_name].select(None, *args)
+        return [row[1] for row in rep["result"]], rep["total"]
+
+    def test_materialized(self):
+        """
+        selections are served from the _ids, updated with writes
+        """
+        self.assertEqual(self.titles("english"), (["t0", "t1", "t2"], 3))
+        scans = self.db_books.scans
+        self.assertEqual(self.titles("english", 2, 1), (["t1", "t2"], 3))
+        self.assertEqual(self.db_books.scans, scans)
+
+        # Created, saved and deleted objects
+        self.books.create({"title": "t3", "lang": "en"})
+        book = self.books.get_by_id("Book_h0")
+        book.lang = "en"
+        book.save()
+        self.books.get_by_id("Book_t1").delete()
+        self.assertEqual(self.titles("english"), (["h0", "t0", "t2", "t3"], 4))
+        book.title = "h0 (en)"
+        book.save()
+        self.assertEqual(self.titles("english", 1, 0)[0], ["h0 (en)"])
+        self.assertEqual(self.db_books.scans, scans)
+
+        # Pages with a cursor
+        rep = self.books._selections["english"].select(None, 3)
+        rep = self.books._selections["english"].select(
+            None, 3, 0, {"_id": 1}, rep["_cursor"]
+        )
+        self.assertEqual([row[1] for row in rep["result"]], ["t3"])
+
+        # A filter or a sort uses the database
+        rep = self.books._selections["english"].select({"title": "t0"})
+        self.assertEqual(rep["total"], 1)
+        self.assertEqual(self.db_books.scans, scans + 1)
+
+        # Writes done in the database directly
+        t_id = self.backo.start_transaction()
+        self.books.create({"title": "t4", "lang": "en"}, transaction_id=t_id)
+        self.assertEqual(self.titles("english")[1], 5)
+        self.backo.rollback_transaction(t_id)
+        self.assertEqual(self.titles("english")[1], 4)
+
+    def test_references(self):
+        """
+        filters and rows with references follow the other collection
+        """
+        self.assertEqual(self.titles("by_french"), (["h0", "h1", "h2"], 3))
+        twain = self.backo.authors.get_by_id("Author_twain")
+        twain.country = "FR"
+        twain.save()
+        self.assertEqual(self.titles("by_french")[1], 6)
+
+        # Rows kept show referenced objects
+        self.books.register_selection(
+            "authors", Selection(["$.author.name"], materialized_rows=True)
+        )
+        rep = self.books._selections["authors"].select(None, 1)
+        self.assertEqual(rep["result"][0][1], "hugo")
+        hugo = self.backo.authors.get_by_id("Author_hugo")
+        hugo.name = "victor"
+        hugo.save()
+        rep = self.books._selections["authors"].select(None, 1)
+        self.assertEqual(rep["result"][0][1], "victor")
+
+    def test_read_restriction(self):
+        """
+        objects not readable are not returned
+        """
+        self.books._permissions.add_or_modify_permission(
+            "read", lambda right_name, o: o is None or o.title != "t1"
+        )
+        self.assertEqual(self.titles("english"), (["t0", "t2"], 2))
+        self.assertEqual(self.titles("english", 1, 1), (["t2"], 2))
+
+        # Objects before the cursor are counted (or estimated)
+        english = self.books._selections["english"]
+        for count, total in (("exact", 2), ("estimate", 3)):
+            rep = english.select(None, 1, 0, {"_id": 1}, count=count)
+            rep = english.select(None, 1, 0, {"_id": 1}, rep["_cursor"], count=count)
+            self.assertEqual(
+                ([row[1] for row in rep["result"]], rep["total"]), (["t2"], total)
+            )
+
+    def test_wrong_selection(self):
+        """
+        a filter function cannot be materialized
+        """
+        with self.assertRaises(SSyntaxError):
+            Selection(["$.title"], filter=lambda: {}, materialized=True)
@@ -8,11 +8,11 @@ import unittest
 import time
 
 
-from backo import Item, Collection
+from backo import Item, Collection, Selection
 from backo import DBMongoConnector
 from backo import Backoffice, NotFoundError, DBError, current_user
 
-from backo import String, Bool  # , Error as StrictoError
+from backo import String, Bool, Int  # , Error as StrictoError
 
 
 class TestMongo(unittest.TestCase):
@@ -170,6 +170,134 @@ class TestMongo(unittest.TestCase):
         # -- delete
         u.delete()
 
+    def test_bulk(self):
+        """
+        create_many, save_many and delete_many
+        """
+        backoffice = Backoffice("myApp")
+        backoffice.register_collection(
+            Collection(
+                "users",
+                Item(
+                    {"name": String(), "surname": String(), "male": Bool(default=True)}
+                ),
+                self.db_users,
+            )
+        )
+        backoffice.users.drop()
+        current_user.standalone = True
+
+        users = backoffice.users.create_many(
+            [{"name": f"bebert{i}", "surname": "bebert"} for i in range(5)],
+            batch_size=2,
+        )
+        self.assertEqual(len({u._id.get_value() for u in users}), 5)
+        self.assertEqual(backoffice.users.get_by_id(users[3]._id).name, "bebert3")
+        self.assertEqual(
+            [
+                o.name
+                for o in backoffice.users.get_by_ids(
+                    [users[4]._id, "not_an_object_id", users[1]._id]
+                )
+            ],
+            ["bebert4", "bebert1"],
+        )
+
+        for u in users:
+            u.male = False
+        backoffice.users.save_many(users[1:])
+        self.assertEqual(backoffice.users.get_by_id(users[0]._id).male, True)
+        self.assertEqual(backoffice.users.get_by_id(users[4]._id).male, False)
+
+        backoffice.users.delete_many(users[:3])
+        self.assertEqual(
+            sorted(o.name for o in backoffice.users.select({})),
+            ["bebert3", "bebert4"],
+        )
+        self.assertEqual(
+            self.db_users.delete_many([users[3]._id.get_value()]),
+            [users[3]._id.get_value()],
+        )
+        self.assertEqual(self.db_users.delete_many([users[3]._id.get_value()]), [])
+
+    def test_aggregate(self):
+        """
+        aggregate with a pipeline
+        """
+        backoffice = Backoffice("myApp")
+        backoffice.register_collection(
+            Collection(
+                "users",
+                Item({"name": String(), "surname": String(), "age": Int()}),
+                self.db_users,
+            )
+        )
+        backoffice.users.drop()
+        current_user.standalone = True
+
+        backoffice.users.create_many(
+            [
+                {"name": f"bebert{i}", "surname": "bebert" if i < 3 else None, "age": i}
+                for i in range(5)
+            ]
+        )
+        self.assertEqual(
+            backoffice.users.aggregate(
+                {"age": ("$gt", 0)}, "surname", {"sum": "age", "max": "name"}
+            ),
+            [
+                {
+                    "group": {"surname": None},
+                    "count": 2,
+                    "sum": {"age": 7},
+                    "max": {"name": "bebert4"},
+                },
+                {
+                    "group": {"surname": "bebert"},
+                    "count": 2,
+                    "sum": {"age": 3},
+                    "max": {"name": "bebert2"},
+                },
+            ],
+        )
+        self.assertEqual(
+            backoffice.users.aggregate(None, None, {"min": "age"}),
+            [{"group": {}, "count": 5, "min": {"age": 0}}],
+        )
+
+    def test_aggregate_in_python(self):
+        """
+        aggregate and facets on a computed field (evaluated here)
+        """
+        backoffice = Backoffice("myApp")
+        backoffice.register_collection(
+            Collection(
+                "users",
+                Item(
+                    {
+                        "name": String(),
+                        "age": Int(),
+                        "old": Bool(set=lambda o: (o.age.get_value() or 0) > 2),
+                    }
+                ),
+                self.db_users,
+            )
+        )
+        backoffice.users.drop()
+        current_user.standalone = True
+
+        backoffice.users.create_many(
+            [{"name": f"bebert{i}", "age": i} for i in range(5)]
+        )
+        self.assertEqual(
+            backoffice.users.aggregate({"old": True}, None, {"sum": "age"}),
+            [{"group": {}, "count": 2, "sum": {"age": 7}}],
+        )
+        self.assertEqual(
+            backoffice.users.facets(None, "old"),
+            {"old": [{"value": False, "count": 3}, {"value": True, "count": 2}]},
+        )
+
     def test_select(self):
         """
         select
@@ -218,6 +346,44 @@ class TestMongo(unittest.TestCase):
             self.assertEqual(type(o), Item)
             self.assertEqual(o.surname, "Al")
 
+        # check pagination with a filter given to mongo
+        result = backoffice.users._selections["_all"].select(
+            {"name": ("$reg", "bebert[3-7]"), "surname": ("$ne", "Al")}, 2, 1
+        )
+        self.assertEqual(result["total"], 3)
+        self.assertEqual(len(result["result"]), 2)
+        self.assertEqual([o.name for o in result["result"]], ["bebert4", "bebert5"])
+
+        # check keyset pagination (the cursor is given to mongo)
+        sort = {"surname": -1, "name": 1}
+        result = backoffice.users._selections["_all"].select({}, 3, 0, sort)
+        self.assertEqual(
+            [o.name for o in result["result"]], ["bebert1", "bebert2", "bebert3"]
+        )
+        result = backoffice.users._selections["_all"].select(
+            {}, 3, 0, sort, result["_cursor"]
+        )
+        self.assertEqual(result["total"], 7)
+        self.assertEqual(
+            [o.name for o in result["result"]], ["bebert4", "bebert5", "bebert6"]
+        )
+        result = backoffice.users._selections["_all"].select(
+            {}, 3, 0, sort, result["_cursor"]
+        )
+        self.assertEqual([o.name for o in result["result"]], ["bebert7"])
+        self.assertIsNone(result["_cursor"])
+
+        # check total modes
+        result = backoffice.users._selections["_all"].select({}, 2, 0, count="estimate")
+        self.assertEqual(result["total"], 7)
+        result = backoffice.users._selections["_all"].select(
+            {"surname": "Joe"}, 2, 0, count="estimate"
+        )
+        self.assertEqual(result["total"], 3)
+        result = backoffice.users._selections["_all"].select({}, 2, 0, count="none")
+        self.assertIsNone(result["total"])
+        self.assertEqual(len(result["result"]), 2)
+
         # check not found
         result = backoffice.users._selections["_all"].select(
             {"surname_not_found": "Al"}
@@ -229,3 +395,192 @@ class TestMongo(unittest.TestCase):
         )
         self.assertEqual(result["total"], 0)
         self.assertEqual(len(result["result"]), 0)
+
+    def test_sort_in_python(self):
+        """
+        sort on a computed field (top-k done here)
+        """
+        backoffice = Backoffice("myApp")
+        backoffice.register_collection(
+            Collection(
+                "users",
+                Item(
+                    {
+                        "name": String(),
+                        "age": Int(),
+                        "rank": Int(set=lambda o: (o.age.get_value() or 0) % 3),
+                    }
+                ),
+                self.db_users,
+            )
+        )
+        backoffice.users.drop()
+        current_user.standalone = True
+
+        backoffice.users.create_many(
+            [{"name": f"bebert{i}", "age": i} for i in range(5)]
+        )
+        result = backoffice.users._selections["_all"].select(
+            {}, 3, 0, {"rank": -1, "name": 1}
+        )
+        self.assertEqual(result["total"], 5)
+        self.assertEqual(
+            [o.name for o in result["result"]], ["bebert2", "bebert1", "bebert4"]
+        )
+
+    def test_columns(self):
+        """
+        the column store is read from mongo
+        """
+        backoffice = Backoffice("myApp")
+        backoffice.register_collection(
+            Collection(
+                "users",
+                Item({"name": String(), "surname": String(), "age": Int()}),
+                self.db_users,
+                columns="surname,age",
+            )
+        )
+        backoffice.users.drop()
+        current_user.standalone = True
+
+        backoffice.users.create_many(
+            [
+                {"name": f"bebert{i}", "surname": "bebert" if i < 3 else None, "age": i}
+                for i in range(5)
+            ]
+        )
+        rows = backoffice.users._selections["_all"].stream(
+            {"surname": "bebert", "age": ("$gt", 0)}, 10
+        )
+        self.assertIsNotNone(rows.columns)
+        self.assertEqual([o.name for o in rows], ["bebert1", "bebert2"])
+
+    def test_read_filter(self):
+        """
+        the read filter is in the mongo query
+        """
+        backoffice = Backoffice("myApp")
+        backoffice.register_collection(
+            Collection(
+                "users",
+                Item({"name": String(), "surname": String(), "age": Int()}),
+                self.db_users,
+                read_filter=lambda: {"surname": current_user.login.get_value()},
+            )
+        )
+        backoffice.users.drop()
+        current_user.standalone = True
+        current_user.set({"_id": "1", "login": "bebert", "roles": []})
+
+        backoffice.users.create_many(
+            [
+                {"name": f"bebert{i}", "surname": "bebert" if i < 3 else None, "age": i}
+                for i in range(5)
+            ]
+        )
+        rows = backoffice.users._selections["_all"].stream({"age": ("$gt", 0)}, 10)
+        self.assertTrue(rows.paginate_in_db)
+        self.assertEqual([o.name for o in rows], ["bebert1", "bebert2"])
+        self.assertEqual(backoffice.users.aggregate()[0]["count"], 3)
+
+    def test_facets(self):
+        """
+        facets with one $group by field
+        """
+        backoffice = Backoffice("myApp")
+        backoffice.register_collection(
+            Collection(
+                "users",
+                Item({"name": String(), "surname": String(), "age": Int()}),
+                self.db_users,
+            )
+        )
+        backoffice.users.drop()
+        current_user.standalone = True
+
+        backoffice.users.create_many(
+            [
+                {"name": f"bebert{i}", "surname": "bebert" if i < 3 else None, "age": i}
+                for i in range(5)
+            ]
+        )
+        self.assertEqual(
+            backoffice.users.facets({"age": ("$gt", 0)}, "surname,age", 2),
+            {
+                "surname": [
+                    {"value": None, "count": 2},
+                    {"value": "bebert", "count": 2},
+                ],
+                "age": [{"value": 1, "count": 1}, {"value": 2, "count": 1}],
+            },
+        )
+
+    def test_materialized(self):
+        """
+        a materialized selection is built without sort
+        """
+        backoffice = Backoffice("myApp")
+        coll_users = Collection(
+            "users",
+            Item({"name": String(), "surname": String(), "age": Int()}),
+            self.db_users,
+        )
+        coll_users.register_selection(
+            "bebert",
+            Selection(["$.name"], filter={"surname": "bebert"}, materialized=True),
+        )
+        backoffice.register_collection(coll_users)
+        backoffice.users.drop()
+        current_user.standalone = True
+
+        backoffice.users.create_many(
+            [
+                {"name": f"bebert{i}", "surname": "bebert" if i < 3 else None, "age": i}
+                for i in range(5)
+            ]
+        )
+        ids, _ = backoffice.users._selections["bebert"].materialize()
+        self.assertEqual(len(ids), 3)
+        backoffice.users.create({"name": "bebert5", "surname": "bebert"})
+        result = backoffice.users._selections["bebert"].select()
+        self.assertEqual(result["total"], 4)
+
+    def test_materialized_restriction(self):
+        """
+        objects excluded by the restriction are not added to a materialized selection
+        """
+        db_young = DBMongoConnector(
+            connection_string="mongodb://localhost:27017/testMongo",
+            collection="Users",
+            restriction=lambda: {"age": {"$lt": 3}},
+        )
+        backoffice = Backoffice("myApp")
+        coll_users = Collection(
+            "users",
+            Item({"name": String(), "surname": String(), "age": Int()}),
+            db_young,
+        )
+        coll_users.register_selection(
+            "bebert",
+            Selection(["$.name"], filter={"surname": "bebert"}, materialized=True),
+        )
+        backoffice.register_collection(coll_users)
+        self.db_users.drop()
+        current_user.standalone = True
+
+        backoffice.users.create_many(
+            [{"name": f"bebert{i}", "surname": "bebert", "age": i} for i in range(5)]
+        )
+        self.assertEqual(
+            len(backoffice.users._selections["bebert"].materialize()[0]), 3
+        )
+        backoffice.users.create({"name": "old", "surname": "bebert", "age": 10})
+        self.assertEqual(
+            len(backoffice.users._selections["bebert"].materialize()[0]), 3
+        )
+        backoffice.users.create({"name": "young", "surname": "bebert", "age": 1})
+        self.assertEqual(
+            len(backoffice.users._selections["bebert"].materialize()[0]), 4
+        )
+        db_young.close()
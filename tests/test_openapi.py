@@ -122,7 +122,7 @@ class TestOpenAPI(unittest.TestCase):
         self.assertEqual(schemas["test"]["title"], "test")
 
         # expecting routes to be present for the test collection
-        self.assertEqual(len(spec["paths"]), 6)
+        self.assertEqual(len(spec["paths"]), 8)
         ## get and post on /test
         self.assertIn("/test", spec["paths"])
         self.assertEqual(len(spec["paths"]["/test"]), 2)
@@ -141,6 +141,14 @@ class TestOpenAPI(unittest.TestCase):
         self.assertEqual(len(spec["paths"]["/test/{id}"]), 4)
         for method in ["get", "put", "patch", "del"]:
             self.assertIn(method, spec["paths"]["/test/{id}"])
+        ## get on /test/_aggregate
+        self.assertIn("/test/_aggregate", spec["paths"])
+        self.assertEqual(len(spec["paths"]["/test/_aggregate"]), 1)
+        self.assertIn("get", spec["paths"]["/test/_aggregate"])
+        ## get on /test/_facets
+        self.assertIn("/test/_facets", spec["paths"])
+        self.assertEqual(len(spec["paths"]["/test/_facets"]), 1)
+        self.assertIn("get", spec["paths"]["/test/_facets"])
         ## get on /test/{id}/{path}
         self.assertIn("/test/{id}/{path}", spec["paths"])
         self.assertEqual(len(spec["paths"]["/test/{id}/{path}"]), 1)
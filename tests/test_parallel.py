@@ -0,0 +1,164 @@
+"""
+test for parallel scans
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import unittest
+
+from backo import Item, Collection, Backoffice, current_user, CurrentUser, Selection
+from backo import DBYmlConnector, DBSqliteConnector, SelectionStream
+from backo.parallel import match_chunk
+from backo import String, Int
+
+YML_DIR = "/tmp/backo_tests_parallel"
+
+
+def is_long(o):
+    """
+    a computed field
+    """
+    return (o.pages.get_value() or 0) > 250
+
+
+def compute_long(o):
+    """
+    the value of the computed field
+    """
+    return "yes" if is_long(o) else "no"
+
+
+def can_read(right_name, o):  # pylint: disable=unused-argument
+    """
+    a read right
+    """
+    return o is None or o.pages < 400
+
+
+class TestParallel(unittest.TestCase):
+    """
+    Filters matched in worker processes
+    """
+
+    def make_collection(self, db_handler, **kwargs):
+        """
+        return a collection of books with a computed field
+        """
+        current_user.reset(CurrentUser())
+        current_user.standalone = True
+        current_user.set({"_id": "1", "login": "bob", "roles": []})
+        db_handler.generate_id = lambda o: f"Book_{o.title}"
+        db_handler.drop()
+        backo = Backoffice("myApp")
+        books = Collection(
+            "books",
+            Item(
+                {
+                    "title": String(),
+                    "pages": Int(),
+                    "long": String(set=compute_long),
+                }
+            ),
+            db_handler,
+            **kwargs,
+        )
+        backo.register_collection(books)
+        books.register_selection(
+            "titles",
+            Selection(["$.title"], filter={"long": "yes"}, workers=3, chunk_size=4),
+        )
+        books.create_many(
+            [{"title": f"b{i:02}", "pages": (i * 37) % 500} for i in range(40)]
+        )
+        return books
+
+    def check_parallel(self, db_handler):
+        """
+        the same rows, in the same order
+        """
+        books = self.make_collection(db_handler, workers=2)
+        all_selection = books._selections["_all"]
+        self.assertTrue(SelectionStream(all_selection, {"long": "yes"}).parallel)
+
+        for args in [
+            ({"long": "yes"}, 0, 0),
+            ({"long": "yes", "pages": ("$lt", 400)}, 5, 3),
+            ({"long": "no"}, 4, 0, {"pages": -1}),
+            ({"long": "no"}, 4, 2, {"long": 1, "pages": -1}),
+        ]:
+            with self.subTest(args=args):
+                all_selection._workers = 2
+                parallel = all_selection.select(*args)
+                all_selection._workers = 0
+                sequential = all_selection.select(*args)
+                self.assertEqual(
+                    [o.title for o in parallel["result"]],
+                    [o.title for o in sequential["result"]],
+                )
+                self.assertEqual(parallel["total"], sequential["total"])
+
+        # One pool by selection
+        all_selection._workers = 2
+        self.assertIs(all_selection.pool(), all_selection._pool)
+        self.assertEqual(
+            books.aggregate({"long": "yes"}, None, {"max": "pages"})[0]["count"],
+            len(books.select({"long": "yes"})),
+        )
+
+        # Rights are checked in workers
+        books._permissions.add_or_modify_permission("read", can_read)
+        rows = SelectionStream(all_selection, {"long": "yes"})
+        self.assertTrue(rows.parallel)
+        chunk = ({"_id": "a", "title": "a", "pages": 300}, {"_id": "b", "pages": 450})
+        future = all_selection.pool().submit(match_chunk, "t", rows.job, chunk)
+        self.assertEqual(future.result(), [True, False])
+        rep = books._selections["titles"].select(None, 3, 0, count="none")
+        self.assertEqual([row[1] for row in rep["result"]], ["b07", "b08", "b09"])
+        self.assertIsNone(rep["total"])
+        self.assertEqual(
+            books._selections["titles"].select()["total"],
+            len([o for o in books.select({"long": "yes"}) if o.pages < 400]),
+        )
+
+    def test_yml(self):
+        """
+        parallel scan on yml files
+        """
+        self.check_parallel(DBYmlConnector(path=YML_DIR + "/books"))
+
+    def test_sqlite(self):
+        """
+        parallel scan on sqlite
+        """
+        self.check_parallel(
+            DBSqliteConnector(path=YML_DIR + "/db.sqlite", table="books")
+        )
+
+    def test_not_needed(self):
+        """
+        filters given to the database are not matched in workers
+        """
+        books = self.make_collection(
+            DBSqliteConnector(path=YML_DIR + "/db.sqlite", table="books"), workers=2
+        )
+        rows = SelectionStream(books._selections["_all"], {"title": "b01"})
+        self.assertFalse(rows.parallel)
+
+    def test_matched_here(self):
+        """
+        what cannot be sent to workers is matched in this process
+        """
+        books = self.make_collection(DBYmlConnector(path=YML_DIR + "/books"), workers=2)
+        all_selection = books._selections["_all"]
+        books._permissions.add_or_modify_permission(
+            "read", lambda right_name, o: o is None or o.pages < 400
+        )
+        rows = SelectionStream(all_selection, {"long": "yes"})
+        self.assertFalse(rows.parallel)
+        all_selection._workers = 0
+        sequential = all_selection.select({"long": "yes"})
+        all_selection._workers = 2
+        self.assertEqual(
+            [o.title for o in all_selection.select({"long": "yes"})["result"]],
+            [o.title for o in sequential["result"]],
+        )
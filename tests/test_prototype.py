@@ -0,0 +1,137 @@
+"""
+test for new items built on the model
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import unittest
+
+from backo import Item, Collection, Backoffice, current_user
+from backo import DBYmlConnector, ItemPrototype, StatusType, EVENT_MANAGER
+from backo import String, Int, Dict, List, Tuple, SConstraintError
+
+YML_DIR = "/tmp/backo_tests_prototype"
+
+
+class TestPrototype(unittest.TestCase):
+    """
+    Items sharing the definitions of the model
+    """
+
+    def setUp(self):
+        """
+        a collection of books
+        """
+        current_user.standalone = True
+        current_user.set({"_id": "1", "login": "bob", "roles": []})
+        db_books = DBYmlConnector(path=YML_DIR + "/books")
+        db_books.generate_id = lambda o: f"Book_{o.title}"
+        db_books.drop()
+        self.backo = Backoffice("myApp")
+        self.books = Collection(
+            "books",
+            Item(
+                {
+                    "title": String(require=True, default="untitled"),
+                    "pages": Int(min=1),
+                    "long": String(
+                        set=lambda o: (
+                            "yes" if (o.pages.get_value() or 0) > 250 else "no"
+                        )
+                    ),
+                    "about": Dict({"summary": String(), "lang": String()}),
+                    "tags": List(String(), default=["new"]),
+                    "size": Tuple((Int(), Int())),
+                }
+            ),
+            db_books,
+        )
+        self.backo.register_collection(self.books)
+
+    def test_same_as_copy(self):
+        """
+        a new item is the same as a copy of the model
+        """
+        book = self.books.new_item()
+        copied = self.books.model.copy()
+        self.assertEqual(repr(book), repr(copied))
+        self.assertEqual(book.get_schema(), copied.get_schema())
+        self.assertEqual(book._status, StatusType.UNSET)
+        self.assertIs(book._collection, self.books)
+        self.assertIs(book.about._parent, book)
+        self.assertIs(book.about.summary._parent, book.about)
+        self.assertEqual(book.about.summary.path_name(), "$.about.summary")
+
+        # Values are not shared
+        other = self.books.new_item()
+        book.set({"title": "b1", "pages": 300, "about": {"lang": "fr"}})
+        book.tags.append("classic")
+        self.assertEqual(book.long, "yes")
+        self.assertEqual(other.title, "untitled")
+        self.assertIsNone(other.about.lang.get_value())
+        self.assertEqual(other.tags.get_value(), ["new"])
+        self.assertEqual(self.books.new_item().tags.get_value(), ["new"])
+        self.assertIsNone(self.books.model.pages.get_value())
+
+        # Constraints, computed fields and events
+        with self.assertRaises(SConstraintError):
+            book.pages = 0
+        book = self.books.create({"title": "b1", "pages": 300})
+        self.assertEqual(book._status, StatusType.SAVED)
+        book.pages = 100
+        self.assertEqual(book.long, "no")
+        self.assertEqual(other._status, StatusType.UNSET)
+        book.save()
+        self.assertEqual(self.books.get_by_id("Book_b1").long, "no")
+
+    def test_shared(self):
+        """
+        definitions and events are shared with the model
+        """
+        model = self.books.model
+        book = self.books.new_item()
+        self.assertIs(book.pages._constraints, model.pages._constraints)
+        self.assertIs(book.about.lang._views, model.about.lang._views)
+        self.assertEqual(book.about.lang._event_id, model.about.lang._event_id)
+        self.assertIsNot(book._permissions, model._permissions)
+        self.assertIsNot(
+            book._permissions._permissions, model._permissions._permissions
+        )
+
+        # Copied nodes
+        self.assertIsNot(book.tags, model.tags)
+        self.assertIsNot(book.size, model.size)
+        self.assertEqual(book.size._schema[0]._parent, book.size)
+
+        # Permissions are enabled item by item
+        other = self.books.new_item()
+        book.enable_permissions()
+        self.assertTrue(book.title._permissions.get_permissions_status())
+        self.assertFalse(other.title._permissions.get_permissions_status())
+
+        # Permissions are changed item by item
+        book.title._permissions.add_or_modify_permission("modify", False)
+        self.assertFalse(book.title._permissions.is_allowed_to("modify", book.title))
+        self.assertTrue(other.title._permissions.is_allowed_to("modify", other.title))
+        self.assertIsNone(model.title._permissions.get("modify"))
+        self.assertIsNone(self.books.new_item().title._permissions.get("modify"))
+
+        # No events are registered for new items
+        count = len(EVENT_MANAGER._events_per_object)
+        for _ in range(10):
+            self.books.new_item()
+        self.assertEqual(len(EVENT_MANAGER._events_per_object), count)
+
+    def test_model_changed(self):
+        """
+        the model is compiled again after a change of its keys
+        """
+        prototype = ItemPrototype(self.books.model)
+        book = prototype.new_item()
+        self.books.model.about.add_to_model("year", Int(default=1900))
+        self.assertNotIn("year", book.about._keys)
+        other = prototype.new_item()
+        self.assertEqual(other.about.year, 1900)
+        self.assertIsNot(other.about.year, self.books.model.about.year)
+        self.books.model.about.remove_model("year")
+        self.assertNotIn("year", prototype.new_item().about._keys)
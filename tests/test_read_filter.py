@@ -0,0 +1,131 @@
+"""
+test for read filters of collections
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import json
+import unittest
+from flask import Flask
+
+from backo import Item, Collection, Backoffice, current_user, SelectionStream
+from backo import DBYmlConnector, DBLogConnector, DBSqliteConnector, DBError
+from backo import String, Int
+
+YML_DIR = "/tmp/backo_tests_read_filter"
+
+
+def owned_only():
+    """
+    users see their objects, admins see all
+    """
+    if current_user.has_role("admin"):
+        return None
+    return {"owner": current_user.login.get_value()}
+
+
+class TestReadFilter(unittest.TestCase):
+    """
+    Read restrictions given to the database
+    """
+
+    def make_backoffice(self, db_handler):
+        """
+        return a backoffice with documents of bob and alice
+        """
+        current_user.standalone = True
+        current_user.set({"_id": "1", "login": "bob", "roles": []})
+        db_handler.generate_id = lambda o: f"Doc_{o.name}"
+        db_handler.drop()
+        backo = Backoffice("myApp")
+        backo.register_collection(
+            Collection(
+                "docs",
+                Item({"name": String(), "owner": String(), "size": Int()}),
+                db_handler,
+                read_filter=owned_only,
+            )
+        )
+        backo.docs.create_many(
+            [
+                {"name": f"d{i}", "owner": "bob" if i % 2 else "alice", "size": i}
+                for i in range(6)
+            ]
+        )
+        return backo
+
+    def check_read_filter(self, db_handler):
+        """
+        the same objects with all connectors
+        """
+        backo = self.make_backoffice(db_handler)
+        docs = backo.docs
+
+        self.assertEqual([o.name for o in docs.select({})], ["d1", "d3", "d5"])
+        self.assertEqual(
+            [o.name for o in docs.select({"size": ("$gt", 2)})], ["d3", "d5"]
+        )
+        self.assertEqual(docs.aggregate(None, None, {"sum": "size"})[0]["count"], 3)
+
+        # The restriction is a condition for the database (or on raw documents)
+        rows = SelectionStream(docs._selections["_all"], {}, 2, 0)
+        self.assertIsNone(rows.remaining_filter)
+        self.assertFalse(rows.need_match)
+        if "$eq" in db_handler.supported_operators:
+            self.assertEqual(rows.raw_conditions, [])
+            self.assertEqual(rows.paginate_in_db, db_handler.supports_pagination)
+
+        # A filter on the owner cannot show others objects
+        self.assertEqual(docs.select({"owner": "alice"}), [])
+
+        current_user.set({"_id": "2", "login": "root", "roles": ["admin"]})
+        self.assertEqual(len(docs.select({})), 6)
+
+    def test_yml(self):
+        """
+        read filter with yml files
+        """
+        self.check_read_filter(DBYmlConnector(path=YML_DIR + "/docs"))
+
+        with self.assertRaises(DBError):
+            DBYmlConnector(path=YML_DIR + "/docs", restriction=lambda: {})
+
+    def test_log(self):
+        """
+        read filter with a log file
+        """
+        self.check_read_filter(DBLogConnector(path=YML_DIR + "/docs.log"))
+
+    def test_sqlite(self):
+        """
+        read filter with sqlite
+        """
+        self.check_read_filter(
+            DBSqliteConnector(path=YML_DIR + "/db.sqlite", table="docs")
+        )
+
+    def test_routes(self):
+        """
+        objects not readable are not found
+        """
+        backo = self.make_backoffice(DBYmlConnector(path=YML_DIR + "/docs"))
+        flask = Flask(__name__)
+        backo.build_routes(flask)
+        client = flask.test_client()
+
+        response = client.get("/myApp/docs?_page=10")
+        self.assertEqual(
+            [o["name"] for o in json.loads(response.data)["result"]],
+            ["d1", "d3", "d5"],
+        )
+        response = client.get("/myApp/docs/Doc_d1")
+        self.assertEqual(response.status_code, 200)
+        response = client.get("/myApp/docs/Doc_d0")
+        self.assertEqual(response.status_code, 404)
+        response = client.get(
+            "/myApp/docs/_aggregate?_group=owner",
+        )
+        self.assertEqual(
+            json.loads(response.data)["result"],
+            [{"group": {"owner": "bob"}, "count": 3}],
+        )
@@ -154,6 +154,15 @@ class TestRestApiConnector(unittest.TestCase):
         u.set(json.loads(response.data))
         self.assertEqual(u.name, "bebert")
 
+    def test_get_by_ids(self):
+        """
+        get by ids (parallel requests)
+        """
+        users = self.backo.users.get_by_ids(
+            ["User_bert2_bert2", "User_not_exists", "User_bebert_bebert"]
+        )
+        self.assertEqual([u.name for u in users], ["bert2", "bebert"])
+
     def test_create_modify_delete_post(self):
         """
         create an object with a post, modify with a put and delete it
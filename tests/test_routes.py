@@ -2,7 +2,7 @@
 test for Flask and routes
 """
 
-# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code, too-many-public-methods
 
 import unittest
 import json
@@ -113,6 +113,85 @@ class TestRoutes(unittest.TestCase):
         u.set(json.loads(response.data))
         self.assertEqual(u.name, "bebert")
 
+    def test_get_by_id_not_modified(self):
+        """
+        get by id with If-None-Match / If-Modified-Since
+        """
+        u = self.backo.users.create({"name": "etag", "surname": "etag"})
+        url = f"/myApp/users/{u._id}"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+        response = self.client.get(url, headers={"If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 304)
+
+        # Another view is another etag
+        response = self.client.get(
+            f"{url}?_view=surname_only", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # Modified
+        u.surname = "changed"
+        u.save()
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        u.delete()
+
+    def test_selection_not_modified(self):
+        """
+        selections with If-None-Match, without a cache
+        """
+        url = "/myApp/users/_selections/bert_only?_page=2"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)["total"], 2)
+        etag = response.headers["ETag"]
+        response = self.client.get(url)
+        self.assertEqual(len(json.loads(response.data)["result"]), 2)
+        self.assertEqual(response.headers["ETag"], etag)
+
+        # The page is not read
+        select = self.yml_users.select
+        self.yml_users.select = None
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.yml_users.select = select
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+        # Other parameters
+        response = self.client.get(f"{url}&_skip=1", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.data)["result"]), 1)
+        response = self.client.post(
+            url, json={"name": ("$reg", ".*1")}, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.data)["result"]), 1)
+
+        # Modified
+        u = self.backo.users.create({"name": "bert3", "surname": "bert3"})
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)["total"], 3)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        u.delete()
+
+        # Written by another process (the collection does not know it)
+        etag = self.client.get(url).headers["ETag"]
+        self.yml_users.create({"_id": "User_bert4", "name": "bert4", "surname": "x"})
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)["total"], 3)
+        self.yml_users.delete_by_id("User_bert4")
+
     def test_create_modify_delete_post(self):
         """
         create an object with a post, modify with a put and delete it
@@ -271,6 +350,15 @@ class TestRoutes(unittest.TestCase):
         l = self.backo.users.set(results["result"])
         self.assertEqual(len(l), 1)
 
+        # The response is streamed
+        response = self.client.get("/myApp/users?name=nobody&_skip=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(
+            json.loads(response.data),
+            {"result": [], "total": 0, "_skip": 1, "_page": 10, "_cursor": None},
+        )
+
     def test_select_route_filter_1(self):
         """
         do a select
@@ -291,6 +379,29 @@ class TestRoutes(unittest.TestCase):
         l = self.backo.users.set(results["result"])
         self.assertEqual(len(l), 2)
 
+        # keyset pagination
+        response = self.client.get("/myApp/users?name.$reg=b&_page=2")
+        results = json.loads(response.data)
+        self.assertIsNotNone(results["_cursor"])
+        response = self.client.get(
+            f"/myApp/users?name.$reg=b&_page=2&_cursor={results['_cursor']}"
+        )
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)
+        self.assertEqual(results["total"], 3)
+        self.assertEqual([u["_id"] for u in results["result"]], ["User_bert2_bert2"])
+        self.assertIsNone(results["_cursor"])
+
+        response = self.client.get("/myApp/users?_cursor=wrong")
+        self.assertEqual(response.status_code, 400)
+
+        # without total
+        response = self.client.get("/myApp/users?name.$reg=b&_page=2&_count=none")
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)
+        self.assertIsNone(results["total"])
+        self.assertEqual(len(results["result"]), 2)
+
         response = self.client.get("/myApp/users?name.$reg=b&_page=2&_skip=2")
         self.assertEqual(response.status_code, 200)
         results = json.loads(response.data)
@@ -299,6 +410,39 @@ class TestRoutes(unittest.TestCase):
         l = self.backo.users.set(results["result"])
         self.assertEqual(len(l), 1)
 
+    def test_select_route_sort(self):
+        """
+        do a select sorted by the client
+        """
+        response = self.client.get("/myApp/users?_sort=-name&_page=2")
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)
+        self.assertEqual(
+            [u["_id"] for u in results["result"]],
+            ["User_bert2_bert2", "User_bert1_bert1"],
+        )
+        response = self.client.get(
+            f"/myApp/users?_sort=-name&_page=2&_cursor={results['_cursor']}"
+        )
+        results = json.loads(response.data)
+        self.assertEqual([u["_id"] for u in results["result"]], ["User_bebert_bebert"])
+
+        response = self.client.get("/myApp/users?_sort=-mtime,-name&_page=1")
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)
+        self.assertEqual([u["_id"] for u in results["result"]], ["User_bert2_bert2"])
+
+        response = self.client.get("/myApp/users?_sort=unknown")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            "/myApp/users/_selections/bert_only",
+            json={"_sort": "-surname", "name": ("$reg", "b")},
+        )
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)
+        self.assertEqual([u[1] for u in results["result"]], ["bert2", "bert1"])
+
     def test_select_route_filter_sel(self):
         """
         do a select on a selection
@@ -420,6 +564,13 @@ class TestRoutes(unittest.TestCase):
         response = self.client.delete(f"/myApp/users/{u._id}")
         self.assertEqual(response.status_code, 200)
 
+    def test_get_route_meta_not_modified(self):
+        """Test route meta with If-None-Match"""
+        response = self.client.get("/myApp/_meta")
+        etag = response.headers["ETag"]
+        response = self.client.get("/myApp/_meta", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
     def test_get_route_meta(self):
         """Test route meta"""
         response = self.client.get(
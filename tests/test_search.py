@@ -0,0 +1,225 @@
+"""
+test for text search
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import json
+import unittest
+from flask import Flask
+
+from backo import Item, Collection, Backoffice, current_user
+from backo import DBYmlConnector, DBLogConnector, DBSqliteConnector, DBMongoConnector
+from backo import SearchIndex, SSyntaxError
+from backo import String, Int, Dict
+from backo.search_index import tokenize
+
+from .counting import CountingYml
+
+YML_DIR = "/tmp/backo_tests_search"
+
+BOOKS = [
+    ("b0", "fr", "Les Misérables", "Jean Valjean, un ancien forçat"),
+    ("b1", "fr", "Notre-Dame de Paris", "Quasimodo et Esmeralda à Paris"),
+    ("b2", "en", "Tom Sawyer", "A boy along the Mississippi"),
+    ("b3", "fr", "Paris en l'an 2000", "Paris, Paris et encore Paris"),
+    ("b4", "en", "Around the world", "From London to London"),
+]
+
+
+class TestSearch(unittest.TestCase):
+    """
+    Text queries on searchable fields
+    """
+
+    def make_backoffice(self, db_books, **kwargs):
+        """
+        return a backoffice with books
+        """
+        current_user.standalone = True
+        current_user.set({"_id": "1", "login": "bob", "roles": []})
+        db_books.generate_id = lambda o: f"Book_{o.code}"
+        db_books.drop()
+
+        backo = Backoffice("myApp")
+        backo.register_collection(
+            Collection(
+                "books",
+                Item(
+                    {
+                        "code": String(),
+                        "lang": String(),
+                        "title": String(),
+                        "about": Dict({"summary": String()}),
+                        "pages": Int(),
+                    }
+                ),
+                db_books,
+                searchable="title,$.about.summary",
+                **kwargs,
+            )
+        )
+        for i, (code, lang, title, summary) in enumerate(BOOKS):
+            backo.books.create(
+                {
+                    "code": code,
+                    "lang": lang,
+                    "title": title,
+                    "about": {"summary": summary},
+                    "pages": 100 * i,
+                }
+            )
+        return backo
+
+    def codes(self, items):
+        """
+        return codes of items
+        """
+        return [o.code.get_value() for o in items]
+
+    def check_search(self, db_books):
+        """
+        the same results with all connectors
+        """
+        backo = self.make_backoffice(db_books)
+        books = backo.books
+
+        # The most relevant first
+        self.assertEqual(self.codes(books.search("paris")), ["b3", "b1"])
+        self.assertEqual(self.codes(books.search("MISERABLES")), ["b0"])
+        self.assertEqual(self.codes(books.search("paris quasimodo")), ["b1"])
+        self.assertEqual(books.search("paris berlin"), [])
+        self.assertEqual(books.search("..."), [])
+
+        # With filters, sort and pages
+        self.assertEqual(self.codes(books.search("paris", {"pages": 100})), ["b1"])
+        rep = books._selections["_all"].select(None, 1, 1, query="paris")
+        self.assertEqual((self.codes(rep["result"]), rep["total"]), (["b1"], 2))
+        rep = books._selections["_all"].select(None, 0, 0, {"code": 1}, query="paris")
+        self.assertEqual(self.codes(rep["result"]), ["b1", "b3"])
+        rep = books._selections["_all"].select(None, 1, 0, count="none", query="paris")
+        self.assertEqual((self.codes(rep["result"]), rep["total"]), (["b3"], None))
+
+        # The index follows writes
+        book = books.get_by_id("Book_b2")
+        book.about.summary = "A boy in Paris"
+        book.save()
+        books.create({"code": "b5", "title": "Paris"})
+        books.get_by_id("Book_b3").delete()
+        self.assertEqual(self.codes(books.search("paris")), ["b5", "b1", "b2"])
+        self.assertEqual(books.search("mississippi"), [])
+
+        t_id = backo.start_transaction()
+        books.create({"code": "b6", "title": "Paris"}, transaction_id=t_id)
+        backo.rollback_transaction(t_id)
+        self.assertEqual(len(books.search("paris")), 3)
+
+    def test_yml(self):
+        """
+        search with yml files
+        """
+        self.check_search(DBYmlConnector(path=YML_DIR + "/books"))
+
+    def test_log(self):
+        """
+        search with a log file
+        """
+        self.check_search(DBLogConnector(path=YML_DIR + "/books.log"))
+
+    def test_sqlite(self):
+        """
+        search with sqlite
+        """
+        self.check_search(DBSqliteConnector(path=YML_DIR + "/db.sqlite", table="books"))
+
+    def test_mongo(self):
+        """
+        search with mongo, all words must be found
+        """
+        db_books = DBMongoConnector(
+            connection_string="mongodb://localhost:27017/testMongo", collection="Books"
+        )
+        books = self.make_backoffice(db_books).books
+        self.assertEqual(sorted(self.codes(books.search("paris"))), ["b1", "b3"])
+        self.assertEqual(self.codes(books.search("paris quasimodo")), ["b1"])
+        self.assertEqual(self.codes(books.search("Quasimodo, PARIS")), ["b1"])
+        self.assertEqual(self.codes(books.search("miserables jean")), ["b0"])
+        self.assertEqual(books.search("paris berlin"), [])
+        self.assertEqual(books.search("..."), [])
+        rep = books._selections["_all"].select(None, 0, 0, query="london world")
+        self.assertEqual((self.codes(rep["result"]), rep["total"]), (["b4"], 1))
+        db_books.close()
+
+    def test_index(self):
+        """
+        only objects containing the words are read
+        """
+        db_books = CountingYml(path=YML_DIR + "/books")
+        backo = self.make_backoffice(db_books)
+        self.assertEqual(len(backo.books.search("paris")), 2)
+        self.assertEqual((db_books.scans, db_books.read), (1, 2))
+        self.assertEqual(len(backo.books.search("london")), 1)
+        self.assertEqual((db_books.scans, db_books.read), (1, 3))
+        self.assertEqual(len(backo.books.search_index), 5)
+
+        self.assertEqual(
+            tokenize("Les Misérables, tome 1"), ["les", "miserables", "tome", "1"]
+        )
+        index = SearchIndex(
+            ["title"],
+            lambda projection: [
+                {"_id": "a", "title": "x y"},
+                {"_id": "b", "title": "x"},
+            ],
+        )
+        self.assertEqual([_id for _id, _ in index.search("x")], ["b", "a"])
+        index.update("b", None)
+        self.assertEqual([_id for _id, _ in index.search("x")], ["a"])
+
+    def test_wrong_search(self):
+        """
+        invalid fields and queries
+        """
+        with self.assertRaises(SSyntaxError):
+            Collection(
+                "books",
+                Item({"pages": Int()}),
+                DBYmlConnector(path=YML_DIR + "/books"),
+                searchable="pages",
+            )
+        backo = self.make_backoffice(DBYmlConnector(path=YML_DIR + "/books"))
+        with self.assertRaises(SSyntaxError):
+            backo.books._selections["_all"].select(None, 1, 0, {}, "abc", query="x")
+
+    def test_permissions(self):
+        """
+        only readable objects are returned
+        """
+        backo = self.make_backoffice(
+            DBYmlConnector(path=YML_DIR + "/books"), read_filter={"lang": "en"}
+        )
+        self.assertEqual(self.codes(backo.books.search("london")), ["b4"])
+        self.assertEqual(backo.books.search("paris"), [])
+
+        backo.books._permissions.add_or_modify_permission(
+            "read", lambda right_name, o: o is None or o.code != "b4"
+        )
+        self.assertEqual(backo.books.search("london"), [])
+
+    def test_route(self):
+        """
+        GET with _q
+        """
+        backo = self.make_backoffice(DBYmlConnector(path=YML_DIR + "/books"))
+        flask = Flask(__name__)
+        backo.build_routes(flask)
+        client = flask.test_client()
+
+        response = client.get("/myApp/books?_q=Paris&lang=fr&_page=1")
+        self.assertEqual(response.status_code, 200)
+        rep = json.loads(response.data)
+        self.assertEqual([o["code"] for o in rep["result"]], ["b3"])
+        self.assertEqual(rep["total"], 2)
+
+        response = client.get("/myApp/books?_q=paris&_cursor=abc")
+        self.assertEqual(response.status_code, 400)
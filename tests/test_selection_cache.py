@@ -0,0 +1,199 @@
+"""
+test for the selection cache
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import json
+import time
+import unittest
+from flask import Flask
+
+from backo import Item, Collection, Backoffice, current_user, Selection
+from backo import SelectionCache
+from backo import String, Ref, RefsList, DeleteStrategy
+
+from .counting import CountingYml
+
+YML_DIR = "/tmp/backo_tests_selection_cache"
+
+
+class TestSelectionCache(unittest.TestCase):
+    """
+    Pages kept in the cache of selections
+    """
+
+    def setUp(self):
+        """
+        books and authors
+        """
+        current_user.standalone = True
+        current_user.set({"_id": "1", "login": "bob", "roles": []})
+        self.db_books = CountingYml(path=YML_DIR + "/books")
+        self.db_authors = CountingYml(path=YML_DIR + "/authors")
+        self.db_books.generate_id = lambda o: f"Book_{o.title}"
+        self.db_authors.generate_id = lambda o: f"Author_{o.name}"
+        self.db_books.drop()
+        self.db_authors.drop()
+
+        self.backo = Backoffice("myApp")
+        self.books = Collection(
+            "books",
+            Item(
+                {
+                    "title": String(),
+                    "lang": String(),
+                    "author": Ref(coll="authors", field="$.books"),
+                }
+            ),
+            self.db_books,
+            cache_ttl=60,
+        )
+        self.books.register_selection(
+            "titles",
+            Selection(["$.title", "$.author.name"], cache_ttl=60, cache_size=2),
+        )
+        self.backo.register_collection(self.books)
+        self.backo.register_collection(
+            Collection(
+                "authors",
+                Item(
+                    {
+                        "name": String(),
+                        "books": RefsList(
+                            coll="books",
+                            field="$.author",
+                            ods=DeleteStrategy.UNLINK_REFERENCED_ITEMS,
+                        ),
+                    }
+                ),
+                self.db_authors,
+            )
+        )
+
+        hugo = self.backo.authors.create({"name": "hugo"})
+        for i in range(3):
+            self.books.create({"title": f"b{i}", "lang": "fr", "author": hugo._id})
+
+    def titles(self, *args):
+        """
+        return titles of the _all selection
+        """
+        rep = self.books._selections["_all"].select(*args)
+        return [o.title.get_value() for o in rep["result"]], rep["total"]
+
+    def test_cache(self):
+        """
+        pages are read once, until a write
+        """
+        self.assertEqual(self.titles(), (["b0", "b1", "b2"], 3))
+        scans = self.db_books.scans
+        self.assertEqual(self.titles(), (["b0", "b1", "b2"], 3))
+        self.assertEqual(self.db_books.scans, scans)
+        cache = self.books._selections["_all"]._cache
+        self.assertEqual(cache.hits, 1)
+
+        # Rows are copies
+        rep = self.books._selections["_all"].select()
+        rep["result"][0].title = "changed"
+        self.assertEqual(self.titles()[0][0], "b0")
+
+        # Another filter, page or sort is another page
+        self.assertEqual(self.titles({"title": "b1"}), (["b1"], 1))
+        self.assertEqual(self.titles(None, 1, 1), (["b1"], 3))
+        self.assertEqual(self.titles(None, 0, 0, {"_id": -1})[0], ["b2", "b1", "b0"])
+        self.assertEqual(self.db_books.scans, scans + 3)
+        self.assertEqual(self.titles(None, 1, 1), (["b1"], 3))
+        self.assertEqual(self.db_books.scans, scans + 3)
+
+        # Created, saved and deleted objects
+        self.books.create({"title": "b3", "lang": "fr"})
+        self.assertEqual(self.titles()[1], 4)
+        book = self.books.get_by_id("Book_b0")
+        book.lang = "en"
+        book.save()
+        self.assertEqual(self.titles({"lang": "en"}), (["b0"], 1))
+        book.delete()
+        self.assertEqual(self.titles({"lang": "en"}), ([], 0))
+
+        # Rollbacks
+        t_id = self.backo.start_transaction()
+        self.books.create({"title": "b4"}, transaction_id=t_id)
+        self.assertEqual(self.titles()[1], 4)
+        self.backo.rollback_transaction(t_id)
+        self.assertEqual(self.titles()[1], 3)
+
+    def test_references(self):
+        """
+        writes in another collection change pages
+        """
+        rows = self.books._selections["titles"].select()["result"]
+        self.assertEqual(rows[0][2], "hugo")
+        hugo = self.backo.authors.get_by_id("Author_hugo")
+        hugo.name = "victor"
+        hugo.save()
+        rows = self.books._selections["titles"].select()["result"]
+        self.assertEqual(rows[0][2], "victor")
+
+    def test_lru_and_ttl(self):
+        """
+        pages are evicted
+        """
+        selection = self.books._selections["titles"]
+        for page_size in [1, 2, 3, 1]:
+            selection.select(None, page_size)
+        self.assertEqual(len(selection._cache), 2)
+        self.assertEqual(selection._cache.misses, 4)
+
+        cache = SelectionCache(10, 0.05)
+        cache.put(("k",), (1,), ["row"], 1, None)
+        self.assertEqual(cache.get(("k",), (1,)), (["row"], 1, None))
+        self.assertIsNone(cache.get(("k",), (2,)))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get(("k",), (1,)))
+
+    def test_permissions(self):
+        """
+        pages depending on the user are kept by user
+        """
+        self.books._permissions.add_or_modify_permission(
+            "read", lambda right_name, o: o is None or current_user.login == "bob"
+        )
+        self.assertEqual(self.titles()[1], 3)
+        current_user.set({"_id": "2", "login": "alice", "roles": []})
+        self.assertEqual(self.titles()[1], 0)
+        scans = self.db_books.scans
+        current_user.set({"_id": "1", "login": "bob", "roles": []})
+        self.assertEqual(self.titles()[1], 3)
+        self.assertEqual(self.db_books.scans, scans)
+
+    def test_route(self):
+        """
+        GET on the collection use the cache
+        """
+        flask = Flask(__name__)
+        self.backo.build_routes(flask)
+        client = flask.test_client()
+
+        response = client.get("/myApp/books?lang=fr&_page=2")
+        self.assertEqual(response.status_code, 200)
+        first = json.loads(response.data)
+        scans = self.db_books.scans
+        response = client.get("/myApp/books?lang=fr&_page=2")
+        self.assertEqual(json.loads(response.data), first)
+        self.assertEqual(self.db_books.scans, scans)
+        self.assertEqual(first["total"], 3)
+
+        # Pages kept have an etag
+        etag = response.headers["ETag"]
+        response = client.get(
+            "/myApp/books?lang=fr&_page=2", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.books.create({"title": "b3", "lang": "fr"})
+        response = client.get(
+            "/myApp/books?lang=fr&_page=2", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)["total"], 4)
+        self.assertNotEqual(response.headers["ETag"], etag)
@@ -9,7 +9,9 @@ from backo import Item, Collection
 from backo import DBYmlConnector
 from backo import Backoffice
 from backo import current_user, Selection
-from backo import String, Bool
+from backo import String, Bool, Int, SSyntaxError
+from backo.cursor import parse_sort
+from backo.db_connector import sort_documents, top_documents
 
 ### --- For development ---
 # import logging
@@ -137,3 +139,227 @@ class TestSelections(unittest.TestCase):
         rep = self.users._selections["ms"].select({"surname": "bert2"})
         self.assertEqual(rep["total"], 1)
         self.assertEqual(rep["result"][0], ["User_bert2_bert2", "bert2", True])
+
+    def test_stream_selection(self):
+        """
+        rows are produced one by one and only rows returned are hydrated
+        """
+
+        self.yml_users.drop()
+        for i in range(6):
+            self.backo.users.create({"name": f"bert{i}", "surname": "bebert"})
+
+        hydrated = []
+        new_item = self.users.new_item
+
+        def counting_new_item():
+            hydrated.append(1)
+            return new_item()
+
+        self.users.new_item = counting_new_item
+
+        rows = self.users._selections["_all"].stream({}, 2, 3)
+        self.assertIsNone(rows.total)
+        names = [o.name for o in rows]
+        self.assertEqual(names, ["bert3", "bert4"])
+        self.assertEqual(rows.total, 6)
+        self.assertEqual(len(hydrated), 2)
+
+        # A filter matched in python on raw documents, only the page is hydrated
+        hydrated.clear()
+        rep = self.users._selections["_all"].select(
+            {"name": ("$reg", "bert[1-4]")}, 2, 1
+        )
+        self.assertEqual([o.name for o in rep["result"]], ["bert2", "bert3"])
+        self.assertEqual(rep["total"], 4)
+        self.assertEqual(len(hydrated), 2)
+
+        # A filter on Items (here a regex on a non string) hydrates all rows
+        hydrated.clear()
+        rows = self.users._selections["_all"].stream({"male": ("$reg", "T")})
+        self.assertEqual(rows.raw_conditions, [])
+        self.assertEqual([o.name for o in rows], [])
+        self.assertEqual(len(hydrated), 6)
+
+    def test_selection_projection(self):
+        """
+        only fields used by selectors and filter are read
+        """
+
+        self.yml_users.drop()
+        self.backo.users.create({"name": "paul", "surname": "bebert", "male": False})
+        self.backo.users.create({"name": "bert1", "surname": "bert1"})
+
+        my_selection = Selection(["$.name"])
+        self.users.register_selection("names", my_selection)
+
+        rows = my_selection.stream({"surname": ("$reg", "bert1")})
+        self.assertEqual(rows.projection, {"_id": 1, "name": 1, "surname": 1})
+        self.assertEqual(list(rows), [["User_bert1_bert1", "bert1"]])
+        self.assertEqual(rows.total, 1)
+
+        # documents read are projected, missing fields take default values
+        self.assertEqual(
+            self.yml_users.select(None, rows.projection),
+            [
+                {"_id": "User_bert1_bert1", "name": "bert1", "surname": "bert1"},
+                {"_id": "User_paul_bebert", "name": "paul", "surname": "bebert"},
+            ],
+        )
+        rep = my_selection.select({"male": True})
+        self.assertEqual(rep["result"], [["User_bert1_bert1", "bert1"]])
+
+        # the _all selection read everything
+        rows = self.users._selections["_all"].stream({})
+        self.assertEqual(rows.projection, {})
+
+    def test_selection_cursor(self):
+        """
+        keyset pagination with a cursor
+        """
+
+        self.yml_users.drop()
+        for i in range(7):
+            self.backo.users.create(
+                {"name": f"bert{i}", "surname": "bebert", "male": i % 2 == 0}
+            )
+
+        sel = self.users._selections["_all"]
+        sort = {"male": 1, "name": -1}
+        names = []
+        cursor = None
+        for _ in range(3):
+            rep = sel.select({}, 3, 0, sort, cursor)
+            self.assertEqual(rep["total"], 7)
+            names += [o.name for o in rep["result"]]
+            cursor = rep["_cursor"]
+        self.assertIsNone(cursor)
+        self.assertEqual(
+            names, ["bert5", "bert3", "bert1", "bert6", "bert4", "bert2", "bert0"]
+        )
+
+        # with a filter matched in python
+        rep = sel.select({"name": ("$reg", "bert[1-6]")}, 2, 0, sort)
+        self.assertEqual([o.name for o in rep["result"]], ["bert5", "bert3"])
+        rep = sel.select({"name": ("$reg", "bert[1-6]")}, 2, 1, sort, rep["_cursor"])
+        self.assertEqual([o.name for o in rep["result"]], ["bert6", "bert4"])
+        self.assertEqual(rep["total"], 6)
+
+        # the cursor is for a given sort
+        with self.assertRaises(SSyntaxError):
+            sel.select({}, 3, 0, {"name": 1}, rep["_cursor"])
+        with self.assertRaises(SSyntaxError):
+            sel.select({}, 3, 0, sort, "not a cursor")
+
+    def test_selection_count(self):
+        """
+        total with _count=exact|estimate|none
+        """
+
+        self.yml_users.drop()
+        for i in range(6):
+            self.backo.users.create({"name": f"bert{i}", "surname": "bebert"})
+
+        hydrated = []
+        new_item = self.users.new_item
+
+        def counting_new_item():
+            hydrated.append(1)
+            return new_item()
+
+        self.users.new_item = counting_new_item
+
+        read = []
+        select_iter = self.yml_users.select_iter
+
+        def counting_select_iter(*args):
+            for o in select_iter(*args):
+                read.append(1)
+                yield o
+
+        self.yml_users.select_iter = counting_select_iter
+        sel = self.users._selections["_all"]
+        f = {"name": ("$reg", "bert[0-4]")}
+
+        rep = sel.select(f, 2, 1, count="exact")
+        self.assertEqual([o.name for o in rep["result"]], ["bert1", "bert2"])
+        self.assertEqual(rep["total"], 5)
+        self.assertEqual((len(read), len(hydrated)), (6, 2))
+
+        # stop as soon as the page is full
+        hydrated.clear()
+        read.clear()
+        rep = sel.select(f, 2, 1, count="none")
+        self.assertEqual([o.name for o in rep["result"]], ["bert1", "bert2"])
+        self.assertIsNone(rep["total"])
+        self.assertEqual((len(read), len(hydrated)), (3, 2))
+
+        # estimate is the number of files (the filter is matched in python)
+        rep = sel.select(f, 2, 1, count="estimate")
+        self.assertEqual([o.name for o in rep["result"]], ["bert1", "bert2"])
+        self.assertEqual(rep["total"], 6)
+        self.backo.users.create({"name": "bert6", "surname": "bebert"})
+        self.assertEqual(sel.select(f, 2, 1, count="estimate")["total"], 7)
+
+        # Objects before a cursor matched here are counted (or estimated)
+        for count, total in (("exact", 5), ("estimate", 7)):
+            rep = sel.select(f, 3, 0, {"name": 1}, count=count)
+            rep = sel.select(f, 3, 0, {"name": 1}, rep["_cursor"], count=count)
+            self.assertEqual([o.name for o in rep["result"]], ["bert3", "bert4"])
+            self.assertEqual(rep["total"], total)
+
+        with self.assertRaises(SSyntaxError):
+            sel.select(f, 2, 1, count="everything")
+
+    def test_parse_sort(self):
+        """
+        sort given by a client
+        """
+        model = self.users.model
+        self.assertEqual(parse_sort(None, model), {})
+        self.assertEqual(
+            parse_sort("-mtime, name", model), {"_meta.mtime": -1, "name": 1}
+        )
+        self.assertEqual(parse_sort(["male", "-_id"], model), {"male": 1, "_id": -1})
+        for wrong in ["unknown", "name,-name", "_meta", 12]:
+            with self.assertRaises(SSyntaxError):
+                parse_sort(wrong, model)
+
+        documents = [{"_id": str(i), "a": i % 3, "b": {"c": -i}} for i in range(20)]
+        for sort in [{"a": 1, "_id": 1}, {"a": -1, "b.c": 1}, {}]:
+            for limit in [0, 1, 5, 30]:
+                expected = sort_documents(list(documents), sort)
+                self.assertEqual(
+                    top_documents(iter(documents), sort, limit),
+                    expected[:limit] if limit else expected,
+                )
+
+    def test_selection_sort_in_python(self):
+        """
+        sort on computed fields or without sort in the database
+        """
+
+        self.yml_users.drop()
+        self.users.model.add_to_model("rank", Int(set=lambda o: len(o.surname)))
+        for i in range(7):
+            self.backo.users.create({"name": f"bert{i}", "surname": "b" * (7 - i)})
+
+        sel = self.users._selections["_all"]
+        for supports_sort in [True, False]:
+            self.yml_users.supports_sort = supports_sort
+            sort = {"rank": 1} if supports_sort else {"surname": 1}
+            rows = sel.stream({"name": ("$reg", "bert[1-6]")}, 2, 1, sort)
+            self.assertTrue(rows.sort_in_python)
+            self.assertEqual([o.name for o in rows], ["bert5", "bert4"])
+            self.assertEqual(rows.total, 6)
+
+            names = []
+            cursor = None
+            for _ in range(4):
+                rep = sel.select({}, 2, 0, sort, cursor)
+                self.assertEqual(rep["total"], 7)
+                names += [o.name for o in rep["result"]]
+                cursor = rep["_cursor"]
+            self.assertIsNone(cursor)
+            self.assertEqual(names, [f"bert{i}" for i in range(6, -1, -1)])
+        del self.yml_users.supports_sort
@@ -0,0 +1,133 @@
+"""
+test for the sqlite connector
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import unittest
+
+from backo import Item, Collection, Backoffice, current_user
+from backo import DBSqliteConnector, DBError, NotFoundError
+from backo import String, Int, Bool, List, Dict
+
+SQLITE_FILE = "/tmp/backo_tests_sqlite.sqlite"
+
+
+class TestSqliteConnector(unittest.TestCase):
+    """
+    sqlite connector
+    """
+
+    def setUp(self):
+        """
+        start with an empty table
+        """
+        current_user.standalone = True
+        self.db = DBSqliteConnector(
+            path=SQLITE_FILE, table="users", indexes=["name", "address.town"]
+        )
+        self.db.generate_id = lambda o: f"User_{o.name}"
+        self.db.drop()
+
+        self.backo = Backoffice("myApp")
+        self.users = Collection(
+            "users",
+            Item(
+                {
+                    "name": String(),
+                    "age": Int(),
+                    "male": Bool(default=True),
+                    "tags": List(String()),
+                    "address": Dict({"town": String(default="Paris")}),
+                }
+            ),
+            self.db,
+        )
+        self.backo.register_collection(self.users)
+
+    def test_bad_options(self):
+        """
+        table and indexes names are checked
+        """
+        with self.assertRaises(DBError):
+            DBSqliteConnector(path=SQLITE_FILE, table="users; drop")
+        with self.assertRaises(DBError):
+            DBSqliteConnector(path=SQLITE_FILE, table="users", indexes=["a'b"])
+
+    def test_crud(self):
+        """
+        create, save, delete
+        """
+        self.users.create({"name": "bert", "age": 12})
+        u = self.users.create({"name": "paul", "age": 30})
+        with self.assertRaises(DBError):
+            self.db.create({"_id": "User_paul"})
+
+        u.age = 31
+        u.save()
+        self.assertEqual(self.users.get_by_id("User_paul").age, 31)
+        self.assertEqual(self.db.count(None), 2)
+
+        u.delete()
+        with self.assertRaises(NotFoundError):
+            self.db.get_by_id("User_paul")
+        self.assertFalse(self.db.delete_by_id("User_paul"))
+        self.assertEqual(self.db.count(None), 1)
+
+        mode = self.db._execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_translate_filter(self):
+        """
+        filters are translated into sql
+        """
+        self.users.create({"name": "bert", "age": 12, "tags": ["a", "b"]})
+        self.users.create({"name": "paul", "age": 30, "male": False})
+        self.users.create(
+            {"name": "marc", "age": 40, "tags": ["c"], "address": {"town": "Lyon"}}
+        )
+        self.db.create({"_id": "raw", "name": None})
+
+        for match_filter, names in [
+            ({"male": True}, ["User_bert", "User_marc", "raw"]),
+            ({"male": ("$ne", True)}, ["User_paul"]),
+            ({"age": ("$gt", 20)}, ["User_marc", "User_paul"]),
+            ({"age": ("$not", ("$gt", 20))}, ["User_bert", "raw"]),
+            ({"name": None}, ["raw"]),
+            ({"name": ("$reg", "ma|pa")}, ["User_marc", "User_paul"]),
+            ({"tags": ("$contains", "b")}, ["User_bert"]),
+            ({"address": {"town": "Paris"}}, ["User_bert", "User_paul", "raw"]),
+            (
+                {"age": ("$and", [("$gte", 12), ("$lt", 40)])},
+                ["User_bert", "User_paul"],
+            ),
+        ]:
+            rows = self.users._selections["_all"].stream(match_filter)
+            self.assertIsNone(rows.remaining_filter)
+            self.assertEqual(
+                sorted(o["_id"] for o in self.db.select(rows.db_filter)),
+                names,
+                match_filter,
+            )
+
+    def test_selection(self):
+        """
+        sort and pagination are done in sql
+        """
+        for i, name in enumerate(["bert", "paul", "marc", "jo"]):
+            self.users.create({"name": name, "age": 10 * i})
+
+        rows = self.users._selections["_all"].stream({"age": ("$gte", 10)})
+        self.assertTrue(rows.paginate_in_db)
+
+        rep = self.users._selections["_all"].select(
+            {"age": ("$gte", 10)}, 2, 0, {"age": -1}
+        )
+        self.assertEqual([o.name for o in rep["result"]], ["jo", "marc"])
+        self.assertEqual(rep["total"], 3)
+        rep = self.users._selections["_all"].select(
+            {"age": ("$gte", 10)}, 2, 0, {"age": -1}, cursor=rep["_cursor"]
+        )
+        self.assertEqual([o.name for o in rep["result"]], ["paul"])
+        rep = self.users._selections["_all"].select({}, 2, 3, {"name": 1})
+        self.assertEqual([o.name for o in rep["result"]], ["paul"])
@@ -0,0 +1,137 @@
+"""
+test for the yml connector with catalog
+"""
+
+# pylint: disable=wrong-import-position, no-member, import-error, protected-access, wrong-import-order, duplicate-code
+
+import os
+import unittest
+import yaml
+
+from backo import Item, Collection, Backoffice, current_user
+from backo import DBYmlConnector, NotFoundError
+from backo import String, Int, Dict, Condition
+
+YML_DIR = "/tmp/backo_tests_yml_catalog"
+
+
+class TestYmlCatalog(unittest.TestCase):
+    """
+    yml connector with an in memory catalog
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        init this tests
+        """
+        super().__init__(*args, **kwargs)
+        current_user.standalone = True
+
+        self.db = DBYmlConnector(
+            path=YML_DIR, catalog=True, indexes=["name", "address.town"]
+        )
+        self.db.generate_id = lambda o: f"User_{o.name}"
+
+        self.backo = Backoffice("myApp")
+        self.users = Collection(
+            "users",
+            Item(
+                {
+                    "name": String(),
+                    "age": Int(),
+                    "address": Dict({"town": String(default="Paris")}),
+                }
+            ),
+            self.db,
+        )
+        self.backo.register_collection(self.users)
+
+    def setUp(self):
+        """
+        standalone user
+        """
+        current_user.standalone = True
+
+    def test_crud(self):
+        """
+        the catalog follows create, save and delete
+        """
+        self.db.drop()
+        self.users.create({"name": "bert", "age": 12, "address": {"town": "Lyon"}})
+        u = self.users.create({"name": "paul", "age": 30})
+        self.assertEqual(self.db.get_by_id("User_paul")["age"], 30)
+
+        u.age = 31
+        u.save()
+        self.assertEqual(self.db.get_by_id("User_paul")["age"], 31)
+
+        # modify what is returned doesn't change the catalog
+        self.db.get_by_id("User_paul")["age"] = 99
+        self.assertEqual(self.db.get_by_id("User_paul")["age"], 31)
+
+        u.delete()
+        with self.assertRaises(NotFoundError):
+            self.db.get_by_id("User_paul")
+        self.assertEqual(self.db.count([]), 1)
+
+    def test_files_changed(self):
+        """
+        files modified outside are read again
+        """
+        self.db.drop()
+        self.users.create({"name": "bert", "age": 12})
+        self.assertEqual(self.users.select({"age": 12})[0].name, "bert")
+
+        filename = os.path.join(YML_DIR, "User_bert.yml")
+        with open(filename, mode="w", encoding="utf-8") as outfile:
+            yaml.dump({"_id": "User_bert", "name": "bert", "age": 13}, outfile)
+        os.utime(filename, ns=(1, 1))
+        self.assertEqual(self.users.select({"age": 12}), [])
+        self.assertEqual(self.db.get_by_id("User_bert")["age"], 13)
+
+        with open(
+            os.path.join(YML_DIR, "User_new.yml"), mode="w", encoding="utf-8"
+        ) as outfile:
+            yaml.dump({"_id": "User_new", "name": "new", "age": 13}, outfile)
+        self.assertEqual(len(self.users.select({"age": 13})), 2)
+
+        os.unlink(filename)
+        self.assertEqual([o.name for o in self.users.select({"age": 13})], ["new"])
+
+    def test_filter_with_indexes(self):
+        """
+        filters are done on the catalog, with indexes
+        """
+        self.db.drop()
+        self.users.create({"name": "bert", "age": 12, "address": {"town": "Lyon"}})
+        self.users.create({"name": "paul", "age": 30})
+        self.users.create({"name": "marc", "age": 40, "address": {"town": "Nice"}})
+
+        paris = Condition(["address", "town"], "$eq", "Paris", "Paris")
+        self.assertEqual(self.db._catalog._candidates([paris]), {"User_paul"})
+        self.assertEqual(
+            self.db._catalog._candidates([paris, Condition(["name"], "$eq", "bert")]),
+            set(),
+        )
+        self.assertIsNone(self.db._catalog._candidates([Condition(["age"], "$eq", 12)]))
+
+        rows = self.users._selections["_all"].stream(
+            {"address": {"town": "Paris"}, "age": ("$gt", 10)}
+        )
+        self.assertIsNone(rows.remaining_filter)
+        self.assertTrue(rows.paginate_in_db)
+        self.assertEqual([o.name for o in rows], ["paul"])
+
+        rep = self.users._selections["_all"].select(
+            {"age": ("$gt", 10)}, 1, 1, {"age": -1}
+        )
+        self.assertEqual([o.name for o in rep["result"]], ["paul"])
+        self.assertEqual(rep["total"], 3)
+
+        # index updated by save
+        u = self.users.get_by_id("User_bert")
+        u.address.town = "Paris"
+        u.save()
+        self.assertEqual(
+            self.db._catalog._candidates([paris]), {"User_paul", "User_bert"}
+        )